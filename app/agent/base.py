@@ -1,12 +1,16 @@
+import inspect
 from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from pydantic import BaseModel, Field, model_validator
 
+from app.config import config
+from app.events import EventBus, EventType, get_event_bus, preview
 from app.llm import LLM
 from app.logger import logger
-from app.schema import ROLE_TYPE, AgentState, Memory, Message
+from app.schema import ROLE_TYPE, AgentState, Memory, Message, TokenBudgetMemory
+from app.tracing import get_tracer
 
 
 class BaseAgent(BaseModel, ABC):
@@ -41,6 +45,14 @@ class BaseAgent(BaseModel, ABC):
 
     duplicate_threshold: int = 2
 
+    # Called after every completed step, e.g. to checkpoint the run; may be async
+    step_callback: Optional[Callable[["BaseAgent"], Optional[Awaitable[None]]]] = Field(
+        default=None, exclude=True
+    )
+
+    # Receives step, tool and token events for UIs to render as they happen
+    event_bus: EventBus = Field(default_factory=get_event_bus, exclude=True)
+
     class Config:
         arbitrary_types_allowed = True
         extra = "allow"  # Allow extra fields for flexibility in subclasses
@@ -52,6 +64,18 @@ class BaseAgent(BaseModel, ABC):
             self.llm = LLM(config_name=self.name.lower())
         if not isinstance(self.memory, Memory):
             self.memory = Memory()
+        memory_config = config.memory_config
+        if (
+            memory_config
+            and memory_config.token_budget
+            and "memory" not in self.model_fields_set
+        ):
+            self.memory = TokenBudgetMemory.for_llm(
+                self.llm,
+                max_tokens=memory_config.token_budget,
+                compact_ratio=memory_config.compact_ratio,
+                keep_recent=memory_config.keep_recent,
+            )
         return self
 
     @asynccontextmanager
@@ -135,20 +159,44 @@ class BaseAgent(BaseModel, ABC):
             ):
                 self.current_step += 1
                 logger.info(f"Executing step {self.current_step}/{self.max_steps}")
-                step_result = await self.step()
+                self.publish_event(
+                    EventType.STEP_STARTED,
+                    step=self.current_step,
+                    max_steps=self.max_steps,
+                )
+                with get_tracer().start_span(
+                    "agent.step", agent=self.name, step=self.current_step
+                ):
+                    step_result = await self.step()
 
                 # Check for stuck state
                 if self.is_stuck():
                     self.handle_stuck_state()
 
                 results.append(f"Step {self.current_step}: {step_result}")
+                self.publish_event(
+                    EventType.STEP_FINISHED,
+                    step=self.current_step,
+                    result=preview(step_result),
+                )
+
+                if self.step_callback:
+                    result = self.step_callback(self)
+                    if inspect.isawaitable(result):
+                        await result
 
             if self.current_step >= self.max_steps:
                 self.current_step = 0
                 self.state = AgentState.IDLE
                 results.append(f"Terminated: Reached max steps ({self.max_steps})")
 
-        return "\n".join(results) if results else "No steps executed"
+        result = "\n".join(results) if results else "No steps executed"
+        self.publish_event(EventType.RUN_FINISHED, result=preview(result))
+        return result
+
+    def publish_event(self, event_type: EventType, **data) -> None:
+        """Publish an event from this agent on its event bus"""
+        self.event_bus.publish(event_type, self.name, **data)
 
     @abstractmethod
     async def step(self) -> str:
@@ -157,6 +205,16 @@ class BaseAgent(BaseModel, ABC):
         Must be implemented by subclasses to define specific behavior.
         """
 
+    def snapshot(self) -> Dict[str, Any]:
+        """Execution state needed to resume the agent, besides its messages."""
+        return {"current_step": self.current_step}
+
+    def restore(self, snapshot: Dict[str, Any], messages: List[Message]) -> None:
+        """Restore a snapshot taken by ``snapshot`` with the saved messages."""
+        self.memory.messages[:] = messages
+        self.current_step = snapshot.get("current_step", 0)
+        self.state = AgentState.IDLE
+
     def handle_stuck_state(self):
         """Handle stuck state by adding a prompt to change strategy"""
         stuck_prompt = "\
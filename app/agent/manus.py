@@ -5,6 +5,7 @@ from pydantic import Field
 from app.agent.toolcall import ToolCallAgent
 from app.prompt.manus import NEXT_STEP_PROMPT, SYSTEM_PROMPT
 from app.tool import Terminate, ToolCollection
+from app.tool.artifact_store import ReadArtifact
 from app.tool.browser_use_tool import BrowserUseTool
 from app.tool.file_saver import FileSaver
 from app.tool.mcp import MCPMarketplace, MCPServerTool
@@ -30,6 +31,7 @@ class Manus(ToolCallAgent):
     next_step_prompt: str = NEXT_STEP_PROMPT
 
     max_observe: int = 2000
+    artifact_threshold: int = 2000
     max_steps: int = 10
 
     # Add general-purpose tools to the tool collection
@@ -41,6 +43,7 @@ class Manus(ToolCallAgent):
             FileSaver(),
             MCPMarketplace(),
             MCPServerTool(),
+            ReadArtifact(),
             Terminate(),
         )
     )
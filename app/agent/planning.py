@@ -157,43 +157,22 @@ class PlanningAgent(ToolCallAgent):
 
     async def _get_current_step_index(self) -> Optional[int]:
         """
-        Parse the current plan to identify the first non-completed step's index.
+        Look up the first non-completed step's index from the plan's progress index.
         Returns None if no active step is found.
         """
         if not self.active_plan_id:
             return None
 
-        plan = await self.get_plan()
+        planning_tool = self.available_tools.tool_map.get("planning")
+        if not isinstance(planning_tool, PlanningTool):
+            return None
 
         try:
-            plan_lines = plan.splitlines()
-            steps_index = -1
-
-            # Find the index of the "Steps:" line
-            for i, line in enumerate(plan_lines):
-                if line.strip() == "Steps:":
-                    steps_index = i
-                    break
-
-            if steps_index == -1:
-                return None
-
-            # Find the first non-completed step
-            for i, line in enumerate(plan_lines[steps_index + 1 :], start=0):
-                if "[ ]" in line or "[→]" in line:  # not_started or in_progress
-                    # Mark current step as in_progress
-                    await self.available_tools.execute(
-                        name="planning",
-                        tool_input={
-                            "command": "mark_step",
-                            "plan_id": self.active_plan_id,
-                            "step_index": i,
-                            "step_status": "in_progress",
-                        },
-                    )
-                    return i
-
-            return None  # No active step found
+            index = planning_tool.get_current_step(self.active_plan_id)
+            if index is not None:
+                # Mark current step as in_progress
+                planning_tool.set_step_status(self.active_plan_id, index, "in_progress")
+            return index
         except Exception as e:
             logger.warning(f"Error finding current step index: {e}")
             return None
@@ -30,8 +30,8 @@ class SWEAgent(ToolCallAgent):
         """Process current state and decide next action"""
         # Update working directory
         self.working_dir = await self.bash.execute("pwd")
-        self.next_step_prompt = self.next_step_prompt.format(
-            current_dir=self.working_dir
-        )
+        # Format the template, not the previous prompt: formatting twice would
+        # turn its escaped placeholders into fields and raise KeyError
+        self.next_step_prompt = NEXT_STEP_TEMPLATE.format(current_dir=self.working_dir)
 
         return await super().think()
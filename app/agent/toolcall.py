@@ -1,19 +1,77 @@
+import asyncio
 import json
-from typing import Any, List, Optional, Union
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
 
 from pydantic import Field
 
 from app.agent.react import ReActAgent
+from app.events import EventType, preview
 from app.exceptions import TokenLimitExceeded
 from app.logger import logger
 from app.prompt.toolcall import NEXT_STEP_PROMPT, SYSTEM_PROMPT
-from app.schema import TOOL_CHOICE_TYPE, AgentState, Message, ToolCall, ToolChoice
+from app.schema import (
+    TOOL_CHOICE_TYPE,
+    AgentState,
+    Message,
+    TokenBudgetMemory,
+    ToolCall,
+    ToolChoice,
+)
 from app.tool import CreateChatCompletion, Terminate, ToolCollection
+from app.tool.artifact_store import ArtifactStore, get_artifact_store
 
 
 TOOL_CALL_REQUIRED = "Tool calls required but none provided"
 
 
+class ToolCallScheduler:
+    """Schedules the tool calls of one LLM response.
+
+    Consecutive calls to parallel-safe tools run concurrently, bounded by
+    ``max_parallel``. Any other call waits for everything scheduled before it
+    and holds back everything after it, so side-effecting tools still run in
+    the order the model emitted them.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[ToolCall], Awaitable[str]],
+        is_parallel_safe: Callable[[str], bool],
+        max_parallel: int = 4,
+    ):
+        self._run = run
+        self._is_parallel_safe = is_parallel_safe
+        self._semaphore = asyncio.Semaphore(max(1, max_parallel))
+        self._barrier: List[asyncio.Task] = []
+        self._parallel: List[asyncio.Task] = []
+
+    def submit(self, command: ToolCall) -> asyncio.Task:
+        """Start a tool call as soon as its ordering constraints allow"""
+        if self._is_parallel_safe(command.function.name):
+            task = asyncio.create_task(
+                self._execute(list(self._barrier), command, limited=True)
+            )
+            self._parallel.append(task)
+        else:
+            task = asyncio.create_task(
+                self._execute(self._barrier + self._parallel, command)
+            )
+            self._barrier = [task]
+            self._parallel = []
+        return task
+
+    async def _execute(
+        self, wait_for: List[asyncio.Task], command: ToolCall, limited: bool = False
+    ) -> str:
+        if wait_for:
+            await asyncio.wait(wait_for)
+        if not limited:
+            return await self._run(command)
+        async with self._semaphore:
+            return await self._run(command)
+
+
 class ToolCallAgent(ReActAgent):
     """Base agent class for handling tool/function calls with enhanced abstraction"""
 
@@ -34,28 +92,64 @@ class ToolCallAgent(ReActAgent):
     max_steps: int = 10
     max_observe: Optional[Union[int, bool]] = None
 
+    # Tool results longer than this are stored as artifacts and only a
+    # preview is kept in memory; read_artifact pages through the rest
+    artifact_threshold: Optional[int] = None
+    artifact_preview_chars: int = 1000
+    artifact_store: Optional[ArtifactStore] = Field(default=None, exclude=True)
+
+    # Upper bound on parallel-safe tool calls running at the same time
+    max_parallel_tool_calls: int = 4
+
+    # Stream the LLM response and start executing each tool call as soon as
+    # its arguments are complete, instead of waiting for the whole response
+    stream_tool_calls: bool = False
+    dispatched_tool_calls: Dict[str, asyncio.Task] = Field(
+        default_factory=dict, exclude=True
+    )
+
     async def think(self) -> bool:
         """Process current state and decide next actions using tools"""
+        self._cancel_dispatched_tool_calls()
+
         if self.next_step_prompt:
             user_msg = Message.user_message(self.next_step_prompt)
             self.messages += [user_msg]
 
         try:
-            # Get response with tool options
-            response = await self.llm.ask_tool(
-                messages=self.messages,
-                system_msgs=[Message.system_message(self.system_prompt)]
+            system_msgs = (
+                [Message.system_message(self.system_prompt)]
                 if self.system_prompt
-                else None,
-                tools=self.available_tools.to_params(),
-                tool_choice=self.tool_choices,
+                else None
             )
+            if isinstance(self.memory, TokenBudgetMemory):
+                # system prompt and tool schemas share the budget with history
+                self.memory.enforce_budget(
+                    self.llm.count_message_tokens(
+                        [message.to_dict() for message in system_msgs or []]
+                    )
+                    + self.llm.count_tools_tokens(self.available_tools.to_params())
+                )
+            if self.stream_tool_calls and self.tool_choices != ToolChoice.NONE:
+                response = await self._stream_and_dispatch(system_msgs)
+            else:
+                # Get response with tool options
+                response = await self.llm.ask_tool(
+                    messages=self.messages,
+                    system_msgs=system_msgs,
+                    tools=self.available_tools.to_params(),
+                    tool_choice=self.tool_choices,
+                )
         except ValueError:
             raise
         except Exception as e:
-            # Check if this is a RetryError containing TokenLimitExceeded
-            if hasattr(e, "__cause__") and isinstance(e.__cause__, TokenLimitExceeded):
-                token_limit_error = e.__cause__
+            # Check if this is (or is a RetryError containing) TokenLimitExceeded
+            token_limit_error = (
+                e
+                if isinstance(e, TokenLimitExceeded)
+                else getattr(e, "__cause__", None)
+            )
+            if isinstance(token_limit_error, TokenLimitExceeded):
                 logger.error(
                     f"🚨 Token limit error (from RetryError): {token_limit_error}"
                 )
@@ -79,6 +173,11 @@ class ToolCallAgent(ReActAgent):
             logger.info(
                 f"🧰 Tools being prepared: {[call.function.name for call in response.tool_calls]}"
             )
+        self.publish_event(
+            EventType.THOUGHT,
+            content=response.content,
+            tools=[call.function.name for call in response.tool_calls or []],
+        )
 
         try:
             # Handle different tool_choices modes
@@ -128,9 +227,28 @@ class ToolCallAgent(ReActAgent):
             # Return last message content if no tool calls
             return self.messages[-1].content or "No content or commands to execute"
 
+        if not self.dispatched_tool_calls:
+            scheduler = self._new_scheduler()
+            for command in self.tool_calls:
+                self.dispatched_tool_calls[command.id] = scheduler.submit(command)
+
         results = []
         for command in self.tool_calls:
-            result = await self.execute_tool(command)
+            task = self.dispatched_tool_calls.pop(command.id, None)
+            result = await task if task else await self.execute_tool(command)
+
+            tool = self.available_tools.get_tool(command.function.name)
+            offload = tool is None or tool.offload_output
+            if (
+                offload
+                and self.artifact_threshold
+                and len(result) > self.artifact_threshold
+            ):
+                store = self.artifact_store or get_artifact_store()
+                artifact_id, result = store.offload(result, self.artifact_preview_chars)
+                logger.info(
+                    f"📦 Stored output of '{command.function.name}' as artifact {artifact_id}"
+                )
 
             if self.max_observe:
                 result = result[: self.max_observe]
@@ -148,6 +266,53 @@ class ToolCallAgent(ReActAgent):
 
         return "\n\n".join(results)
 
+    async def _stream_and_dispatch(
+        self, system_msgs: Optional[List[Message]]
+    ) -> Message:
+        """Stream the LLM response, dispatching tool calls as they complete.
+
+        Dispatched calls follow the same ordering rules as in ``act``, which
+        collects their results.
+        """
+        content_parts: List[str] = []
+        tool_calls: List[ToolCall] = []
+        scheduler = self._new_scheduler()
+
+        async for item in self.llm.ask_tool_stream(
+            messages=self.messages,
+            system_msgs=system_msgs,
+            tools=self.available_tools.to_params(),
+            tool_choice=self.tool_choices,
+        ):
+            if isinstance(item, str):
+                content_parts.append(item)
+                self.publish_event(EventType.TOKEN, text=item)
+                continue
+            tool_calls.append(item)
+            self.dispatched_tool_calls[item.id] = scheduler.submit(item)
+            logger.info(f"🚀 Dispatched tool '{item.function.name}' while streaming")
+
+        return Message(
+            role="assistant",
+            content="".join(content_parts) or None,
+            tool_calls=tool_calls or None,
+        )
+
+    def _new_scheduler(self) -> ToolCallScheduler:
+        def is_parallel_safe(name: str) -> bool:
+            tool = self.available_tools.get_tool(name)
+            return bool(tool and tool.parallel_safe)
+
+        return ToolCallScheduler(
+            self.execute_tool, is_parallel_safe, self.max_parallel_tool_calls
+        )
+
+    def _cancel_dispatched_tool_calls(self) -> None:
+        """Cancel tool calls dispatched for a response that was never acted on"""
+        for task in self.dispatched_tool_calls.values():
+            task.cancel()
+        self.dispatched_tool_calls.clear()
+
     async def execute_tool(self, command: ToolCall) -> str:
         """Execute a single tool call with robust error handling"""
         if not command or not command.function or not command.function.name:
@@ -163,6 +328,13 @@ class ToolCallAgent(ReActAgent):
 
             # Execute the tool
             logger.info(f"🔧 Activating tool: '{name}'...")
+            self.publish_event(
+                EventType.TOOL_CALLED,
+                tool=name,
+                tool_call_id=command.id,
+                arguments=args,
+            )
+            started = time.perf_counter()
             result = await self.available_tools.execute(name=name, tool_input=args)
 
             # Format result for display
@@ -171,6 +343,13 @@ class ToolCallAgent(ReActAgent):
                 if result
                 else f"Cmd `{name}` completed with no output"
             )
+            self.publish_event(
+                EventType.TOOL_FINISHED,
+                tool=name,
+                tool_call_id=command.id,
+                result=preview(observation),
+                seconds=round(time.perf_counter() - started, 3),
+            )
 
             # Handle special tools like `finish`
             await self._handle_special_tool(name=name, result=result)
@@ -197,6 +376,29 @@ class ToolCallAgent(ReActAgent):
             logger.info(f"🏁 Special tool '{name}' has completed the task!")
             self.state = AgentState.FINISHED
 
+    async def cleanup(self) -> None:
+        """Release the resources held by the agent's tools"""
+        await self.available_tools.cleanup()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Execution state plus the state of tools that keep any"""
+        snapshot = super().snapshot()
+        tools = {}
+        for tool in self.available_tools:
+            state = tool.snapshot()
+            if state:
+                tools[tool.name] = state
+        if tools:
+            snapshot["tools"] = tools
+        return snapshot
+
+    def restore(self, snapshot: Dict[str, Any], messages: List[Message]) -> None:
+        super().restore(snapshot, messages)
+        for name, state in snapshot.get("tools", {}).items():
+            tool = self.available_tools.get_tool(name)
+            if tool:
+                tool.restore(state)
+
     @staticmethod
     def _should_finish_execution(**kwargs) -> bool:
         """Determine if tool execution should finish the agent"""
@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+from app.config import WORKSPACE_ROOT
+from app.schema import Message
+
+
+class CheckpointStore:
+    """SQLite store for resumable run state.
+
+    A run is identified by its plan id. Each checkpoint replaces the run's
+    state row (plan, accumulated result, agent cursors) and appends the agent
+    messages added since the previous checkpoint, so checkpointing after every
+    step costs one small transaction instead of rewriting the whole history.
+    Histories that were trimmed or summarized since then are rewritten.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or str(WORKSPACE_ROOT / "checkpoints.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+        # (run_id, agent) -> message objects already written, in order
+        self._saved: Dict[tuple, List[Message]] = {}
+        with closing(self._conn.cursor()) as c:
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, status TEXT, state TEXT, updated_at REAL)"
+            )
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS run_messages (run_id TEXT, agent TEXT, seq INTEGER, message TEXT, PRIMARY KEY (run_id, agent, seq))"
+            )
+            c.execute(
+                "CREATE INDEX IF NOT EXISTS idx_runs_updated_at ON runs (updated_at)"
+            )
+            self._conn.commit()
+
+    def save(
+        self,
+        run_id: str,
+        state: Dict[str, Any],
+        messages: Dict[str, List[Message]],
+        status: str = "running",
+    ) -> None:
+        """Write a checkpoint of a run's state and its agents' messages"""
+        with self._lock, self._conn:
+            for agent, agent_messages in messages.items():
+                self._save_messages(run_id, agent, agent_messages)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, status, state, updated_at) VALUES (?, ?, ?, ?)",
+                (run_id, status, json.dumps(state, default=str), time.time()),
+            )
+
+    def _save_messages(self, run_id: str, agent: str, messages: List[Message]):
+        saved = self._saved.get((run_id, agent))
+        start = 0
+        if saved is not None and len(saved) <= len(messages):
+            if all(a is b for a, b in zip(saved, messages)):
+                start = len(saved)
+        if start == 0:
+            self._conn.execute(
+                "DELETE FROM run_messages WHERE run_id = ? AND agent = ?",
+                (run_id, agent),
+            )
+        self._conn.executemany(
+            "INSERT INTO run_messages (run_id, agent, seq, message) VALUES (?, ?, ?, ?)",
+            [
+                (run_id, agent, seq, message.model_dump_json(exclude_none=True))
+                for seq, message in enumerate(messages[start:], start)
+            ],
+        )
+        self._saved[(run_id, agent)] = list(messages)
+
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Return ``{"status", "state", "messages"}`` of a run, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, state FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if not row:
+                return None
+            messages: Dict[str, List[Message]] = {}
+            for agent, message in self._conn.execute(
+                "SELECT agent, message FROM run_messages WHERE run_id = ? ORDER BY agent, seq",
+                (run_id,),
+            ):
+                messages.setdefault(agent, []).append(
+                    Message.model_validate_json(message)
+                )
+        return {"status": row[0], "state": json.loads(row[1]), "messages": messages}
+
+    def mark_saved(self, run_id: str, agent: str, messages: List[Message]) -> None:
+        """Record restored messages as written so the next save appends"""
+        with self._lock:
+            self._saved[(run_id, agent)] = list(messages)
+
+    def latest(self, status: Optional[str] = None) -> Optional[str]:
+        """Id of the most recently checkpointed run"""
+        query = "SELECT run_id FROM runs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            row = self._conn.execute(
+                query + " ORDER BY updated_at DESC LIMIT 1", params
+            ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, run_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            self._conn.execute("DELETE FROM run_messages WHERE run_id = ?", (run_id,))
+            for key in [key for key in self._saved if key[0] == run_id]:
+                del self._saved[key]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,7 +1,7 @@
 import threading
 import tomllib
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -27,6 +27,18 @@ class LLMSettings(BaseModel):
     temperature: float = Field(1.0, description="Sampling temperature")
     api_type: str = Field(..., description="AzureOpenai or Openai")
     api_version: str = Field(..., description="Azure Openai version if AzureOpenai")
+    max_connections: int = Field(
+        100, description="Maximum concurrent HTTP connections per endpoint"
+    )
+    max_keepalive_connections: int = Field(
+        20, description="Maximum idle keep-alive connections per endpoint"
+    )
+    keepalive_expiry: float = Field(
+        30.0, description="Seconds an idle keep-alive connection is kept open"
+    )
+    http2: bool = Field(
+        False, description="Use HTTP/2 when the h2 package is installed"
+    )
 
 
 class ProxySettings(BaseModel):
@@ -37,11 +49,62 @@ class ProxySettings(BaseModel):
 
 class SearchSettings(BaseModel):
     engine: str = Field(default="Google", description="Search engine the llm to use")
+    hedge_delay: float = Field(
+        2.0, description="Seconds before also querying the next search engine"
+    )
+    cache_ttl: float = Field(300, description="Seconds search results stay cached")
+    cache_size: int = Field(256, description="Maximum cached search queries")
 
 
 class MCPSettings(BaseModel):
     server_url: Optional[str] = Field(None, description="Base URL of the MCP server")
     api_key: Optional[str] = Field(None, description="API key for MCP server")
+    sync_batch_interval: float = Field(
+        0.05, description="Seconds plan changes are collected before syncing"
+    )
+    sync_max_retries: int = Field(5, description="Retries for a failed plan sync")
+    sync_timeout: float = Field(5.0, description="Timeout of a plan sync request")
+
+
+class CacheSettings(BaseModel):
+    enabled: bool = Field(False, description="Cache LLM responses")
+    deterministic_only: bool = Field(
+        True, description="Only cache requests sent with temperature 0"
+    )
+    ttl: Optional[float] = Field(
+        86400, description="Seconds before a cached response expires"
+    )
+    max_memory_entries: int = Field(1024, description="In-memory LRU size")
+    disk: bool = Field(True, description="Also persist responses to SQLite")
+    path: Optional[str] = Field(None, description="SQLite cache file path")
+    max_disk_entries: int = Field(10000, description="Maximum cached rows on disk")
+
+
+class MemorySettings(BaseModel):
+    token_budget: Optional[int] = Field(
+        None, description="Token budget of an agent's message history"
+    )
+    compact_ratio: float = Field(
+        0.8, description="Share of the budget at which old messages are summarized"
+    )
+    keep_recent: int = Field(6, description="Recent messages never summarized")
+
+
+class PlanningSettings(BaseModel):
+    storage_type: Literal["memory", "json", "sqlite"] = Field(
+        "memory", description="Where the planning tool keeps plans"
+    )
+    storage_path: Optional[str] = Field(None, description="Plan file path")
+    flush_interval: Optional[float] = Field(
+        1.0, description="Seconds between background plan writes; unset writes through"
+    )
+
+
+class TracingSettings(BaseModel):
+    exporter: Literal["none", "json", "chrome"] = Field(
+        "none", description="Where spans go: nowhere, JSON lines or a Chrome trace"
+    )
+    path: Optional[str] = Field(None, description="Trace file path")
 
 
 class BrowserSettings(BaseModel):
@@ -77,6 +140,18 @@ class AppConfig(BaseModel):
     mcp_config: Optional[MCPSettings] = Field(
         None, description="MCP server configuration"
     )
+    cache_config: Optional[CacheSettings] = Field(
+        None, description="LLM response cache configuration"
+    )
+    memory_config: Optional[MemorySettings] = Field(
+        None, description="Agent memory configuration"
+    )
+    tracing_config: Optional[TracingSettings] = Field(
+        None, description="Span tracing configuration"
+    )
+    planning_config: Optional[PlanningSettings] = Field(
+        None, description="Plan storage configuration"
+    )
 
     class Config:
         arbitrary_types_allowed = True
@@ -134,6 +209,10 @@ class Config:
             "temperature": base_llm.get("temperature", 1.0),
             "api_type": base_llm.get("api_type", ""),
             "api_version": base_llm.get("api_version", ""),
+            "max_connections": base_llm.get("max_connections", 100),
+            "max_keepalive_connections": base_llm.get("max_keepalive_connections", 20),
+            "keepalive_expiry": base_llm.get("keepalive_expiry", 30.0),
+            "http2": base_llm.get("http2", False),
         }
 
         # handle browser config.
@@ -178,6 +257,20 @@ class Config:
         if "mcp" in raw_config:
             mcp_config = MCPSettings(**raw_config["mcp"]) if raw_config["mcp"] else None
 
+        cache_config = raw_config.get("cache", {})
+        cache_settings = CacheSettings(**cache_config) if cache_config else None
+
+        memory_config = raw_config.get("memory", {})
+        memory_settings = MemorySettings(**memory_config) if memory_config else None
+
+        tracing_config = raw_config.get("tracing", {})
+        tracing_settings = TracingSettings(**tracing_config) if tracing_config else None
+
+        planning_config = raw_config.get("planning", {})
+        planning_settings = (
+            PlanningSettings(**planning_config) if planning_config else None
+        )
+
         config_dict = {
             "llm": {
                 "default": default_settings,
@@ -189,6 +282,10 @@ class Config:
             "browser_config": browser_settings,
             "search_config": search_settings,
             "mcp_config": mcp_config,
+            "cache_config": cache_settings,
+            "memory_config": memory_settings,
+            "tracing_config": tracing_settings,
+            "planning_config": planning_settings,
         }
 
         self._config = AppConfig(**config_dict)
@@ -209,5 +306,21 @@ class Config:
     def mcp_config(self) -> Optional[MCPSettings]:
         return self._config.mcp_config
 
+    @property
+    def cache_config(self) -> Optional[CacheSettings]:
+        return self._config.cache_config
+
+    @property
+    def memory_config(self) -> Optional[MemorySettings]:
+        return self._config.memory_config
+
+    @property
+    def tracing_config(self) -> Optional[TracingSettings]:
+        return self._config.tracing_config
+
+    @property
+    def planning_config(self) -> Optional[PlanningSettings]:
+        return self._config.planning_config
+
 
 config = Config()
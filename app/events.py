@@ -0,0 +1,296 @@
+"""In-process event bus for pushing agent and flow progress to UIs."""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+)
+
+from app.logger import logger
+
+
+# Longest tool or step result carried in an event; subscribers only need a
+# preview, and full observations can hold file contents or credentials
+MAX_RESULT_CHARS = 500
+
+
+class EventType(str, Enum):
+    STEP_STARTED = "step_started"
+    STEP_FINISHED = "step_finished"
+    THOUGHT = "thought"
+    TOKEN = "token"
+    TOOL_CALLED = "tool_called"
+    TOOL_FINISHED = "tool_finished"
+    RUN_FINISHED = "run_finished"
+    PLAN_STEP_STARTED = "plan_step_started"
+    PLAN_STEP_FINISHED = "plan_step_finished"
+    FLOW_FINISHED = "flow_finished"
+
+
+@dataclass
+class Event:
+    type: EventType
+    source: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    seq: int = 0
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        event = asdict(self)
+        event["type"] = self.type.value
+        return event
+
+    def describe(self) -> Optional[str]:
+        """One-line summary for progress displays; None for token deltas"""
+        data = self.data
+        if self.type == EventType.STEP_STARTED:
+            return f"{self.source}: step {data['step']}/{data['max_steps']}"
+        if self.type == EventType.THOUGHT:
+            line = f"{self.source}: {data.get('content') or ''}".rstrip(": ")
+            if data.get("tools"):
+                line += f" -> {', '.join(data['tools'])}"
+            return line
+        if self.type == EventType.TOOL_CALLED:
+            return f"{self.source} called {data['tool']} {json.dumps(data.get('arguments'), default=str)[:200]}"
+        if self.type == EventType.TOOL_FINISHED:
+            return f"{data['tool']} finished in {data['seconds']}s"
+        if self.type == EventType.PLAN_STEP_STARTED:
+            return f"Plan step {data['step']} started: {data.get('text') or ''}".rstrip(
+                ": "
+            )
+        if self.type == EventType.PLAN_STEP_FINISHED:
+            return f"Plan step {data['step']} {data['status']}"
+        if self.type in (EventType.RUN_FINISHED, EventType.FLOW_FINISHED):
+            return f"{self.source} finished"
+        return None
+
+
+def preview(text: Any, limit: int = MAX_RESULT_CHARS) -> str:
+    """Shorten a result for an event payload"""
+    text = str(text)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text) - limit} more characters)"
+
+
+def format_sse(event: Event) -> str:
+    """Encode an event as a Server-Sent Events message"""
+    data = json.dumps(event.to_dict(), default=str)
+    return f"id: {event.seq}\nevent: {event.type.value}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """Queue of events delivered to one subscriber.
+
+    Iterate it from the event loop that created it. When the subscriber falls
+    more than ``maxsize`` events behind, the oldest ones are dropped so a slow
+    UI never holds back the agent.
+    """
+
+    def __init__(
+        self,
+        bus: "EventBus",
+        types: Optional[Iterable[EventType]] = None,
+        maxsize: int = 1000,
+    ):
+        self.bus = bus
+        self.types = {EventType(t) for t in types} if types else None
+        self.dropped = 0
+        self.closed = False
+        self._queue: Deque[Optional[Event]] = deque(maxlen=maxsize)
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+
+    def wants(self, event: Event) -> bool:
+        return self.types is None or event.type in self.types
+
+    def deliver(self, event: Optional[Event]) -> None:
+        """Queue an event; safe to call from any thread"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._put(event)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: Optional[Event]) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event, or None once closed or after ``timeout`` seconds"""
+        if not self._queue:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._queue.popleft() if self._queue else None
+
+    @property
+    def pending(self) -> int:
+        """Number of events waiting to be read"""
+        return len(self._queue)
+
+    def get_nowait(self) -> List[Event]:
+        """All queued events"""
+        events = [event for event in self._queue if event is not None]
+        self._queue.clear()
+        return events
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.bus.unsubscribe(self)
+            self.deliver(None)
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Event:
+        while not self.closed or self._queue:
+            event = await self.get()
+            if event is not None:
+                return event
+        raise StopAsyncIteration
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class EventBus:
+    """Publishes agent and flow events to async subscribers.
+
+    ``publish`` never blocks or awaits, so agents publish unconditionally
+    whether or not a UI is listening. Recent events are kept so a subscriber
+    that connects late (e.g. a reconnecting SSE client) can catch up.
+
+    Servers that run agents for several users give each run its own bus, so
+    subscribers only ever see the events of the run they follow.
+    """
+
+    def __init__(self, history: int = 200):
+        self._subscribers: List[Subscription] = []
+        self._handlers: List[Callable[[Event], None]] = []
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self.recent: Deque[Event] = deque(maxlen=history)
+
+    def subscribe(
+        self,
+        types: Optional[Iterable[EventType]] = None,
+        maxsize: int = 1000,
+        replay: bool = False,
+    ) -> Subscription:
+        """Subscribe from a running event loop, optionally to some event types"""
+        subscription = Subscription(self, types, maxsize)
+        with self._lock:
+            self._subscribers.append(subscription)
+            if replay:
+                for event in self.recent:
+                    if subscription.wants(event):
+                        subscription._put(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def close(self) -> None:
+        """End every subscription, e.g. once the run the bus serves is over"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.close()
+
+    def add_handler(self, handler: Callable[[Event], None]) -> None:
+        """Call ``handler`` synchronously for every event"""
+        with self._lock:
+            self._handlers.append(handler)
+
+    def remove_handler(self, handler: Callable[[Event], None]) -> None:
+        with self._lock:
+            if handler in self._handlers:
+                self._handlers.remove(handler)
+
+    def publish(self, event_type: EventType, source: str, **data) -> Event:
+        with self._lock:
+            event = Event(EventType(event_type), source, data, next(self._seq))
+            self.recent.append(event)
+            subscribers = list(self._subscribers)
+            handlers = list(self._handlers)
+        for subscription in subscribers:
+            if subscription.wants(event):
+                subscription.deliver(event)
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.warning(f"Event handler failed on {event.type.value}: {e}")
+        return event
+
+
+async def events_until(
+    subscription: Subscription, task: "asyncio.Future[Any]"
+) -> AsyncIterator[Event]:
+    """Yield events as they arrive until ``task`` is done, then the rest"""
+    while not task.done():
+        waiter = asyncio.ensure_future(subscription.get())
+        await asyncio.wait({waiter, task}, return_when=asyncio.FIRST_COMPLETED)
+        if not waiter.done():
+            waiter.cancel()
+            break
+        if waiter.result() is not None:
+            yield waiter.result()
+    for event in subscription.get_nowait():
+        yield event
+
+
+async def sse_stream(
+    bus: "EventBus",
+    types: Optional[Iterable[EventType]] = None,
+    heartbeat: float = 15.0,
+    replay: bool = False,
+) -> AsyncIterator[str]:
+    """Server-Sent Events body for a streaming HTTP response"""
+    with bus.subscribe(types, replay=replay) as subscription:
+        while True:
+            event = await subscription.get(timeout=heartbeat)
+            if event is not None:
+                yield format_sse(event)
+            elif subscription.closed:
+                return
+            else:
+                # comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+
+
+_default_bus: Optional[EventBus] = None
+
+
+def get_event_bus() -> EventBus:
+    """Return the process-wide event bus agents and flows publish to"""
+    global _default_bus
+    if _default_bus is None:
+        _default_bus = EventBus()
+    return _default_bus
@@ -2,13 +2,15 @@ from abc import ABC, abstractmethod
 from enum import Enum
 from typing import Dict, List, Optional, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.agent.base import BaseAgent
+from app.events import EventBus, EventType, get_event_bus
 
 
 class FlowType(str, Enum):
     PLANNING = "planning"
+    WORKFLOW = "workflow"
 
 
 class BaseFlow(BaseModel, ABC):
@@ -17,6 +19,8 @@ class BaseFlow(BaseModel, ABC):
     agents: Dict[str, BaseAgent]
     tools: Optional[List] = None
     primary_agent_key: Optional[str] = None
+    # Receives plan step events; agents publish their own on their buses
+    event_bus: EventBus = Field(default_factory=get_event_bus, exclude=True)
 
     class Config:
         arbitrary_types_allowed = True
@@ -49,6 +53,10 @@ class BaseFlow(BaseModel, ABC):
         """Get the primary agent for the flow"""
         return self.agents.get(self.primary_agent_key)
 
+    def publish_event(self, event_type: EventType, **data) -> None:
+        """Publish an event from this flow on its event bus"""
+        self.event_bus.publish(event_type, type(self).__name__, **data)
+
     def get_agent(self, key: str) -> Optional[BaseAgent]:
         """Get a specific agent by key"""
         return self.agents.get(key)
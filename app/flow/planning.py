@@ -1,15 +1,25 @@
+import asyncio
+import copy
 import json
+import re
 import time
 from typing import Dict, List, Optional, Union
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from app.agent.base import BaseAgent
+from app.checkpoint import CheckpointStore
+from app.events import EventType
 from app.flow.base import BaseFlow, PlanStepStatus
 from app.llm import LLM
 from app.logger import logger
 from app.schema import AgentState, Message, ToolChoice
 from app.tool import PlanningTool
+from app.tracing import get_tracer
+
+
+# Step type tag such as [SEARCH] or [CODE] at any position in the step text
+_STEP_TYPE_PATTERN = re.compile(r"\[([A-Z_]+)\]")
 
 
 class PlanningFlow(BaseFlow):
@@ -20,6 +30,19 @@ class PlanningFlow(BaseFlow):
     executor_keys: List[str] = Field(default_factory=list)
     active_plan_id: str = Field(default_factory=lambda: f"plan_{int(time.time())}")
     current_step_index: Optional[int] = None
+    # Steps shown on each side of the current one in step prompts
+    plan_window: int = 5
+    # Upper bound on steps running at once when the plan has dependencies
+    max_parallel_steps: int = 4
+    # Saves the run after every agent step so it can be resumed
+    checkpoint_store: Optional[CheckpointStore] = Field(default=None, exclude=True)
+
+    _input_text: str = PrivateAttr(default="")
+    _result: str = PrivateAttr(default="")
+    # agent key -> index of the plan step it is executing
+    _running_steps: Dict[str, int] = PrivateAttr(default_factory=dict)
+    # keeps checkpoints written in the order they were taken
+    _checkpoint_lock: asyncio.Lock = PrivateAttr(default_factory=asyncio.Lock)
 
     def __init__(
         self, agents: Union[BaseAgent, List[BaseAgent], Dict[str, BaseAgent]], **data
@@ -83,31 +106,145 @@ class PlanningFlow(BaseFlow):
                     )
                     return f"Failed to create plan for: {input_text}"
 
-            result = ""
-            while True:
-                # Get current step to execute
-                self.current_step_index, step_info = await self._get_current_step_info()
-
-                # Exit if no more steps or plan completed
-                if self.current_step_index is None:
-                    result += await self._finalize_plan()
-                    break
+            self._input_text = input_text
+            self._result = ""
+            self._attach_checkpoints()
+            return await self._execute_plan()
+        except Exception as e:
+            logger.error(f"Error in PlanningFlow: {str(e)}")
+            return f"Execution failed: {str(e)}"
 
-                # Execute current step with appropriate agent
-                step_type = step_info.get("type") if step_info else None
-                executor = self.get_executor(step_type)
-                step_result = await self._execute_step(executor, step_info)
-                result += step_result + "\n"
+    async def resume(self) -> str:
+        """Continue the run checkpointed under the active plan id.
 
-                # Check if agent wants to terminate
-                if hasattr(executor, "state") and executor.state == AgentState.FINISHED:
-                    break
+        Completed steps are not executed again, and an agent that was in the
+        middle of a step continues from its saved memory and step counter, so
+        no finished LLM call is replayed. Tools restore what their
+        ``snapshot`` keeps, such as the Bash working directory; live process
+        state is not saved, so Python session variables, Bash environment
+        variables and open browser pages start fresh.
+        """
+        if not self.checkpoint_store:
+            raise ValueError("Resuming requires a checkpoint store")
+        checkpoint = self.checkpoint_store.load(self.active_plan_id)
+        if not checkpoint:
+            raise ValueError(f"No checkpoint found for run {self.active_plan_id}")
+        state = checkpoint["state"]
+        if checkpoint["status"] == "completed":
+            return state["result"]
+
+        self._input_text = state["input"]
+        self._result = state["result"]
+        self.planning_tool.restore_plan(state["plan"])
+        for key, snapshot in state["agents"].items():
+            if key in self.agents:
+                messages = checkpoint["messages"].get(key, [])
+                self.agents[key].restore(snapshot, messages)
+                self.checkpoint_store.mark_saved(
+                    self.active_plan_id, key, self.agents[key].messages
+                )
+        self._attach_checkpoints()
+        logger.info(f"Resuming run {self.active_plan_id} from its last checkpoint")
 
-            return result
+        try:
+            running = {
+                key: index
+                for key, index in state["running"].items()
+                if key in self.agents
+            }
+            if self._has_dependencies():
+                # interrupted steps of a parallel run are started over
+                for index in running.values():
+                    self.planning_tool.set_step_status(
+                        self.active_plan_id, index, PlanStepStatus.NOT_STARTED.value
+                    )
+            else:
+                for key, index in running.items():
+                    executor = self.agents[key]
+                    self._running_steps[key] = index
+                    try:
+                        step_result = await executor.run()
+                    finally:
+                        self._running_steps.pop(key, None)
+                    await self._mark_step_completed(index)
+                    self._result += step_result + "\n"
+                    await self._save_checkpoint()
+                    if executor.state == AgentState.FINISHED:
+                        return await self._complete(self._result)
+            return await self._execute_plan()
         except Exception as e:
             logger.error(f"Error in PlanningFlow: {str(e)}")
             return f"Execution failed: {str(e)}"
 
+    async def _execute_plan(self) -> str:
+        """Run the remaining steps of the active plan."""
+        if self._has_dependencies():
+            return await self._complete(self._result + await self._execute_dag())
+
+        while True:
+            # Get current step to execute
+            self.current_step_index, step_info = await self._get_current_step_info()
+
+            # Exit if no more steps or plan completed
+            if self.current_step_index is None:
+                self._result += await self._finalize_plan()
+                break
+
+            # Execute current step with appropriate agent
+            step_type = step_info.get("type") if step_info else None
+            executor = self.get_executor(step_type)
+            step_result = await self._execute_step(executor, step_info)
+            self._result += step_result + "\n"
+            await self._save_checkpoint()
+
+            # Check if agent wants to terminate
+            if hasattr(executor, "state") and executor.state == AgentState.FINISHED:
+                break
+
+        return await self._complete(self._result)
+
+    def _attach_checkpoints(self) -> None:
+        if not self.checkpoint_store:
+            return
+        for agent in self.agents.values():
+            agent.step_callback = lambda _agent: self._save_checkpoint()
+
+    async def _save_checkpoint(self, status: str = "running") -> None:
+        """Write the run state to the checkpoint store, if there is one.
+
+        The state is copied on the event loop and written in a worker thread,
+        so the SQLite transaction does not block other agents or requests.
+        """
+        if not self.checkpoint_store:
+            return
+        if self.active_plan_id not in self.planning_tool.plans:
+            return
+        async with self._checkpoint_lock:
+            state = {
+                "input": self._input_text,
+                "result": self._result,
+                "plan": copy.deepcopy(self.planning_tool.plans[self.active_plan_id]),
+                "running": dict(self._running_steps),
+                "agents": {key: agent.snapshot() for key, agent in self.agents.items()},
+            }
+            messages = {key: list(agent.messages) for key, agent in self.agents.items()}
+            try:
+                await asyncio.to_thread(
+                    self.checkpoint_store.save,
+                    self.active_plan_id,
+                    state,
+                    messages,
+                    status=status,
+                )
+            except Exception as e:
+                logger.warning(f"Failed to checkpoint run {self.active_plan_id}: {e}")
+
+    async def _complete(self, result: str) -> str:
+        self._result = result
+        await self._save_checkpoint(status="completed")
+        self.publish_event(EventType.FLOW_FINISHED, plan_id=self.active_plan_id)
+        return result
+
     async def _execute_simple_task(self, input_text: str) -> str:
         """Handle simple tasks directly without detailed planning."""
         try:
@@ -182,9 +319,20 @@ class PlanningFlow(BaseFlow):
             }
         )
 
+    def _get_step_info(self, index: int) -> dict:
+        """Build the info dict for a step, including its type tag if any."""
+        step = self.planning_tool.plans[self.active_plan_id]["steps"][index]
+        step_info = {"text": step}
+
+        # Try to extract step type from the text (e.g., [SEARCH] or [CODE])
+        type_match = _STEP_TYPE_PATTERN.search(step)
+        if type_match:
+            step_info["type"] = type_match.group(1).lower()
+        return step_info
+
     async def _get_current_step_info(self) -> tuple[Optional[int], Optional[dict]]:
         """
-        Parse the current plan to identify the first non-completed step's index and info.
+        Look up the first non-completed step's index and info from the plan's progress index.
         Returns (None, None) if no active step is found.
         """
         if (
@@ -195,62 +343,36 @@ class PlanningFlow(BaseFlow):
             return None, None
 
         try:
-            # Direct access to plan data from planning tool storage
-            plan_data = self.planning_tool.plans[self.active_plan_id]
-            steps = plan_data.get("steps", [])
-            step_statuses = plan_data.get("step_statuses", [])
-
-            # Find first non-completed step
-            for i, step in enumerate(steps):
-                if i >= len(step_statuses):
-                    status = PlanStepStatus.NOT_STARTED.value
-                else:
-                    status = step_statuses[i]
+            index = self.planning_tool.get_current_step(self.active_plan_id)
+            if index is None:
+                return None, None  # No active step found
 
-                if status in PlanStepStatus.get_active_statuses():
-                    # Extract step type/category if available
-                    step_info = {"text": step}
+            step_info = self._get_step_info(index)
 
-                    # Try to extract step type from the text (e.g., [SEARCH] or [CODE])
-                    import re
-
-                    type_match = re.search(r"\[([A-Z_]+)\]", step)
-                    if type_match:
-                        step_info["type"] = type_match.group(1).lower()
+            # Mark current step as in_progress
+            try:
+                self.planning_tool.set_step_status(
+                    self.active_plan_id, index, PlanStepStatus.IN_PROGRESS.value
+                )
+            except Exception as e:
+                logger.warning(f"Error marking step as in_progress: {e}")
 
-                    # Mark current step as in_progress
-                    try:
-                        await self.planning_tool.execute(
-                            command="mark_step",
-                            plan_id=self.active_plan_id,
-                            step_index=i,
-                            step_status=PlanStepStatus.IN_PROGRESS.value,
-                        )
-                    except Exception as e:
-                        logger.warning(f"Error marking step as in_progress: {e}")
-                        # Update step status directly if needed
-                        if i < len(step_statuses):
-                            step_statuses[i] = PlanStepStatus.IN_PROGRESS.value
-                        else:
-                            while len(step_statuses) < i:
-                                step_statuses.append(PlanStepStatus.NOT_STARTED.value)
-                            step_statuses.append(PlanStepStatus.IN_PROGRESS.value)
-
-                        plan_data["step_statuses"] = step_statuses
-
-                    return i, step_info
-
-            return None, None  # No active step found
+            return index, step_info
 
         except Exception as e:
             logger.warning(f"Error finding current step index: {e}")
             return None, None
 
-    async def _execute_step(self, executor: BaseAgent, step_info: dict) -> str:
+    async def _execute_step(
+        self, executor: BaseAgent, step_info: dict, step_index: Optional[int] = None
+    ) -> str:
         """Execute the current step with the specified agent using agent.run()."""
+        if step_index is None:
+            step_index = self.current_step_index
+
         # Prepare context for the agent with current plan status
-        plan_status = await self._get_plan_text()
-        step_text = step_info.get("text", f"Step {self.current_step_index}")
+        plan_status = self._get_plan_window_text()
+        step_text = step_info.get("text", f"Step {step_index}")
 
         # Create a prompt for the agent to execute the current step
         step_prompt = f"""
@@ -258,53 +380,132 @@ class PlanningFlow(BaseFlow):
         {plan_status}
 
         YOUR CURRENT TASK:
-        You are now working on step {self.current_step_index}: "{step_text}"
+        You are now working on step {step_index}: "{step_text}"
 
         Please execute this step using the appropriate tools. When you're done, provide a summary of what you accomplished.
         """
 
+        # Checkpoints taken while the agent runs record which step it is on
+        key = next((k for k, agent in self.agents.items() if agent is executor), None)
+        if key is not None:
+            self._running_steps[key] = step_index
+        self.publish_event(
+            EventType.PLAN_STEP_STARTED, step=step_index, text=step_text, agent=key
+        )
+
         # Use agent.run() to execute the step
+        status = "failed"
         try:
-            step_result = await executor.run(step_prompt)
+            with get_tracer().start_span(
+                "plan.step", plan_id=self.active_plan_id, step=step_index, agent=key
+            ):
+                step_result = await executor.run(step_prompt)
 
             # Mark the step as completed after successful execution
-            await self._mark_step_completed()
+            await self._mark_step_completed(step_index)
 
+            status = "completed"
             return step_result
         except Exception as e:
-            logger.error(f"Error executing step {self.current_step_index}: {e}")
-            return f"Error executing step {self.current_step_index}: {str(e)}"
+            logger.error(f"Error executing step {step_index}: {e}")
+            return f"Error executing step {step_index}: {str(e)}"
+        finally:
+            self._running_steps.pop(key, None)
+            self.publish_event(
+                EventType.PLAN_STEP_FINISHED, step=step_index, status=status, agent=key
+            )
 
-    async def _mark_step_completed(self) -> None:
+    async def _mark_step_completed(self, step_index: Optional[int] = None) -> None:
         """Mark the current step as completed."""
-        if self.current_step_index is None:
+        if step_index is None:
+            step_index = self.current_step_index
+        if step_index is None:
             return
 
         try:
-            # Mark the step as completed
-            await self.planning_tool.execute(
-                command="mark_step",
-                plan_id=self.active_plan_id,
-                step_index=self.current_step_index,
-                step_status=PlanStepStatus.COMPLETED.value,
+            self.planning_tool.set_step_status(
+                self.active_plan_id, step_index, PlanStepStatus.COMPLETED.value
             )
             logger.info(
-                f"Marked step {self.current_step_index} as completed in plan {self.active_plan_id}"
+                f"Marked step {step_index} as completed in plan {self.active_plan_id}"
             )
         except Exception as e:
             logger.warning(f"Failed to update plan status: {e}")
-            # Update step status directly in planning tool storage
-            if self.active_plan_id in self.planning_tool.plans:
-                plan_data = self.planning_tool.plans[self.active_plan_id]
-                step_statuses = plan_data.get("step_statuses", [])
 
-                # Ensure the step_statuses list is long enough
-                while len(step_statuses) <= self.current_step_index:
-                    step_statuses.append(PlanStepStatus.NOT_STARTED.value)
+    def _has_dependencies(self) -> bool:
+        """Whether the active plan declares dependencies between its steps."""
+        if self.active_plan_id not in self.planning_tool.plans:
+            return False
+        plan = self.planning_tool.plans[self.active_plan_id]
+        return any(plan.get("step_dependencies") or [])
 
-                # Update the status
-                step_statuses[self.current_step_index] = PlanStepStatus.COMPLETED.value
-                plan_data["step_statuses"] = step_statuses
+    def _pick_executor(self, step_type: Optional[str], busy: set) -> Optional[str]:
+        """Choose an idle executor key for a step, or None if it has to wait."""
+        if step_type and step_type in self.agents:
+            return None if step_type in busy else step_type
+        for key in self.executor_keys or list(self.agents):
+            if key in self.agents and key not in busy:
+                return key
+        return None
+
+    async def _execute_dag(self) -> str:
+        """
+        Execute plan steps as their dependencies complete, running ready steps
+        concurrently on idle executors. Results are returned in step order.
+        """
+        limit = max(1, self.max_parallel_steps)
+        busy = set()
+        running: Dict[asyncio.Task, tuple[int, str]] = {}
+        results: Dict[int, str] = {}
+        started = set()
+        finished = False
+
+        while True:
+            if not finished:
+                for index in self.planning_tool.get_ready_steps(self.active_plan_id):
+                    if len(running) >= limit:
+                        break
+                    if index in started:
+                        continue
+                    step_info = self._get_step_info(index)
+                    key = self._pick_executor(step_info.get("type"), busy)
+                    if key is None:
+                        continue
+
+                    busy.add(key)
+                    started.add(index)
+                    self.planning_tool.set_step_status(
+                        self.active_plan_id, index, PlanStepStatus.IN_PROGRESS.value
+                    )
+                    task = asyncio.create_task(
+                        self._execute_step(self.agents[key], step_info, index)
+                    )
+                    running[task] = (index, key)
+
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, key = running.pop(task)
+                results[index] = task.result()
+                busy.discard(key)
+
+                # Steps that did not complete are blocked so they are not retried
+                plan = self.planning_tool.plans[self.active_plan_id]
+                if plan["step_statuses"][index] != PlanStepStatus.COMPLETED.value:
+                    self.planning_tool.set_step_status(
+                        self.active_plan_id, index, PlanStepStatus.BLOCKED.value
+                    )
+
+                # Check if agent wants to terminate
+                if self.agents[key].state == AgentState.FINISHED:
+                    finished = True
+
+        result = "".join(f"{results[index]}\n" for index in sorted(results))
+        if not finished:
+            result += await self._finalize_plan()
+        return result
 
     async def _get_plan_text(self) -> str:
         """Get the current plan as formatted text."""
@@ -317,6 +518,16 @@ class PlanningFlow(BaseFlow):
             logger.error(f"Error getting plan: {e}")
             return self._generate_plan_text_from_storage()
 
+    def _get_plan_window_text(self) -> str:
+        """Get a compact plan view around the current step for step prompts."""
+        try:
+            return self.planning_tool.render_plan(
+                self.active_plan_id, window=self.plan_window
+            )
+        except Exception as e:
+            logger.error(f"Error rendering plan: {e}")
+            return self._generate_plan_text_from_storage()
+
     def _generate_plan_text_from_storage(self) -> str:
         """Generate plan text directly from storage if the planning tool fails."""
         try:
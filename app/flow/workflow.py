@@ -0,0 +1,323 @@
+import asyncio
+import operator
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import Field
+
+from app.agent.base import BaseAgent
+from app.events import EventType
+from app.flow.base import BaseFlow
+from app.flow.workflow_loader import parse_workflow
+from app.logger import logger
+from app.template_registry import template_registry
+
+
+USER_REQUEST_TRIGGER = "user_request"
+
+_OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# "<step>.completed" or "<step>.<metric> <op> <number>"
+_CONDITION_PATTERN = re.compile(
+    r"^\s*(?P<step>[\w-]+)\.(?P<field>\w+)\s*"
+    r"(?:(?P<op><=|>=|==|!=|<|>)\s*(?P<value>-?\d+(?:\.\d+)?))?\s*$"
+)
+
+# Metrics are read from agent output written as "<name>: <number>"
+_METRIC_VALUE = r"\s*[:=]\s*(-?\d+(?:\.\d+)?)"
+
+
+@dataclass(frozen=True)
+class TriggerCondition:
+    """One clause of a step trigger, evaluated against an upstream step."""
+
+    step_id: str
+    field: str
+    op: Optional[str] = None
+    value: Optional[float] = None
+
+    def evaluate(self, state: Dict[str, Any]) -> bool:
+        if self.op is None:
+            return bool(state.get(self.field))
+        actual = state.get(self.field)
+        if not isinstance(actual, (int, float)):
+            return False
+        return _OPERATORS[self.op](actual, self.value)
+
+
+@dataclass
+class WorkflowStep:
+    id: str
+    agent: str
+    actions: List[Any] = field(default_factory=list)
+    conditions: List[TriggerCondition] = field(default_factory=list)
+
+    @property
+    def is_root(self) -> bool:
+        return not self.conditions
+
+
+@dataclass
+class CompiledWorkflow:
+    """A workflow definition turned into a dependency graph of steps."""
+
+    name: str
+    description: str
+    steps: Dict[str, WorkflowStep]
+    # step id -> ids of the steps whose trigger refers to it
+    dependents: Dict[str, List[str]]
+
+    @property
+    def roots(self) -> List[str]:
+        return [step.id for step in self.steps.values() if step.is_root]
+
+    def metrics_for(self, step_id: str) -> List[str]:
+        """Metric names that downstream triggers compare for a step"""
+        return list(
+            dict.fromkeys(
+                condition.field
+                for dependent in self.dependents[step_id]
+                for condition in self.steps[dependent].conditions
+                if condition.step_id == step_id and condition.op
+            )
+        )
+
+
+def parse_trigger(trigger: Any) -> List[TriggerCondition]:
+    """Parse a trigger expression into conditions that must all hold.
+
+    Supported forms are ``user_request``, ``<step>.completed`` and
+    ``<step>.<metric> <op> <number>``, optionally joined with ``and``.
+    """
+    if trigger is None:
+        return []
+    text = str(trigger).strip()
+    if not text or text == USER_REQUEST_TRIGGER:
+        return []
+
+    conditions = []
+    for clause in re.split(r"\s+and\s+", text):
+        match = _CONDITION_PATTERN.match(clause)
+        if not match:
+            raise ValueError(f"Unsupported workflow trigger: {trigger!r}")
+        value = match.group("value")
+        conditions.append(
+            TriggerCondition(
+                step_id=match.group("step"),
+                field=match.group("field"),
+                op=match.group("op"),
+                value=float(value) if value is not None else None,
+            )
+        )
+    return conditions
+
+
+def compile_workflow(definition: Dict[str, Any]) -> CompiledWorkflow:
+    """Validate a parsed workflow and build its step graph."""
+    steps: Dict[str, WorkflowStep] = {}
+    for raw in definition.get("steps") or []:
+        step_id = raw.get("id")
+        if not step_id:
+            raise ValueError("Workflow step without an id")
+        if step_id in steps:
+            raise ValueError(f"Duplicate workflow step id: {step_id}")
+        steps[step_id] = WorkflowStep(
+            id=step_id,
+            agent=raw.get("agent", ""),
+            actions=raw.get("actions") or [],
+            conditions=parse_trigger(raw.get("trigger")),
+        )
+
+    dependents: Dict[str, List[str]] = {step_id: [] for step_id in steps}
+    for step in steps.values():
+        for condition in step.conditions:
+            if condition.step_id not in steps:
+                raise ValueError(
+                    f"Step {step.id} is triggered by unknown step {condition.step_id}"
+                )
+            if step.id not in dependents[condition.step_id]:
+                dependents[condition.step_id].append(step.id)
+
+    # Reject cycles: every step has to be reachable from the roots in order
+    remaining = {
+        step.id: len({c.step_id for c in step.conditions}) for step in steps.values()
+    }
+    ready = [step_id for step_id, count in remaining.items() if count == 0]
+    visited = 0
+    while ready:
+        step_id = ready.pop()
+        visited += 1
+        for dependent in dependents[step_id]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if visited != len(steps):
+        raise ValueError("Workflow triggers contain a cycle")
+
+    return CompiledWorkflow(
+        name=definition.get("name", ""),
+        description=definition.get("description", ""),
+        steps=steps,
+        dependents=dependents,
+    )
+
+
+def _compile_document(data: Any) -> CompiledWorkflow:
+    return compile_workflow(parse_workflow(data))
+
+
+def load_compiled_workflow(path: str) -> CompiledWorkflow:
+    """Load and compile a workflow file, reusing the result until it changes."""
+    return template_registry.load(path, _compile_document)
+
+
+class WorkflowFlow(BaseFlow):
+    """A flow that executes a YAML workflow as an event-driven step graph.
+
+    Steps start as soon as their trigger holds: root steps on the user request
+    and the others when the steps they refer to complete. Triggers are only
+    re-evaluated for the dependents of a step that just finished, and steps on
+    independent branches run concurrently.
+    """
+
+    workflow_path: str
+    max_concurrency: int = 4
+    step_states: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+
+    def __init__(
+        self, agents: Union[BaseAgent, List[BaseAgent], Dict[str, BaseAgent]], **data
+    ):
+        if "workflow" in data:
+            data["workflow_path"] = data.pop("workflow")
+        super().__init__(agents, **data)
+
+    @property
+    def workflow(self) -> CompiledWorkflow:
+        return load_compiled_workflow(self.workflow_path)
+
+    def get_executor(self, agent_name: str) -> BaseAgent:
+        """Find the agent for a workflow step, falling back to the primary agent."""
+        if agent_name in self.agents:
+            return self.agents[agent_name]
+        normalized = re.sub(r"[-_]?agent$", "", agent_name).replace("-", "_")
+        for key, agent in self.agents.items():
+            if re.sub(r"[-_]?agent$", "", key).replace("-", "_") == normalized:
+                return agent
+        return self.primary_agent
+
+    async def execute(self, input_text: str) -> str:
+        """Execute the workflow for the given request."""
+        workflow = self.workflow
+        self.step_states = {}
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        agent_locks: Dict[int, asyncio.Lock] = {}
+        running: Dict[asyncio.Task, str] = {}
+
+        def start(step_id: str) -> None:
+            self.step_states[step_id] = {"status": "running"}
+            step = workflow.steps[step_id]
+            executor = self.get_executor(step.agent)
+            lock = agent_locks.setdefault(id(executor), asyncio.Lock())
+            running[
+                asyncio.create_task(
+                    self._run_step(
+                        step, executor, input_text, workflow, semaphore, lock
+                    )
+                )
+            ] = step_id
+
+        for step_id in workflow.roots:
+            start(step_id)
+
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step_id = running.pop(task)
+                self.step_states[step_id] = task.result()
+                # Only steps triggered by the one that changed need a look
+                for dependent in workflow.dependents[step_id]:
+                    if dependent in self.step_states:
+                        continue
+                    conditions = workflow.steps[dependent].conditions
+                    if all(
+                        self.step_states.get(c.step_id, {}).get("status")
+                        in {"completed", "failed"}
+                        for c in conditions
+                    ) and all(
+                        c.evaluate(self.step_states[c.step_id]) for c in conditions
+                    ):
+                        start(dependent)
+
+        for step_id in workflow.steps:
+            self.step_states.setdefault(step_id, {"status": "skipped"})
+        self.publish_event(EventType.FLOW_FINISHED, workflow=self.workflow_path)
+
+        return "\n".join(
+            f"[{step_id}] {self.step_states[step_id]['result']}"
+            for step_id in workflow.steps
+            if "result" in self.step_states[step_id]
+        )
+
+    async def _run_step(
+        self,
+        step: WorkflowStep,
+        executor: BaseAgent,
+        request: str,
+        workflow: CompiledWorkflow,
+        semaphore: asyncio.Semaphore,
+        lock: asyncio.Lock,
+    ) -> Dict[str, Any]:
+        metrics = workflow.metrics_for(step.id)
+        async with semaphore, lock:
+            prompt = self._build_prompt(step, request, metrics)
+            self.publish_event(
+                EventType.PLAN_STEP_STARTED, step=step.id, agent=executor.name
+            )
+            try:
+                result = await executor.run(prompt)
+            except Exception as e:
+                logger.error(f"Workflow step {step.id} failed: {e}")
+                self.publish_event(
+                    EventType.PLAN_STEP_FINISHED, step=step.id, status="failed"
+                )
+                return {"status": "failed", "result": f"Error: {e}"}
+            self.publish_event(
+                EventType.PLAN_STEP_FINISHED, step=step.id, status="completed"
+            )
+
+        state: Dict[str, Any] = {"status": "completed", "completed": True}
+        state["result"] = result
+        for metric in metrics:
+            values = re.findall(
+                rf"\b{re.escape(metric)}{_METRIC_VALUE}", result or "", re.IGNORECASE
+            )
+            if values:
+                state[metric] = float(values[-1])
+        return state
+
+    def _build_prompt(self, step: WorkflowStep, request: str, metrics: List[str]):
+        lines = [f"USER REQUEST:\n{request}", "", f"WORKFLOW STEP: {step.id}"]
+        if step.actions:
+            lines.append("ACTIONS:")
+            for action in step.actions:
+                if isinstance(action, dict):
+                    action = ", ".join(f"{k}: {v}" for k, v in action.items())
+                lines.append(f"- {action}")
+        for step_id in dict.fromkeys(c.step_id for c in step.conditions):
+            result = self.step_states.get(step_id, {}).get("result")
+            if result:
+                lines += ["", f"OUTPUT OF {step_id}:", result]
+        if metrics:
+            reported = ", ".join(
+                f"'{metric}: <number between 0 and 1>'" for metric in metrics
+            )
+            lines += ["", f"End your answer with {reported}."]
+        return "\n".join(lines)
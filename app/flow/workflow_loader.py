@@ -1,12 +1,21 @@
-from pathlib import Path
 from typing import Any, Dict
 
-import yaml
+from app.template_registry import template_registry
+
+
+def parse_workflow(data: Any) -> Dict[str, Any]:
+    """Validate a parsed workflow document and return its workflow section."""
+    if not isinstance(data, dict) or "workflow" not in data:
+        raise ValueError("Invalid workflow format")
+    return data["workflow"]
 
 
 def load_workflow(path: str) -> Dict[str, Any]:
     """Load a workflow definition from a YAML file.
 
+    Parsed workflows are cached until the file changes; treat the result as
+    read-only.
+
     Parameters
     ----------
     path: str
@@ -17,14 +26,4 @@ def load_workflow(path: str) -> Dict[str, Any]:
     dict
         Parsed workflow dictionary.
     """
-    file_path = Path(path)
-    if not file_path.exists():
-        raise FileNotFoundError(path)
-
-    with file_path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-
-    if not isinstance(data, dict) or "workflow" not in data:
-        raise ValueError("Invalid workflow format")
-
-    return data["workflow"]
+    return template_registry.load(path, parse_workflow)
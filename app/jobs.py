@@ -0,0 +1,411 @@
+"""SQLite-backed job queue and worker pool for batch flow runs."""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import WORKSPACE_ROOT
+from app.logger import logger
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+_COLUMNS = (
+    "job_id, prompt, options, status, result, error, worker, cancel_requested, "
+    "created_at, started_at, finished_at, lease_expires_at"
+)
+
+# Seconds a claimed job stays leased to its worker without a heartbeat
+DEFAULT_LEASE = 60.0
+
+
+class JobQueue:
+    """Durable queue of flow jobs shared by any number of worker processes.
+
+    Jobs are claimed inside ``BEGIN IMMEDIATE`` transactions, so two workers
+    never pick up the same job even when they run in different processes.
+    A claim leases the job to its worker for ``lease`` seconds, and the worker
+    renews the lease while the job runs. Jobs whose lease ran out because
+    their worker crashed or was killed go back to the queue on the next claim.
+    Each job records when it was queued, started and finished.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, lease: float = DEFAULT_LEASE):
+        self.db_path = db_path or str(WORKSPACE_ROOT / "jobs.db")
+        self.lease = lease
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        # autocommit mode; transactions are opened explicitly where needed
+        self._conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, prompt TEXT, options TEXT, status TEXT, result TEXT, error TEXT, worker TEXT, cancel_requested INTEGER DEFAULT 0, created_at REAL, started_at REAL, finished_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "lease_expires_at" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires_at REAL")
+                # give jobs running from before leases existed one lease to finish
+                self._conn.execute(
+                    "UPDATE jobs SET lease_expires_at = ? WHERE status = ?",
+                    (time.time() + lease, JobStatus.RUNNING.value),
+                )
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["options"] = json.loads(job["options"] or "{}")
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        started, finished = job["started_at"], job["finished_at"]
+        job["queue_seconds"] = started - job["created_at"] if started else None
+        job["run_seconds"] = finished - started if started and finished else None
+        return job
+
+    def submit(self, prompt: str, **options) -> str:
+        """Queue a prompt; options such as ``workflow`` or ``timeout`` go to the runner"""
+        job_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, prompt, options, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    prompt,
+                    json.dumps(options),
+                    JobStatus.QUEUED.value,
+                    time.time(),
+                ),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status, result and timings of a job"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(
+        self, status: Optional[JobStatus] = None, limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        query = f"SELECT {_COLUMNS} FROM jobs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (JobStatus(status).value,)
+        with self._lock:
+            rows = self._conn.execute(
+                query + " ORDER BY created_at DESC LIMIT ?", params + (limit,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {status.value: 0 for status in JobStatus} | dict(
+            (row[0], row[1]) for row in rows
+        )
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job, or ask the worker running it to stop"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+                (
+                    JobStatus.CANCELLED.value,
+                    time.time(),
+                    job_id,
+                    JobStatus.QUEUED.value,
+                ),
+            )
+            if cursor.rowcount:
+                return True
+            cursor = self._conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status = ?",
+                (job_id, JobStatus.RUNNING.value),
+            )
+            return bool(cursor.rowcount)
+
+    def claim(self, worker: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """Atomically move up to ``limit`` of the oldest queued jobs to running.
+
+        Jobs whose lease has expired are requeued first, so they can be
+        claimed again in the same call.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_expired(time.time())
+                rows = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE status = ? ORDER BY created_at LIMIT ?",
+                    (JobStatus.QUEUED.value, limit),
+                ).fetchall()
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE jobs SET status = ?, worker = ?, started_at = ?, lease_expires_at = ? WHERE job_id = ?",
+                    [
+                        (
+                            JobStatus.RUNNING.value,
+                            worker,
+                            now,
+                            now + self.lease,
+                            row["job_id"],
+                        )
+                        for row in rows
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        jobs = []
+        for row in rows:
+            job = self._to_dict(row)
+            job.update(
+                status=JobStatus.RUNNING.value,
+                worker=worker,
+                started_at=now,
+                lease_expires_at=now + self.lease,
+            )
+            jobs.append(job)
+        return jobs
+
+    def renew(self, worker: str, job_ids: List[str]) -> int:
+        """Extend the leases of jobs the worker is still running"""
+        if not job_ids:
+            return 0
+        placeholders = ", ".join("?" for _ in job_ids)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET lease_expires_at = ? WHERE worker = ? AND status = ? AND job_id IN ({placeholders})",
+                (time.time() + self.lease, worker, JobStatus.RUNNING.value, *job_ids),
+            )
+        return cursor.rowcount
+
+    def _requeue_expired(self, now: float) -> int:
+        # jobs asked to stop are not worth running again
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ?, lease_expires_at = NULL WHERE status = ? AND lease_expires_at < ? AND cancel_requested = 1",
+            (
+                JobStatus.CANCELLED.value,
+                now,
+                "Worker lost",
+                JobStatus.RUNNING.value,
+                now,
+            ),
+        )
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, worker = NULL, started_at = NULL, lease_expires_at = NULL WHERE status = ? AND lease_expires_at < ?",
+            (JobStatus.QUEUED.value, JobStatus.RUNNING.value, now),
+        )
+        if cursor.rowcount:
+            logger.warning(
+                f"Requeued {cursor.rowcount} job(s) whose worker stopped renewing its lease"
+            )
+        return cursor.rowcount
+
+    def requeue_expired(self) -> int:
+        """Put running jobs whose lease has expired back in the queue"""
+        with self._lock:
+            return self._requeue_expired(time.time())
+
+    def cancel_requested(self, job_ids: List[str]) -> List[str]:
+        """Which of the given running jobs have been asked to stop"""
+        if not job_ids:
+            return []
+        placeholders = ", ".join("?" for _ in job_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT job_id FROM jobs WHERE cancel_requested = 1 AND job_id IN ({placeholders})",
+                job_ids,
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires_at = NULL WHERE job_id = ?",
+                (JobStatus(status).value, result, error, time.time(), job_id),
+            )
+
+    def requeue(self, worker: str, job_id: Optional[str] = None) -> int:
+        """Put jobs a stopping worker still holds back in the queue.
+
+        Jobs of workers that died without stopping are handled by their
+        leases; see :meth:`requeue_expired`.
+        """
+        query = "UPDATE jobs SET status = ?, worker = NULL, started_at = NULL, lease_expires_at = NULL, cancel_requested = 0 WHERE worker = ? AND status = ?"
+        params: tuple = (JobStatus.QUEUED.value, worker, JobStatus.RUNNING.value)
+        if job_id:
+            query += " AND job_id = ?"
+            params += (job_id,)
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+        return cursor.rowcount
+
+    async def wait(
+        self, job_id: str, poll_interval: float = 0.5, timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Wait until a job has finished and return it"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if job["status"] in FINISHED_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise asyncio.TimeoutError(f"Job {job_id} is still {job['status']}")
+            await asyncio.sleep(poll_interval)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+JobRunner = Callable[[Dict[str, Any]], Awaitable[str]]
+
+
+async def run_flow_job(job: Dict[str, Any]) -> str:
+    """Run a job's prompt through a planning flow, or a workflow if given"""
+    from app.agent.manus import Manus
+    from app.flow.base import FlowType
+    from app.flow.flow_factory import FlowFactory
+
+    agents = {"manus": Manus()}
+    try:
+        workflow = job["options"].get("workflow")
+        if workflow:
+            flow = FlowFactory.create_flow(FlowType.WORKFLOW, agents, workflow=workflow)
+        else:
+            flow = FlowFactory.create_flow(
+                FlowType.PLANNING, agents, plan_id=f"job_{job['job_id']}"
+            )
+        return await flow.execute(job["prompt"])
+    finally:
+        # workers live long; do not leave browsers and shells behind per job
+        for agent in agents.values():
+            await agent.cleanup()
+
+
+class JobWorker:
+    """Runs up to ``concurrency`` queued jobs at a time in one process.
+
+    Start more processes with the same queue file to scale out. Jobs that
+    exceed their ``timeout`` option (default ``default_timeout``) fail, and
+    jobs cancelled while running are stopped at the next poll. The leases of
+    running jobs are renewed every third of the queue's lease.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        runner: JobRunner = run_flow_job,
+        concurrency: int = 4,
+        poll_interval: float = 0.5,
+        default_timeout: Optional[float] = 3600,
+        worker_id: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.runner = runner
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.default_timeout = default_timeout
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled: set = set()
+        self._renewed = time.monotonic()
+        self._stop = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop claiming jobs; running jobs are allowed to finish"""
+        self._stop.set()
+
+    async def run(self, until_idle: bool = False) -> None:
+        """Process jobs until stopped, or until the queue is empty"""
+        logger.info(
+            f"Worker {self.worker_id} started with concurrency {self.concurrency}"
+        )
+        try:
+            while not self._stop.is_set():
+                free = self.concurrency - len(self._running)
+                if free > 0:
+                    for job in self.queue.claim(self.worker_id, free):
+                        self._running[job["job_id"]] = asyncio.create_task(
+                            self._execute(job)
+                        )
+                if time.monotonic() - self._renewed >= self.queue.lease / 3:
+                    self.queue.renew(self.worker_id, list(self._running))
+                    self._renewed = time.monotonic()
+                for job_id in self.queue.cancel_requested(list(self._running)):
+                    if job_id not in self._cancelled:
+                        self._cancelled.add(job_id)
+                        self._running[job_id].cancel()
+                if until_idle and not self._running:
+                    break
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._running:
+                await asyncio.gather(*self._running.values(), return_exceptions=True)
+            logger.info(f"Worker {self.worker_id} stopped")
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        timeout = job["options"].get("timeout", self.default_timeout)
+        logger.info(f"Job {job_id} started")
+        try:
+            result = await asyncio.wait_for(self.runner(job), timeout)
+        except asyncio.CancelledError:
+            if job_id not in self._cancelled:
+                # the worker is shutting down; let another one pick it up
+                self.queue.requeue(self.worker_id, job_id)
+                logger.info(f"Job {job_id} returned to the queue")
+                raise
+            self.queue.finish(job_id, JobStatus.CANCELLED)
+            logger.info(f"Job {job_id} cancelled")
+        except asyncio.TimeoutError:
+            self.queue.finish(
+                job_id, JobStatus.FAILED, error=f"Timed out after {timeout} seconds"
+            )
+            logger.error(f"Job {job_id} timed out")
+        except Exception as e:
+            self.queue.finish(job_id, JobStatus.FAILED, error=str(e))
+            logger.error(f"Job {job_id} failed: {e}")
+        else:
+            self.queue.finish(job_id, JobStatus.SUCCEEDED, result=result)
+            logger.info(f"Job {job_id} succeeded")
+        finally:
+            self._running.pop(job_id, None)
+            self._cancelled.discard(job_id)
@@ -1,5 +1,13 @@
+import asyncio
+import hashlib
+import importlib.util
+import inspect
 import math
-from typing import Dict, List, Optional, Union
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 
 
 try:
@@ -13,13 +21,20 @@ try:  # pragma: no cover - optional dependency
         AsyncAzureOpenAI,
         AsyncOpenAI,
         AuthenticationError,
+        DefaultAsyncHttpxClient,
         OpenAIError,
         RateLimitError,
     )
+    from openai.types.chat import ChatCompletionMessage
 except Exception:  # pragma: no cover
-    APIError = (
-        AsyncAzureOpenAI
-    ) = AsyncOpenAI = AuthenticationError = OpenAIError = RateLimitError = object
+    APIError = AsyncAzureOpenAI = AsyncOpenAI = AuthenticationError = object
+    DefaultAsyncHttpxClient = OpenAIError = RateLimitError = object
+    ChatCompletionMessage = None
+
+try:  # pragma: no cover - optional dependency
+    import httpx
+except Exception:  # pragma: no cover
+    httpx = None
 from tenacity import (
     retry,
     retry_if_exception_type,
@@ -29,17 +44,23 @@ from tenacity import (
 
 from app.config import LLMSettings, config
 from app.exceptions import TokenLimitExceeded
+from app.llm_cache import ResponseCache, get_response_cache
 from app.logger import logger  # Assuming a logger is set up in your app
 from app.schema import (
     ROLE_VALUES,
     TOOL_CHOICE_TYPE,
     TOOL_CHOICE_VALUES,
+    Function,
     Message,
+    MessageTokenCache,
+    ToolCall,
     ToolChoice,
 )
+from app.tracing import current_span, traced
 
 
 REASONING_MODELS = ["o1", "o3-mini"]
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
 
 
 class TokenCounter:
@@ -54,8 +75,9 @@ class TokenCounter:
     HIGH_DETAIL_TARGET_SHORT_SIDE = 768
     TILE_SIZE = 512
 
-    def __init__(self, tokenizer):
+    def __init__(self, tokenizer, cache: Optional[MessageTokenCache] = None):
         self.tokenizer = tokenizer
+        self.cache = cache if cache is not None else MessageTokenCache()
 
     def count_text(self, text: str) -> int:
         """Calculate tokens for a text string"""
@@ -151,39 +173,314 @@ class TokenCounter:
                 token_count += self.count_text(function.get("arguments", ""))
         return token_count
 
+    def count_single_message(self, message: dict) -> int:
+        """Calculate tokens for one message, excluding the list format tokens"""
+        tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+
+        # Add role tokens
+        tokens += self.count_text(message.get("role", ""))
+
+        # Add content tokens
+        if "content" in message:
+            tokens += self.count_content(message["content"])
+
+        # Add tool calls tokens
+        if "tool_calls" in message:
+            tokens += self.count_tool_calls(message["tool_calls"])
+
+        # Add name and tool_call_id tokens
+        tokens += self.count_text(message.get("name", ""))
+        tokens += self.count_text(message.get("tool_call_id", ""))
+
+        return tokens
+
     def count_message_tokens(self, messages: List[dict]) -> int:
-        """Calculate the total number of tokens in a message list"""
+        """Calculate the total number of tokens in a message list
+
+        Per-message counts are cached, so only messages that have not been seen
+        before are run through the tokenizer.
+        """
         total_tokens = self.FORMAT_TOKENS  # Base format tokens
 
         for message in messages:
-            tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+            key = self.cache.key_for(message)
+            tokens = self.cache.get(key)
+            if tokens is None:
+                tokens = self.count_single_message(message)
+                self.cache.set(key, tokens)
+            total_tokens += tokens
 
-            # Add role tokens
-            tokens += self.count_text(message.get("role", ""))
+        return total_tokens
 
-            # Add content tokens
-            if "content" in message:
-                tokens += self.count_content(message["content"])
 
-            # Add tool calls tokens
-            if "tool_calls" in message:
-                tokens += self.count_tool_calls(message["tool_calls"])
+class TokenUsage:
+    """Input token accounting for a single LLM instance or session."""
 
-            # Add name and tool_call_id tokens
-            tokens += self.count_text(message.get("name", ""))
-            tokens += self.count_text(message.get("tool_call_id", ""))
+    def __init__(self, max_input_tokens: Optional[int] = None):
+        self.total_input_tokens = 0
+        self.max_input_tokens = max_input_tokens
 
-            total_tokens += tokens
+    def add(self, input_tokens: int) -> None:
+        self.total_input_tokens += input_tokens
 
-        return total_tokens
+    def within_limit(self, input_tokens: int) -> bool:
+        if self.max_input_tokens is None:
+            return True
+        return (self.total_input_tokens + input_tokens) <= self.max_input_tokens
+
+
+@dataclass
+class EndpointStats:
+    """Request counters for one pooled endpoint."""
+
+    max_connections: int
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    total_requests: int = 0
+    failed_requests: int = 0
+    total_seconds: float = 0.0
+
+    @property
+    def saturation(self) -> float:
+        """Fraction of the connection limit currently in use"""
+        if self.max_connections <= 0:
+            return 0.0
+        return self.in_flight / self.max_connections
+
+    def begin(self) -> float:
+        """Count a request as in flight; returns its start time for ``end``"""
+        self.in_flight += 1
+        self.total_requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return time.perf_counter()
+
+    def end(self, started: float, failed: bool = False) -> None:
+        self.in_flight -= 1
+        self.total_seconds += time.perf_counter() - started
+        if failed:
+            self.failed_requests += 1
+
+    @contextmanager
+    def track(self):
+        started = self.begin()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.end(started, failed)
+
+    def to_dict(self) -> dict:
+        completed = self.total_requests - self.in_flight
+        return {
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "total_requests": self.total_requests,
+            "failed_requests": self.failed_requests,
+            "saturation": round(self.saturation, 3),
+            "mean_latency_ms": (
+                round(self.total_seconds / completed * 1000, 3) if completed else None
+            ),
+        }
+
+
+class TrackedStream:
+    """A streamed completion that stays in flight until it is fully read.
+
+    The request is counted by its ``EndpointStats`` until the stream is
+    exhausted, fails, or is closed with ``aclose``.
+    """
+
+    def __init__(self, stream: Any, stats: EndpointStats, started: float):
+        self._stream = stream
+        self._stats = stats
+        self._started = started
+        self._done = False
+
+    def __aiter__(self) -> "TrackedStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._end(False)
+            raise
+        except asyncio.CancelledError:
+            self._end(False)
+            raise
+        except Exception:
+            self._end(True)
+            raise
+
+    def _end(self, failed: bool) -> None:
+        if not self._done:
+            self._done = True
+            self._stats.end(self._started, failed)
+
+    async def aclose(self) -> None:
+        """Stop reading; closes the underlying response if it is still open"""
+        finished = self._done
+        self._end(False)
+        close = getattr(self._stream, "close", None) or getattr(
+            self._stream, "aclose", None
+        )
+        if close is not None and not finished:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+
+class LLMPool:
+    """Owns one tuned HTTP connection pool per LLM endpoint.
+
+    Every ``LLM`` instance obtains its client here, so instances that talk to
+    the same endpoint share keep-alive connections instead of each opening its
+    own default-sized pool. ``get_llm`` hands out per-session LLM instances that
+    reuse the pooled client but keep their own ``TokenUsage``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple, Any] = {}
+        self._stats: Dict[Tuple, EndpointStats] = {}
+        self._sessions: Dict[Tuple[str, str], "LLM"] = {}
+
+    @staticmethod
+    def endpoint_key(settings: LLMSettings) -> Tuple:
+        return (
+            settings.api_type,
+            settings.base_url,
+            settings.api_key,
+            settings.api_version,
+        )
+
+    def _create_http_client(self, settings: LLMSettings):
+        if httpx is None or DefaultAsyncHttpxClient is object:
+            return None
+        http2 = settings.http2
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the h2 package is not installed")
+            http2 = False
+        return DefaultAsyncHttpxClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+        )
+
+    def _create_client(self, settings: LLMSettings):
+        if APIError is object:  # pragma: no cover - openai not installed
+            return None
+        http_client = self._create_http_client(settings)
+        if settings.api_type == "azure":
+            return AsyncAzureOpenAI(
+                base_url=settings.base_url,
+                api_key=settings.api_key,
+                api_version=settings.api_version,
+                http_client=http_client,
+            )
+        return AsyncOpenAI(
+            api_key=settings.api_key,
+            base_url=settings.base_url,
+            http_client=http_client,
+        )
+
+    def get_client(self, settings: LLMSettings) -> Tuple[Any, EndpointStats]:
+        """Return the shared client and its stats for the settings' endpoint"""
+        key = self.endpoint_key(settings)
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = self._create_client(settings)
+                self._stats[key] = EndpointStats(
+                    max_connections=settings.max_connections
+                )
+            return self._clients[key], self._stats[key]
+
+    def get_llm(
+        self,
+        config_name: str = "default",
+        session_id: Optional[str] = None,
+        llm_config: Optional[Dict[str, LLMSettings]] = None,
+    ) -> "LLM":
+        """Return an LLM for a session with its own token accounting.
+
+        Without a session id the process-wide instance for ``config_name`` is
+        returned, matching ``LLM(config_name)``.
+        """
+        if session_id is None:
+            return LLM(config_name, llm_config)
+        key = (config_name, session_id)
+        with self._lock:
+            llm = self._sessions.get(key)
+        if llm is None:
+            llm = LLM(config_name, llm_config, usage=TokenUsage())
+            with self._lock:
+                llm = self._sessions.setdefault(key, llm)
+        return llm
+
+    def release_session(self, session_id: str) -> None:
+        """Forget the per-session LLM instances for ``session_id``"""
+        with self._lock:
+            for key in [k for k in self._sessions if k[1] == session_id]:
+                del self._sessions[key]
+
+    @staticmethod
+    def endpoint_label(key: Tuple) -> str:
+        """Readable name of an endpoint key that does not reveal its API key"""
+        api_type, base_url, api_key, api_version = key
+        label = f"{api_type or 'openai'}:{base_url}"
+        if api_version:
+            label += f"@{api_version}"
+        if api_key:
+            # tells apart endpoints that differ only in credentials
+            label += f"#{hashlib.sha256(api_key.encode()).hexdigest()[:8]}"
+        return label
+
+    def metrics(self) -> Dict[str, dict]:
+        """Saturation and request counters per endpoint, and session counts"""
+        with self._lock:
+            return {
+                "endpoints": {
+                    self.endpoint_label(key): stats.to_dict()
+                    for key, stats in self._stats.items()
+                },
+                "sessions": {"active": len(self._sessions)},
+            }
+
+    async def aclose(self) -> None:
+        """Close every pooled client"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._stats.clear()
+        for client in clients:
+            if client is not None:
+                await client.close()
+
+
+llm_pool = LLMPool()
 
 
 class LLM:
     _instances: Dict[str, "LLM"] = {}
 
     def __new__(
-        cls, config_name: str = "default", llm_config: Optional[LLMSettings] = None
+        cls,
+        config_name: str = "default",
+        llm_config: Optional[LLMSettings] = None,
+        usage: Optional[TokenUsage] = None,
     ):
+        if usage is not None:
+            # Session-scoped instances are never shared
+            instance = super().__new__(cls)
+            instance.__init__(config_name, llm_config, usage)
+            return instance
         if config_name not in cls._instances:
             instance = super().__new__(cls)
             instance.__init__(config_name, llm_config)
@@ -191,7 +488,10 @@ class LLM:
         return cls._instances[config_name]
 
     def __init__(
-        self, config_name: str = "default", llm_config: Optional[LLMSettings] = None
+        self,
+        config_name: str = "default",
+        llm_config: Optional[LLMSettings] = None,
+        usage: Optional[TokenUsage] = None,
     ):
         if not hasattr(self, "client"):  # Only initialize if not already initialized
             llm_config = llm_config or config.llm
@@ -205,12 +505,16 @@ class LLM:
             self.base_url = llm_config.base_url
 
             # Add token counting related attributes
-            self.total_input_tokens = 0
-            self.max_input_tokens = (
+            max_input_tokens = (
                 llm_config.max_input_tokens
                 if hasattr(llm_config, "max_input_tokens")
                 else None
             )
+            if usage is None:
+                usage = TokenUsage(max_input_tokens)
+            elif usage.max_input_tokens is None:
+                usage.max_input_tokens = max_input_tokens
+            self.usage = usage
 
             # Initialize tokenizer
             if tiktoken:
@@ -225,21 +529,24 @@ class LLM:
                     {"encode": lambda _self, t: t.split() if t else []},
                 )()
 
-            if APIError is not object:
-                if self.api_type == "azure":
-                    self.client = AsyncAzureOpenAI(
-                        base_url=self.base_url,
-                        api_key=self.api_key,
-                        api_version=self.api_version,
-                    )
-                else:
-                    self.client = AsyncOpenAI(
-                        api_key=self.api_key, base_url=self.base_url
-                    )
-            else:  # pragma: no cover - openai not installed
-                self.client = None
+            self.client, self.endpoint_stats = llm_pool.get_client(llm_config)
 
             self.token_counter = TokenCounter(self.tokenizer)
+            self.response_cache: Optional[ResponseCache] = get_response_cache()
+            self.cache_deterministic_only = (
+                config.cache_config.deterministic_only if config.cache_config else True
+            )
+            # Token cost of tool schema lists, keyed by list identity. The list
+            # itself is kept alive so its id cannot be reused while cached.
+            self._tools_tokens_cache: Dict[int, tuple] = {}
+
+    @property
+    def total_input_tokens(self) -> int:
+        return self.usage.total_input_tokens
+
+    @property
+    def max_input_tokens(self) -> Optional[int]:
+        return self.usage.max_input_tokens
 
     def count_tokens(self, text: str) -> int:
         """Calculate the number of tokens in a text"""
@@ -250,20 +557,35 @@ class LLM:
     def count_message_tokens(self, messages: List[dict]) -> int:
         return self.token_counter.count_message_tokens(messages)
 
+    def count_tools_tokens(self, tools: Optional[List[dict]]) -> int:
+        """Calculate the number of tokens used by tool descriptions.
+
+        ``ToolCollection.to_params`` returns the same list until the collection
+        changes, so repeated calls with that list skip tokenization.
+        """
+        if not tools:
+            return 0
+        cached = self._tools_tokens_cache.get(id(tools))
+        if cached is not None and cached[0] is tools:
+            return cached[1]
+
+        tools_tokens = sum(self.count_tokens(str(tool)) for tool in tools)
+        if len(self._tools_tokens_cache) >= 32:
+            self._tools_tokens_cache.clear()
+        self._tools_tokens_cache[id(tools)] = (tools, tools_tokens)
+        return tools_tokens
+
     def update_token_count(self, input_tokens: int) -> None:
         """Update token counts"""
         # Only track tokens if max_input_tokens is set
-        self.total_input_tokens += input_tokens
+        self.usage.add(input_tokens)
         logger.info(
             f"Token usage: Input={input_tokens}, Cumulative Input={self.total_input_tokens}"
         )
 
     def check_token_limit(self, input_tokens: int) -> bool:
         """Check if token limits are exceeded"""
-        if self.max_input_tokens is not None:
-            return (self.total_input_tokens + input_tokens) <= self.max_input_tokens
-        # If max_input_tokens is not set, always return True
-        return True
+        return self.usage.within_limit(input_tokens)
 
     def get_limit_error_message(self, input_tokens: int) -> str:
         """Generate error message for token limit exceeded"""
@@ -275,6 +597,50 @@ class LLM:
 
         return "Token limit exceeded"
 
+    def enable_response_cache(
+        self, cache: Optional[ResponseCache], deterministic_only: bool = True
+    ) -> None:
+        """Attach a response cache to this instance, or detach it with None"""
+        self.response_cache = cache
+        self.cache_deterministic_only = deterministic_only
+
+    def _response_cache_key(
+        self,
+        messages: List[dict],
+        temperature: Optional[float],
+        tools: Optional[List[dict]] = None,
+        tool_choice: Optional[str] = None,
+        extra: Optional[dict] = None,
+    ) -> Optional[str]:
+        """Return the cache key for a request, or None if it must not be cached"""
+        if self.response_cache is None:
+            return None
+        temperature = temperature if temperature is not None else self.temperature
+        if self.cache_deterministic_only and temperature != 0:
+            return None
+        return ResponseCache.make_key(
+            self.model, messages, tools, tool_choice, temperature, extra
+        )
+
+    async def _create_completion(self, **params):
+        """Send a chat completion request through the pooled client.
+
+        Streamed responses come back as a ``TrackedStream`` so the request
+        counts as in flight until the stream has been read.
+        """
+        if not params.get("stream"):
+            with self.endpoint_stats.track():
+                return await self.client.chat.completions.create(**params)
+        started = self.endpoint_stats.begin()
+        try:
+            stream = await self.client.chat.completions.create(**params)
+        except BaseException as e:
+            self.endpoint_stats.end(
+                started, failed=not isinstance(e, asyncio.CancelledError)
+            )
+            raise
+        return TrackedStream(stream, self.endpoint_stats, started)
+
     @staticmethod
     def format_messages(messages: List[Union[dict, Message]]) -> List[dict]:
         """
@@ -369,6 +735,15 @@ class LLM:
                 # Raise a special exception that won't be retried
                 raise TokenLimitExceeded(error_message)
 
+            cache_key = self._response_cache_key(messages, temperature)
+            if cache_key:
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    logger.debug("Serving LLM response from cache")
+                    if stream:
+                        print(cached)
+                    return cached
+
             params = {
                 "model": self.model,
                 "messages": messages,
@@ -386,7 +761,7 @@ class LLM:
                 # Non-streaming request
                 params["stream"] = False
 
-                response = await self.client.chat.completions.create(**params)
+                response = await self._create_completion(**params)
 
                 if not response.choices or not response.choices[0].message.content:
                     raise ValueError("Empty or invalid response from LLM")
@@ -394,13 +769,17 @@ class LLM:
                 # Update token counts
                 self.update_token_count(response.usage.prompt_tokens)
 
+                if cache_key:
+                    await self.response_cache.aset(
+                        cache_key, response.choices[0].message.content
+                    )
                 return response.choices[0].message.content
 
             # Streaming request, For streaming, update estimated token count before making the request
             self.update_token_count(input_tokens)
 
             params["stream"] = True
-            response = await self.client.chat.completions.create(**params)
+            response = await self._create_completion(**params)
 
             collected_messages = []
             async for chunk in response:
@@ -413,6 +792,8 @@ class LLM:
             if not full_response:
                 raise ValueError("Empty response from streaming LLM")
 
+            if cache_key:
+                await self.response_cache.aset(cache_key, full_response)
             return full_response
 
         except TokenLimitExceeded:
@@ -536,7 +917,7 @@ class LLM:
 
             # Handle non-streaming request
             if not stream:
-                response = await self.client.chat.completions.create(**params)
+                response = await self._create_completion(**params)
 
                 if not response.choices or not response.choices[0].message.content:
                     raise ValueError("Empty or invalid response from LLM")
@@ -546,7 +927,7 @@ class LLM:
 
             # Handle streaming request
             self.update_token_count(input_tokens)
-            response = await self.client.chat.completions.create(**params)
+            response = await self._create_completion(**params)
 
             collected_messages = []
             async for chunk in response:
@@ -587,6 +968,7 @@ class LLM:
             (OpenAIError, Exception, ValueError)
         ),  # Don't retry TokenLimitExceeded
     )
+    @traced("llm.ask_tool")
     async def ask_tool(
         self,
         messages: List[Union[dict, Message]],
@@ -634,12 +1016,7 @@ class LLM:
             input_tokens = self.count_message_tokens(messages)
 
             # If there are tools, calculate token count for tool descriptions
-            tools_tokens = 0
-            if tools:
-                for tool in tools:
-                    tools_tokens += self.count_tokens(str(tool))
-
-            input_tokens += tools_tokens
+            input_tokens += self.count_tools_tokens(tools)
 
             # Check if token limits are exceeded
             if not self.check_token_limit(input_tokens):
@@ -653,6 +1030,20 @@ class LLM:
                     if not isinstance(tool, dict) or "type" not in tool:
                         raise ValueError("Each tool must be a dict with 'type' field")
 
+            cache_key = None
+            if ChatCompletionMessage is not None:
+                cache_key = self._response_cache_key(
+                    messages, temperature, tools, tool_choice, kwargs
+                )
+            span = current_span()
+            span.set_attributes(model=self.model, input_tokens=input_tokens)
+            if cache_key:
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    logger.debug("Serving LLM tool response from cache")
+                    span.set_attribute("cache_hit", True)
+                    return ChatCompletionMessage.model_validate(cached)
+
             # Set up the completion request
             params = {
                 "model": self.model,
@@ -671,7 +1062,7 @@ class LLM:
                     temperature if temperature is not None else self.temperature
                 )
 
-            response = await self.client.chat.completions.create(**params)
+            response = await self._create_completion(**params)
 
             # Check if response is valid
             if not response.choices or not response.choices[0].message:
@@ -680,7 +1071,16 @@ class LLM:
 
             # Update token counts
             self.update_token_count(response.usage.prompt_tokens)
+            span.set_attributes(
+                input_tokens=response.usage.prompt_tokens,
+                output_tokens=getattr(response.usage, "completion_tokens", None),
+                tool_calls=len(response.choices[0].message.tool_calls or []),
+            )
 
+            if cache_key:
+                await self.response_cache.aset(
+                    cache_key, response.choices[0].message.model_dump(mode="json")
+                )
             return response.choices[0].message
 
         except TokenLimitExceeded:
@@ -701,3 +1101,126 @@ class LLM:
         except Exception as e:
             logger.error(f"Unexpected error in ask_tool: {e}")
             raise
+
+    @traced("llm.ask_tool_stream")
+    async def ask_tool_stream(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]] = None,
+        timeout: int = 300,
+        tools: Optional[List[dict]] = None,
+        tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
+        temperature: Optional[float] = None,
+        **kwargs,
+    ) -> AsyncIterator[Union[str, ToolCall]]:
+        """
+        Stream a tool-enabled completion.
+
+        Content deltas are yielded as ``str`` while they arrive. Each tool call
+        is yielded as a ``ToolCall`` as soon as its arguments are complete,
+        which is when the model starts the next tool call or the stream ends,
+        so callers can start executing it before the rest is generated.
+
+        Unlike ``ask_tool`` this is not retried, since partial output may have
+        been consumed already.
+
+        Raises:
+            TokenLimitExceeded: If token limits are exceeded
+            ValueError: If tools, tool_choice, or messages are invalid
+            OpenAIError: If the API call fails
+        """
+        if tool_choice not in TOOL_CHOICE_VALUES:
+            raise ValueError(f"Invalid tool_choice: {tool_choice}")
+
+        if system_msgs:
+            messages = self.format_messages(system_msgs) + self.format_messages(
+                messages
+            )
+        else:
+            messages = self.format_messages(messages)
+
+        input_tokens = self.count_message_tokens(messages)
+        input_tokens += self.count_tools_tokens(tools)
+        if not self.check_token_limit(input_tokens):
+            raise TokenLimitExceeded(self.get_limit_error_message(input_tokens))
+
+        if tools:
+            for tool in tools:
+                if not isinstance(tool, dict) or "type" not in tool:
+                    raise ValueError("Each tool must be a dict with 'type' field")
+
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "tools": tools,
+            "tool_choice": tool_choice,
+            "timeout": timeout,
+            "stream": True,
+            **kwargs,
+        }
+        if self.model in REASONING_MODELS:
+            params["max_completion_tokens"] = self.max_tokens
+        else:
+            params["max_tokens"] = self.max_tokens
+            params["temperature"] = (
+                temperature if temperature is not None else self.temperature
+            )
+
+        # Streaming responses carry no usage, so record the estimate up front
+        self.update_token_count(input_tokens)
+        span = current_span()
+        span.set_attributes(model=self.model, input_tokens=input_tokens)
+        tool_calls = 0
+
+        try:
+            response = await self._create_completion(**params)
+        except OpenAIError as oe:
+            logger.error(f"OpenAI API error in ask_tool_stream: {oe}")
+            raise
+        try:
+            # Tool call fragments keyed by their index in the response
+            partial: Dict[int, dict] = {}
+            current_index: Optional[int] = None
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    yield delta.content
+
+                for call_delta in delta.tool_calls or []:
+                    index = call_delta.index
+                    if current_index is not None and index != current_index:
+                        finished = partial.pop(current_index, None)
+                        if finished:
+                            tool_calls += 1
+                            yield self._assemble_tool_call(finished, current_index)
+                    current_index = index
+
+                    entry = partial.setdefault(
+                        index, {"id": None, "name": "", "arguments": ""}
+                    )
+                    if call_delta.id:
+                        entry["id"] = call_delta.id
+                    if call_delta.function:
+                        entry["name"] += call_delta.function.name or ""
+                        entry["arguments"] += call_delta.function.arguments or ""
+
+            span.set_attribute("tool_calls", tool_calls + len(partial))
+            for index in sorted(partial):
+                yield self._assemble_tool_call(partial[index], index)
+        except OpenAIError as oe:
+            logger.error(f"OpenAI API error in ask_tool_stream: {oe}")
+            raise
+        finally:
+            # the caller may stop reading early; release the response then
+            close = getattr(response, "aclose", None)
+            if close is not None:
+                await close()
+
+    @staticmethod
+    def _assemble_tool_call(entry: dict, index: int) -> ToolCall:
+        return ToolCall(
+            id=entry["id"] or f"call_{index}",
+            function=Function(name=entry["name"], arguments=entry["arguments"]),
+        )
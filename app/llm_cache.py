@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import WORKSPACE_ROOT, CacheSettings, config
+from app.logger import logger
+
+
+# Disk hits whose accessed_at is written in one batch
+TOUCH_BATCH = 64
+# Seconds between sweeps of expired rows; reads skip expired rows regardless
+SWEEP_INTERVAL = 60.0
+
+
+class ResponseCache:
+    """Two-tier cache for LLM responses.
+
+    Lookups hit an in-memory LRU first and fall back to an optional SQLite
+    table on disk; disk hits are promoted back into memory. Both tiers expire
+    entries after ``ttl`` seconds and evict least recently used entries once
+    they grow past their size limit.
+
+    Async callers use ``aget`` and ``aset``, which run the SQLite tier in a
+    worker thread. Recency updates of disk hits are batched, and the row count
+    is kept in memory, so neither costs a write or a scan per call.
+    """
+
+    def __init__(
+        self,
+        max_memory_entries: int = 1024,
+        ttl: Optional[float] = 86400,
+        db_path: Optional[str] = None,
+        max_disk_entries: int = 10000,
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_rows = 0
+        self._touched: Dict[str, float] = {}
+        self._swept_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with closing(self._conn.cursor()) as c:
+                c.execute(
+                    "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, created_at REAL, accessed_at REAL)"
+                )
+                c.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)"
+                )
+                c.execute("SELECT COUNT(*) FROM responses")
+                self._disk_rows = c.fetchone()[0]
+                self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[dict],
+        tools: Optional[List[dict]] = None,
+        tool_choice: Optional[str] = None,
+        temperature: Optional[float] = None,
+        extra: Optional[dict] = None,
+    ) -> str:
+        """Build a stable key from the request inputs that determine the output"""
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "tools": tools,
+                "tool_choice": tool_choice,
+                "temperature": temperature,
+                "extra": extra or {},
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        found, value = self._memory_get(key)
+        if not found:
+            found, value = self._disk_get(key)
+        return self._count(found, value)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Like ``get``, with the disk lookup run off the event loop"""
+        found, value = self._memory_get(key)
+        if not found and self._conn is not None:
+            found, value = await asyncio.to_thread(self._disk_get, key)
+        return self._count(found, value)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value in both tiers"""
+        encoded = self._memory_set(key, value)
+        if encoded is not None:
+            self._disk_set(key, encoded)
+
+    async def aset(self, key: str, value: Any) -> None:
+        """Like ``set``, with the disk write run off the event loop"""
+        encoded = self._memory_set(key, value)
+        if encoded is not None:
+            await asyncio.to_thread(self._disk_set, key, encoded)
+
+    def _count(self, found: bool, value: Any) -> Optional[Any]:
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value if found else None
+
+    def _memory_get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return False, None
+            created_at, value = entry
+            if self._expired(created_at):
+                del self._memory[key]
+                return False, None
+            self._memory.move_to_end(key)
+            return True, value
+
+    def _memory_set(self, key: str, value: Any) -> Optional[str]:
+        """Remember a value; returns its encoding when it should go to disk"""
+        with self._lock:
+            self._remember(key, time.time(), value)
+        if self._conn is None:
+            return None
+        try:
+            return json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skipping disk cache for unserializable value: {e}")
+            return None
+
+    def _disk_get(self, key: str) -> Tuple[bool, Any]:
+        with self._db_lock:
+            if self._conn is None:
+                return False, None
+            with closing(self._conn.cursor()) as c:
+                c.execute("SELECT value, created_at FROM responses WHERE key=?", (key,))
+                row = c.fetchone()
+                if row is None:
+                    return False, None
+                value, created_at = row
+                if self._expired(created_at):
+                    c.execute("DELETE FROM responses WHERE key=?", (key,))
+                    self._disk_rows -= c.rowcount
+                    self._conn.commit()
+                    return False, None
+                self._touched[key] = time.time()
+                if len(self._touched) >= TOUCH_BATCH:
+                    self._write_touched(c)
+                    self._conn.commit()
+        value = json.loads(value)
+        with self._lock:
+            self._remember(key, created_at, value)
+            self.disk_hits += 1
+        return True, value
+
+    def _disk_set(self, key: str, encoded: str) -> None:
+        now = time.time()
+        with self._db_lock:
+            if self._conn is None:
+                return
+            with closing(self._conn.cursor()) as c:
+                self._touched.pop(key, None)
+                c.execute(
+                    "UPDATE responses SET value=?, created_at=?, accessed_at=? WHERE key=?",
+                    (encoded, now, now, key),
+                )
+                if not c.rowcount:
+                    c.execute(
+                        "INSERT INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                        (key, encoded, now, now),
+                    )
+                    self._disk_rows += 1
+                self._write_touched(c)
+                self._evict_disk(c, now)
+                self._conn.commit()
+
+    def _write_touched(self, cursor: sqlite3.Cursor) -> None:
+        if self._touched:
+            cursor.executemany(
+                "UPDATE responses SET accessed_at=? WHERE key=?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _remember(self, key: str, created_at: float, value: Any) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, cursor: sqlite3.Cursor, now: float) -> None:
+        if self.ttl is not None and now - self._swept_at >= SWEEP_INTERVAL:
+            self._swept_at = now
+            cursor.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+            )
+            self._disk_rows -= cursor.rowcount
+        excess = self._disk_rows - self.max_disk_entries
+        if excess > 0:
+            cursor.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self._disk_rows -= cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.misses = self.disk_hits = 0
+        with self._db_lock:
+            if self._conn is not None:
+                with closing(self._conn.cursor()) as c:
+                    c.execute("DELETE FROM responses")
+                    self._conn.commit()
+                self._disk_rows = 0
+                self._touched.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_rows,
+            }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                with closing(self._conn.cursor()) as c:
+                    self._write_touched(c)
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache(
+    settings: Optional[CacheSettings] = None,
+) -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None when caching is disabled"""
+    global _default_cache
+    settings = settings or config.cache_config
+    if not settings or not settings.enabled:
+        return None
+    if _default_cache is None:
+        db_path = None
+        if settings.disk:
+            db_path = settings.path or str(WORKSPACE_ROOT / "llm_cache.db")
+        _default_cache = ResponseCache(
+            max_memory_entries=settings.max_memory_entries,
+            ttl=settings.ttl,
+            db_path=db_path,
+            max_disk_entries=settings.max_disk_entries,
+        )
+    return _default_cache
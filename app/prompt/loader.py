@@ -1,20 +1,25 @@
-from pathlib import Path
 from typing import Any, Dict
 
-import yaml
+from app.template_registry import template_registry
 
 
-def load_prompt(path: str) -> Dict[str, Any]:
-    """Load a Parahelp SOP prompt specification from YAML."""
-    file_path = Path(path)
-    if not file_path.exists():
-        raise FileNotFoundError(path)
-    with file_path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+REQUIRED_FIELDS = {"role", "objective", "kpis", "output_format", "constraints"}
+
+
+def parse_prompt(data: Any) -> Dict[str, Any]:
+    """Validate a parsed Parahelp SOP prompt specification."""
     if not isinstance(data, dict):
         raise ValueError("Invalid prompt format")
-    required_fields = {"role", "objective", "kpis", "output_format", "constraints"}
-    missing = required_fields - data.keys()
+    missing = REQUIRED_FIELDS - data.keys()
     if missing:
         raise ValueError(f"Missing fields: {', '.join(missing)}")
     return data
+
+
+def load_prompt(path: str) -> Dict[str, Any]:
+    """Load a Parahelp SOP prompt specification from YAML.
+
+    Parsed specs are cached until the file changes; treat the result as
+    read-only.
+    """
+    return template_registry.load(path, parse_prompt)
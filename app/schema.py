@@ -1,7 +1,22 @@
+import asyncio
+import json
+from collections import OrderedDict
 from enum import Enum
-from typing import Any, List, Literal, Optional, Union
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Literal,
+    Optional,
+    Union,
+)
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from app.logger import logger
 
 
 class Role(str, Enum):
@@ -134,6 +149,72 @@ class Message(BaseModel):
         )
 
 
+class MessageTokenCache:
+    """Bounded LRU cache of per-message token counts.
+
+    Entries are keyed on the message content rather than the full serialized
+    message, so lookups for messages already in the conversation history are
+    cheap and only newly appended messages have to be tokenized.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(message: Union[dict, Message]) -> Hashable:
+        """Build a hashable cache key from a message or its dict form"""
+        if isinstance(message, Message):
+            message = message.to_dict()
+
+        content = message.get("content")
+        if content is not None and not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True, default=str)
+        tool_calls = message.get("tool_calls")
+        if tool_calls is not None:
+            tool_calls = tuple(
+                (
+                    call.get("id"),
+                    call.get("function", {}).get("name"),
+                    call.get("function", {}).get("arguments"),
+                )
+                for call in tool_calls
+            )
+
+        return (
+            message.get("role"),
+            content,
+            tool_calls,
+            message.get("name"),
+            message.get("tool_call_id"),
+        )
+
+    def get(self, key: Hashable) -> Optional[int]:
+        tokens = self._entries.get(key)
+        if tokens is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return tokens
+
+    def set(self, key: Hashable, tokens: int) -> None:
+        self._entries[key] = tokens
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class Memory(BaseModel):
     messages: List[Message] = Field(default_factory=list)
     max_messages: int = Field(default=100)
@@ -141,13 +222,24 @@ class Memory(BaseModel):
     def add_message(self, message: Message) -> None:
         """Add a message to memory"""
         self.messages.append(message)
-        # Optional: Implement message limit
-        if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+        self._trim()
 
     def add_messages(self, messages: List[Message]) -> None:
         """Add multiple messages to memory"""
         self.messages.extend(messages)
+        self._trim()
+
+    def _trim(self) -> List[Message]:
+        """Drop the oldest messages beyond ``max_messages`` in place"""
+        excess = len(self.messages) - self.max_messages
+        if excess <= 0:
+            return []
+        # tool results must not outlive the assistant message that called them
+        while excess < len(self.messages) - 1 and self.messages[excess].role == "tool":
+            excess += 1
+        removed = self.messages[:excess]
+        del self.messages[:excess]
+        return removed
 
     def clear(self) -> None:
         """Clear all messages"""
@@ -160,3 +252,250 @@ class Memory(BaseModel):
     def to_dict_list(self) -> List[dict]:
         """Convert messages to list of dicts"""
         return [msg.to_dict() for msg in self.messages]
+
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+SUMMARIZE_PROMPT = (
+    "Summarize the following part of an agent's conversation. Keep facts, "
+    "decisions, tool results and open questions needed to continue the task; "
+    "drop repetition and raw output. Reply with the summary only.\n\n"
+)
+
+
+def _is_summary(message: Message) -> bool:
+    return message.role == "user" and (message.content or "").startswith(SUMMARY_PREFIX)
+
+
+def _transcript(messages: List[Message]) -> str:
+    lines = []
+    for message in messages:
+        if message.tool_calls:
+            calls = ", ".join(
+                f"{call.function.name}({call.function.arguments})"
+                for call in message.tool_calls
+            )
+            lines.append(f"{message.role}: called {calls}")
+        if message.content:
+            label = f"{message.role} ({message.name})" if message.name else message.role
+            lines.append(f"{label}: {message.content}")
+    return "\n".join(lines)
+
+
+class TokenBudgetMemory(Memory):
+    """Memory that keeps its messages under a token budget.
+
+    The system messages and the first user message (the task) are anchors and
+    are never dropped. Once the history uses ``compact_ratio`` of the budget,
+    the messages older than the last ``keep_recent`` are summarized by the LLM
+    in a background task and replaced by one summary message. The summary is
+    a user message, since some providers reject system messages after the
+    start of the conversation. When the budget is exceeded before a summary is
+    ready, ``enforce_budget`` drops the oldest non-anchor messages, together
+    with the tool results that belong to them.
+
+    Token counts are kept per message and as a running total, so adding a
+    message only counts that message. Assigning ``messages`` directly is
+    detected and triggers a full recount.
+    """
+
+    max_messages: int = Field(default=10_000)
+    max_tokens: int = Field(..., description="Token budget of the messages")
+    compact_ratio: float = Field(default=0.8)
+    keep_recent: int = Field(default=6)
+    # (message) -> tokens, and async (messages) -> summary text
+    count_tokens: Optional[Callable[[Message], int]] = Field(default=None)
+    summarize: Optional[Callable[[List[Message]], Awaitable[str]]] = Field(default=None)
+    compactions: int = Field(default=0)
+
+    _compaction: Optional[asyncio.Task] = PrivateAttr(default=None)
+    _sizes: Dict[int, int] = PrivateAttr(default_factory=dict)
+    _total: int = PrivateAttr(default=0)
+    _counted: int = PrivateAttr(default=0)
+    _tracked: Optional[List[Message]] = PrivateAttr(default=None)
+
+    @classmethod
+    def for_llm(cls, llm: Any, **kwargs) -> "TokenBudgetMemory":
+        """Create a memory that counts tokens and summarizes with ``llm``"""
+
+        def count_tokens(message: Message) -> int:
+            return llm.count_message_tokens([message.to_dict()])
+
+        async def summarize(messages: List[Message]) -> str:
+            prompt = SUMMARIZE_PROMPT + _transcript(messages)
+            return await llm.ask([Message.user_message(prompt)], stream=False)
+
+        return cls(count_tokens=count_tokens, summarize=summarize, **kwargs)
+
+    def _tokens(self, message: Message) -> int:
+        if self.count_tokens:
+            return self.count_tokens(message)
+        # rough estimate without a tokenizer
+        return 4 + len(message.content or "") // 4
+
+    def total_tokens(self) -> int:
+        self._sync_tokens()
+        return self._total
+
+    def _sync_tokens(self) -> None:
+        """Recount everything if ``messages`` was changed behind our back"""
+        if self._tracked is self.messages and self._counted == len(self.messages):
+            return
+        self._sizes = {}
+        self._total = self._counted = 0
+        self._tracked = self.messages
+        self._count(self.messages)
+
+    def _count(self, messages: List[Message]) -> None:
+        for message in messages:
+            size = self._sizes.get(id(message))
+            if size is None:
+                size = self._sizes[id(message)] = self._tokens(message)
+            self._total += size
+            self._counted += 1
+
+    def _forget(self, messages: List[Message]) -> None:
+        for message in messages:
+            self._total -= self._sizes.pop(id(message), 0)
+            self._counted -= 1
+
+    def add_message(self, message: Message) -> None:
+        self.add_messages([message])
+
+    def add_messages(self, messages: List[Message]) -> None:
+        self._sync_tokens()
+        self.messages.extend(messages)
+        self._count(messages)
+        self._trim()
+
+    def clear(self) -> None:
+        super().clear()
+        self._sync_tokens()
+
+    def _is_anchor(self, index: int, first_user: Optional[int]) -> bool:
+        return self.messages[index].role == "system" or index == first_user
+
+    def _first_user_index(self) -> Optional[int]:
+        for index, message in enumerate(self.messages):
+            if message.role == "user" and not _is_summary(message):
+                return index
+        return None
+
+    def _trim(self) -> List[Message]:
+        removed = super()._trim()
+        self._forget(removed)
+        self._maybe_compact()
+        return removed
+
+    def enforce_budget(self, reserved_tokens: int = 0) -> int:
+        """Drop the oldest non-anchor messages until the history fits.
+
+        ``reserved_tokens`` is budget taken by the rest of the request, such as
+        system prompts and tool schemas. The latest message is always kept.
+        Returns the number of dropped messages.
+        """
+        budget = self.max_tokens - reserved_tokens
+        total = self.total_tokens()
+        sizes = [self._sizes[id(message)] for message in self.messages]
+        if total <= budget:
+            return 0
+
+        first_user = self._first_user_index()
+        keep = [True] * len(self.messages)
+        index = 0
+        last = len(self.messages) - 1
+        while total > budget and index < last:
+            if self._is_anchor(index, first_user) or not keep[index]:
+                index += 1
+                continue
+            keep[index] = False
+            total -= sizes[index]
+            if self.messages[index].tool_calls:
+                # its tool results are useless on their own
+                follower = index + 1
+                while follower < last and self.messages[follower].role == "tool":
+                    keep[follower] = False
+                    total -= sizes[follower]
+                    follower += 1
+            index += 1
+        # a tool result whose call was dropped would be rejected by the API
+        for index, message in enumerate(self.messages):
+            if message.role == "tool" and index < last:
+                previous = index - 1
+                while previous >= 0 and self.messages[previous].role == "tool":
+                    previous -= 1
+                if previous < 0 or not keep[previous]:
+                    keep[index] = False
+
+        self._forget([m for m, kept in zip(self.messages, keep) if not kept])
+        self.messages[:] = [m for m, kept in zip(self.messages, keep) if kept]
+        return keep.count(False)
+
+    def _compactable(self) -> List[Message]:
+        """Messages old enough to be folded into the summary"""
+        cut = len(self.messages) - self.keep_recent
+        # do not separate tool results from the call that produced them
+        while (
+            cut > 0 and cut < len(self.messages) and self.messages[cut].role == "tool"
+        ):
+            cut -= 1
+        first_user = self._first_user_index()
+        return [
+            self.messages[index]
+            for index in range(max(cut, 0))
+            if not self._is_anchor(index, first_user)
+        ]
+
+    def _maybe_compact(self) -> None:
+        if not self.summarize or (self._compaction and not self._compaction.done()):
+            return
+        if self.total_tokens() < self.max_tokens * self.compact_ratio:
+            return
+        batch = self._compactable()
+        if not batch or (len(batch) == 1 and _is_summary(batch[0])):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._compaction = loop.create_task(self._compact(batch))
+
+    async def compact(self) -> None:
+        """Summarize the compactable messages now, or wait for a running pass"""
+        if self._compaction and not self._compaction.done():
+            await self._compaction
+            return
+        batch = self._compactable()
+        if batch and self.summarize:
+            await self._compact(batch)
+
+    async def _compact(self, batch: List[Message]) -> None:
+        try:
+            summary_text = await self.summarize(batch)
+        except Exception as e:
+            logger.warning(f"Memory compaction failed: {e}")
+            return
+        summary = Message.user_message(SUMMARY_PREFIX + summary_text)
+        self._sync_tokens()
+
+        # messages may have been added or dropped while the LLM was busy
+        batch_ids = {id(message) for message in batch}
+        position = None
+        remaining = []
+        for message in self.messages:
+            if id(message) in batch_ids:
+                if position is None:
+                    position = len(remaining)
+                continue
+            remaining.append(message)
+        if position is None:
+            # everything in the batch was dropped in the meantime
+            first_user = next(
+                (i for i, m in enumerate(remaining) if m.role == "user"), None
+            )
+            position = first_user + 1 if first_user is not None else 0
+        remaining.insert(position, summary)
+        self._forget([m for m in self.messages if id(m) in batch_ids])
+        self._count([summary])
+        self.messages[:] = remaining
+        self.compactions += 1
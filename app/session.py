@@ -0,0 +1,269 @@
+"""Per-user agent sessions served from one shared event loop."""
+import asyncio
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.agent.base import BaseAgent
+from app.logger import logger
+from app.schema import AgentState
+
+
+def clone_agent(prototype: BaseAgent) -> BaseAgent:
+    """Copy a warm prototype agent for a new session.
+
+    The LLM client and configuration are shared with the prototype; memory,
+    execution state, tools and mutable containers are per copy. Tools that
+    keep state per ``session_id`` (such as ``PythonExecute``) get a new id, so
+    a user's variables persist across turns without reaching other users.
+    """
+    update: Dict[str, Any] = {
+        "memory": prototype.memory.model_copy(update={"messages": []}),
+        "state": AgentState.IDLE,
+        "current_step": 0,
+    }
+    tools = getattr(prototype, "available_tools", None)
+    if tools is not None:
+        update["available_tools"] = copy.deepcopy(tools)
+        for tool in update["available_tools"]:
+            if "session_id" in type(tool).model_fields:
+                tool.session_id = uuid.uuid4().hex
+    for name, value in prototype:
+        if name not in update and isinstance(value, (list, dict, set)):
+            update[name] = copy.copy(value)
+    return prototype.model_copy(update=update)
+
+
+async def release_session(session: Any) -> None:
+    """``on_evict`` callback that frees the resources of a session's agent"""
+    agent = getattr(session, "agent", session)
+    cleanup = getattr(agent, "cleanup", None)
+    if cleanup is not None:
+        await cleanup()
+
+
+def _memory_chars(session: Any) -> int:
+    """Approximate size of a session's conversation history in characters"""
+    agent = getattr(session, "agent", session)
+    messages = getattr(getattr(agent, "memory", None), "messages", None) or []
+    size = 0
+    for message in messages:
+        size += len(getattr(message, "content", None) or "")
+        for call in getattr(message, "tool_calls", None) or []:
+            size += len(call.function.arguments or "")
+    return size
+
+
+@dataclass
+class _Session:
+    value: Any
+    created_at: float
+    last_used: float
+    semaphore: asyncio.Semaphore
+    running: int = 0
+    runs: int = 0
+    waiting: int = 0
+
+
+class SessionManager:
+    """Isolated sessions created on demand and run on a shared event loop.
+
+    Each session gets its own object from ``factory`` (typically an agent
+    cloned from a warm prototype), so users never share memory. Requests run
+    on one event loop in a background thread; a session runs at most
+    ``max_concurrency_per_session`` requests at a time and later ones wait.
+    Sessions idle for longer than ``idle_ttl`` seconds are evicted, as are the
+    least recently used ones once there are more than ``max_sessions``.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_sessions: int = 100,
+        idle_ttl: Optional[float] = 1800,
+        max_concurrency_per_session: int = 1,
+        on_evict: Optional[Callable[[Any], Optional[Awaitable[None]]]] = None,
+    ):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_concurrency_per_session = max_concurrency_per_session
+        self.on_evict = on_evict
+        self.evicted = 0
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The shared loop, started on first use"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="session-loop", daemon=True
+                )
+                self._thread.start()
+                if self.idle_ttl:
+                    asyncio.run_coroutine_threadsafe(self._reap(), self._loop)
+            return self._loop
+
+    def get(self, session_id: str) -> Any:
+        """Return the object of a session, creating the session if needed"""
+        return self._entry(session_id).value
+
+    def peek(self, session_id: str) -> Optional[Any]:
+        """Return the object of a session without creating or touching it"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry.value if entry else None
+
+    def _entry(self, session_id: str) -> _Session:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry.last_used = now
+                self._sessions.move_to_end(session_id)
+                return entry
+            entry = _Session(
+                value=self.factory(),
+                created_at=now,
+                last_used=now,
+                semaphore=asyncio.Semaphore(self.max_concurrency_per_session),
+            )
+            self._sessions[session_id] = entry
+            logger.info(f"Session {session_id} created ({len(self._sessions)} active)")
+            self._evict(now)
+            return entry
+
+    def submit(
+        self, session_id: str, fn: Callable[[Any], Awaitable[Any]]
+    ) -> "Future[Any]":
+        """Schedule ``fn(session)`` on the shared loop"""
+        entry = self._entry(session_id)
+        return asyncio.run_coroutine_threadsafe(
+            self._run(session_id, entry, fn), self.loop
+        )
+
+    def run_sync(
+        self,
+        session_id: str,
+        fn: Callable[[Any], Awaitable[Any]],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Run ``fn(session)`` from a worker thread and wait for the result"""
+        return self.submit(session_id, fn).result(timeout)
+
+    async def arun(self, session_id: str, fn: Callable[[Any], Awaitable[Any]]):
+        """Run ``fn(session)`` on the shared loop from another event loop"""
+        return await asyncio.wrap_future(self.submit(session_id, fn))
+
+    async def _run(self, session_id: str, entry: _Session, fn) -> Any:
+        entry.waiting += 1
+        try:
+            await entry.semaphore.acquire()
+        finally:
+            entry.waiting -= 1
+        entry.running += 1
+        try:
+            with logger.contextualize(session_id=session_id):
+                return await fn(entry.value)
+        finally:
+            entry.running -= 1
+            entry.runs += 1
+            entry.last_used = time.monotonic()
+            entry.semaphore.release()
+
+    def _busy(self, entry: _Session) -> bool:
+        return bool(entry.running or entry.waiting)
+
+    def _evict(self, now: float) -> List[str]:
+        """Drop expired sessions and the least recently used beyond the limit"""
+        evicted = []
+        with self._lock:
+            if self.idle_ttl:
+                for session_id, entry in list(self._sessions.items()):
+                    if now - entry.last_used > self.idle_ttl and not self._busy(entry):
+                        evicted.append(session_id)
+            for session_id in evicted:
+                self._drop(session_id)
+            for session_id, entry in list(self._sessions.items()):
+                if len(self._sessions) <= self.max_sessions:
+                    break
+                if not self._busy(entry):
+                    self._drop(session_id)
+                    evicted.append(session_id)
+        return evicted
+
+    def _drop(self, session_id: str) -> None:
+        entry = self._sessions.pop(session_id)
+        self.evicted += 1
+        logger.info(f"Session {session_id} evicted")
+        if self.on_evict:
+            result = self.on_evict(entry.value)
+            if asyncio.iscoroutine(result):
+                asyncio.run_coroutine_threadsafe(result, self.loop)
+
+    def evict_idle(self) -> List[str]:
+        """Evict expired sessions now; returns their ids"""
+        return self._evict(time.monotonic())
+
+    def close(self, session_id: str) -> None:
+        """End a session, e.g. when its user logs out"""
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+
+    async def _reap(self) -> None:
+        interval = min(self.idle_ttl, 60)
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+    def stats(self) -> Dict[str, Any]:
+        """Active session counts and per-session memory usage"""
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._sessions.items())
+        return {
+            "active_sessions": len(entries),
+            "running_sessions": sum(1 for _, entry in entries if entry.running),
+            "evicted_sessions": self.evicted,
+            "sessions": {
+                session_id: {
+                    "running": entry.running,
+                    "waiting": entry.waiting,
+                    "runs": entry.runs,
+                    "idle_seconds": round(now - entry.last_used, 3),
+                    "memory_chars": _memory_chars(entry.value),
+                }
+                for session_id, entry in entries
+            },
+        }
+
+    def shutdown(self) -> None:
+        """Stop the shared loop and drop every session"""
+        with self._lock:
+            for session_id in list(self._sessions):
+                self._drop(session_id)
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._cancel_tasks(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join()
+            loop.close()
+
+    @staticmethod
+    async def _cancel_tasks() -> None:
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,182 @@
+"""Cache of parsed and validated YAML templates (workflows, prompt specs)."""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import yaml
+
+from app.config import PROJECT_ROOT
+from app.logger import logger
+
+
+# libyaml's C loader parses several times faster than the pure-Python one
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+TEMPLATE_DIRECTORIES = (
+    str(PROJECT_ROOT / "agent_templates"),
+    str(PROJECT_ROOT / "prompt_templates"),
+)
+
+TEMPLATE_SUFFIXES = (".yaml", ".yml")
+
+# A parser turns the YAML document into the cached value, raising on invalid
+# content so that broken templates are never cached
+Parser = Callable[[Any], Any]
+
+# (st_mtime_ns, st_size)
+Signature = Tuple[int, int]
+
+
+def _signature(path: str) -> Signature:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class TemplateRegistry:
+    """Parsed templates keyed on path and parser, reloaded when files change.
+
+    Lookups re-parse a file only when its mtime or size differs from the cached
+    copy. Files inside a watched directory are not even stat'ed on lookup: the
+    watcher thread polls them and reloads changed files in the background.
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, Parser], Tuple[Signature, Any]] = {}
+        self._lock = threading.RLock()
+        self._watched: List[str] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # path -> seconds spent reading and parsing it the last time
+        self.timings: Dict[str, float] = {}
+        self.stats = {"hits": 0, "loads": 0, "reloads": 0, "errors": 0}
+
+    def load(self, path: str, parser: Parser) -> Any:
+        """Return the parsed template at ``path``, loading it if needed"""
+        key = (os.path.abspath(path), parser)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and self._is_watched(key[0]):
+                self.stats["hits"] += 1
+                return cached[1]
+        signature = _signature(key[0])
+        if cached and cached[0] == signature:
+            with self._lock:
+                self.stats["hits"] += 1
+            return cached[1]
+        return self._load(key, signature)
+
+    def _load(self, key: Tuple[str, Parser], signature: Signature) -> Any:
+        path, parser = key
+        start = time.perf_counter()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = parser(yaml.load(f, Loader=SafeLoader))
+        except Exception:
+            with self._lock:
+                self._entries.pop(key, None)
+                self.stats["errors"] += 1
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._entries[key] = (signature, value)
+            self.timings[path] = elapsed
+            self.stats["loads"] += 1
+        logger.debug(f"Loaded template {path} in {elapsed * 1000:.2f} ms")
+        return value
+
+    def preload(self, directory: str, parser: Parser) -> Dict[str, Exception]:
+        """Load and validate every template in a directory up front.
+
+        Returns the templates that failed validation with their errors.
+        """
+        errors = {}
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(TEMPLATE_SUFFIXES):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                self.load(path, parser)
+            except Exception as e:
+                errors[path] = e
+        return errors
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop cached templates for one path, or all of them"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            path = os.path.abspath(path)
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+    def _is_watched(self, path: str) -> bool:
+        return any(path.startswith(directory + os.sep) for directory in self._watched)
+
+    def watch(
+        self, directories: Iterable[str] = TEMPLATE_DIRECTORIES, interval: float = 1.0
+    ) -> None:
+        """Poll ``directories`` and hot-reload cached templates that change"""
+        with self._lock:
+            for directory in directories:
+                directory = os.path.abspath(directory)
+                if directory not in self._watched:
+                    self._watched.append(directory)
+            if self._watcher and self._watcher.is_alive():
+                return
+            self._stop.clear()
+            self._watcher = threading.Thread(
+                target=self._watch_loop,
+                args=(interval,),
+                name="template-watcher",
+                daemon=True,
+            )
+            self._watcher.start()
+
+    def unwatch(self) -> None:
+        """Stop the watcher; lookups go back to checking mtimes"""
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join()
+            self._watcher = None
+        with self._lock:
+            self._watched = []
+
+    def _watch_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.poll()
+
+    def poll(self) -> List[str]:
+        """Reload cached templates whose files changed; returns their paths"""
+        with self._lock:
+            entries = [
+                (key, signature)
+                for key, (signature, _) in self._entries.items()
+                if self._is_watched(key[0])
+            ]
+        changed = []
+        for key, signature in entries:
+            try:
+                current = _signature(key[0])
+            except FileNotFoundError:
+                logger.info(f"Template {key[0]} was removed")
+                self.invalidate(key[0])
+                changed.append(key[0])
+                continue
+            if current == signature:
+                continue
+            try:
+                self._load(key, current)
+                with self._lock:
+                    self.stats["reloads"] += 1
+                logger.info(f"Reloaded template {key[0]}")
+            except Exception as e:
+                # evicted: the next lookup loads it again and raises the error
+                logger.error(f"Failed to reload template {key[0]}: {e}")
+            changed.append(key[0])
+        return changed
+
+
+template_registry = TemplateRegistry()
@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.config import WORKSPACE_ROOT
+from app.exceptions import ToolError
+from app.tool.base import BaseTool, ToolResult
+
+
+_ARTIFACT_ID = re.compile(r"^[0-9a-f]{16}$")
+
+
+class ArtifactStore:
+    """Content-addressed, gzip-compressed storage for large tool outputs.
+
+    Artifacts are named after the hash of their content, so storing the same
+    output twice writes it once. Recently read artifacts stay decompressed in
+    a small LRU so paging through one does not decompress it for every page.
+    """
+
+    def __init__(self, root: Optional[str] = None, cache_size: int = 4):
+        self.root = root or str(WORKSPACE_ROOT / "artifacts")
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+
+    def _path(self, artifact_id: str) -> str:
+        if not _ARTIFACT_ID.match(artifact_id or ""):
+            raise ToolError(f"Invalid artifact id: {artifact_id}")
+        return os.path.join(self.root, f"{artifact_id}.txt.gz")
+
+    def put(self, content: str) -> str:
+        """Store content and return its artifact id"""
+        data = content.encode("utf-8")
+        artifact_id = hashlib.sha256(data).hexdigest()[:16]
+        path = self._path(artifact_id)
+        if not os.path.exists(path):
+            os.makedirs(self.root, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(gzip.compress(data, compresslevel=6))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return artifact_id
+
+    def get(self, artifact_id: str) -> str:
+        """Return the full content of an artifact"""
+        content = self._cache.get(artifact_id)
+        if content is not None:
+            self._cache.move_to_end(artifact_id)
+            return content
+        path = self._path(artifact_id)
+        if not os.path.exists(path):
+            raise ToolError(f"Artifact {artifact_id} not found")
+        with open(path, "rb") as f:
+            content = gzip.decompress(f.read()).decode("utf-8")
+        self._cache[artifact_id] = content
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return content
+
+    def read(self, artifact_id: str, offset: int = 0, limit: int = 4000):
+        """Return ``(chunk, total_length)`` for a character range of an artifact"""
+        content = self.get(artifact_id)
+        offset = max(offset, 0)
+        return content[offset : offset + max(limit, 1)], len(content)
+
+    def offload(self, content: str, preview_chars: int) -> Tuple[str, str]:
+        """Store content and return ``(artifact_id, preview)`` for the memory"""
+        artifact_id = self.put(content)
+        preview = content[:preview_chars]
+        remaining = len(content) - len(preview)
+        return artifact_id, (
+            f"{preview}\n... [{remaining} more characters stored as artifact "
+            f'{artifact_id}; call read_artifact with artifact_id="{artifact_id}" '
+            f"and offset={len(preview)} to read them]"
+        )
+
+
+_default_store: Optional[ArtifactStore] = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the shared artifact store under the workspace"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ArtifactStore()
+    return _default_store
+
+
+class ReadArtifact(BaseTool):
+    name: str = "read_artifact"
+    description: str = """Read part of a large tool output that was stored as an artifact.
+Long tool results are shortened to a preview that ends with an artifact id and the offset where the preview stops.
+Call this tool with that id and offset to page through the rest of the output."""
+    parameters: dict = {
+        "type": "object",
+        "properties": {
+            "artifact_id": {
+                "type": "string",
+                "description": "(required) The artifact id from the shortened tool result.",
+            },
+            "offset": {
+                "type": "integer",
+                "description": "(optional) Character offset to start reading from. Default is 0.",
+                "default": 0,
+            },
+            "limit": {
+                "type": "integer",
+                "description": "(optional) Maximum number of characters to return. Default is 1500.",
+                "default": 1500,
+            },
+        },
+        "required": ["artifact_id"],
+    }
+    parallel_safe: bool = True
+    # a page must reach the model whole, footer included, or paging breaks
+    offload_output: bool = False
+
+    store: Optional[ArtifactStore] = None
+
+    async def execute(
+        self, artifact_id: str, offset: int = 0, limit: int = 1500
+    ) -> ToolResult:
+        store = self.store or get_artifact_store()
+        chunk, total = store.read(artifact_id, offset, limit)
+        end = min(offset + len(chunk), total)
+        header = f"[artifact {artifact_id}: characters {offset}-{end} of {total}]"
+        if end < total:
+            footer = f"\n[more available: call read_artifact with offset={end}]"
+        else:
+            footer = "\n[end of artifact]"
+        return ToolResult(output=f"{header}\n{chunk}{footer}")
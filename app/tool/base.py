@@ -8,6 +8,12 @@ class BaseTool(ABC, BaseModel):
     name: str
     description: str
     parameters: Optional[dict] = None
+    # Whether calls may run concurrently with other parallel-safe tool calls.
+    # Tools with side effects or shared state (browser, files) must keep False.
+    parallel_safe: bool = False
+    # Whether agents may store long results as artifacts and keep a preview.
+    # Tools that already return pages of an artifact must keep their output.
+    offload_output: bool = True
 
     class Config:
         arbitrary_types_allowed = True
@@ -20,6 +26,16 @@ class BaseTool(ABC, BaseModel):
     async def execute(self, **kwargs) -> Any:
         """Execute the tool with given parameters."""
 
+    async def cleanup(self) -> None:
+        """Release processes, sessions or connections the tool holds."""
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """JSON-serializable state needed to resume the tool, if it has any."""
+        return None
+
+    def restore(self, snapshot: Dict[str, Any]) -> None:
+        """Restore state taken by ``snapshot``, e.g. when a run is resumed."""
+
     def to_param(self) -> Dict:
         """Convert tool to function call format."""
         return {
@@ -1,6 +1,10 @@
 import asyncio
+import codecs
+import inspect
 import os
-from typing import Optional
+import shlex
+import signal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
 from app.exceptions import ToolError
 from app.tool.base import BaseTool, CLIResult, ToolResult
@@ -12,6 +16,86 @@ _BASH_DESCRIPTION = """Execute a bash command in the terminal.
 * Timeout: If a command execution result says "Command timed out. Sending SIGINT to the process", the assistant should retry running the command in the background.
 """
 
+OutputCallback = Callable[[str], Union[None, Awaitable[None]]]
+
+
+class _StreamBuffer:
+    """Bounded buffer for one output stream of a bash session.
+
+    Chunks are fed as they arrive and scanned for the sentinel incrementally:
+    only the new bytes plus a short overlap with the previous chunk are
+    searched. The sentinel line may carry the command's exit status after the
+    sentinel, which is kept in ``status``. When the pending output grows past
+    ``max_bytes`` the oldest bytes are dropped and counted so the tail of a
+    huge output is kept.
+    """
+
+    def __init__(self, sentinel: bytes, max_bytes: int):
+        self.sentinel = sentinel
+        self.max_bytes = max_bytes
+        self.data = bytearray()
+        self.dropped = 0
+        self.done = asyncio.Event()
+        self.eof = False
+        self.result: Optional[Tuple[bytes, int]] = None
+        self.status: Optional[int] = None
+        self._scan_from = 0
+        self._streamed = 0
+
+    def reset(self) -> None:
+        if not self.eof:
+            self.done.clear()
+        self.result = None
+        self.status = None
+
+    def take(self) -> Tuple[bytes, int]:
+        """Consume the output pending without a sentinel, e.g. after a timeout."""
+        taken = (bytes(self.data), self.dropped)
+        self.data = bytearray()
+        self.dropped = 0
+        self._scan_from = self._streamed = 0
+        return taken
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Append a chunk and return the bytes that are safe to stream."""
+        self.data.extend(chunk)
+        index = self.data.find(self.sentinel, self._scan_from)
+        end = -1
+        if index != -1:
+            end = self.data.find(b"\n", index + len(self.sentinel))
+        if end != -1:
+            streamable = bytes(self.data[self._streamed : index])
+            self.result = (bytes(self.data[:index]), self.dropped)
+            status = bytes(self.data[index + len(self.sentinel) : end]).strip()
+            self.status = int(status) if status.lstrip(b"-").isdigit() else None
+            self.data = bytearray(self.data[end + 1 :])
+            self.dropped = 0
+            self._scan_from = self._streamed = 0
+            self.done.set()
+            return streamable
+
+        if index != -1:
+            # the rest of the sentinel line has not arrived yet
+            self._scan_from = index
+        else:
+            # keep enough of the tail to catch a sentinel split across chunks
+            self._scan_from = max(0, len(self.data) - len(self.sentinel) + 1)
+        streamable = bytes(self.data[self._streamed : self._scan_from])
+        self._streamed = self._scan_from
+
+        excess = len(self.data) - self.max_bytes
+        if excess > 0:
+            excess = min(excess, self._scan_from)
+            del self.data[:excess]
+            self.dropped += excess
+            self._scan_from -= excess
+            self._streamed -= excess
+        return streamable
+
+    def close(self) -> None:
+        self.eof = True
+        self.done.set()
+
 
 class _BashSession:
     """A session of a bash shell."""
@@ -20,37 +104,101 @@ class _BashSession:
     _process: asyncio.subprocess.Process
 
     command: str = "/bin/bash"
-    _output_delay: float = 0.2  # seconds
     _timeout: float = 120.0  # seconds
     _sentinel: str = "<<exit>>"
+    # seconds to wait for stderr's sentinel once stdout's has arrived
+    _stderr_grace: float = 0.2
+    _chunk_size: int = 64 * 1024
+    _max_output_bytes: int = 1024 * 1024
 
-    def __init__(self):
+    def __init__(self, output_callback: Optional[OutputCallback] = None):
         self._started = False
         self._timed_out = False
+        self._output_callback = output_callback
+        self._readers: List[asyncio.Task] = []
 
     async def start(self):
         if self._started:
             return
 
-        self._process = await asyncio.create_subprocess_shell(
+        # run bash itself rather than through ``sh -c``, so the process is the
+        # shell whose working directory ``cwd`` reports
+        self._process = await asyncio.create_subprocess_exec(
             self.command,
             preexec_fn=os.setsid,
-            shell=True,
             bufsize=0,
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
         )
 
+        sentinel = self._sentinel.encode()
+        self._stdout = _StreamBuffer(sentinel, self._max_output_bytes)
+        self._stderr = _StreamBuffer(sentinel, self._max_output_bytes)
+        self._readers = [
+            asyncio.create_task(
+                self._read_stream(self._process.stdout, self._stdout, stream=True)
+            ),
+            asyncio.create_task(
+                self._read_stream(self._process.stderr, self._stderr, stream=False)
+            ),
+        ]
+
         self._started = True
 
+    async def _read_stream(
+        self, reader: asyncio.StreamReader, buffer: _StreamBuffer, stream: bool
+    ) -> None:
+        """Consume a stream as data arrives until the shell closes it."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            while True:
+                chunk = await reader.read(self._chunk_size)
+                if not chunk:
+                    break
+                streamable = buffer.feed(chunk)
+                if stream and streamable and self._output_callback:
+                    text = decoder.decode(streamable)
+                    if text:
+                        result = self._output_callback(text)
+                        if inspect.isawaitable(result):
+                            await result
+        finally:
+            buffer.close()
+
+    def cwd(self) -> Optional[str]:
+        """Current directory of the shell, where the platform exposes it."""
+        if not self._started or self._process.returncode is not None:
+            return None
+        try:
+            return os.readlink(f"/proc/{self._process.pid}/cwd")
+        except OSError:
+            return None
+
     def stop(self):
         """Terminate the bash shell."""
         if not self._started:
             raise ToolError("Session has not started.")
+        for task in self._readers:
+            task.cancel()
         if self._process.returncode is not None:
             return
-        self._process.terminate()
+        # the shell runs in its own session, so signal the whole group to
+        # make sure the pipes close and the readers see EOF
+        try:
+            os.killpg(self._process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def _decode(buffer: _StreamBuffer) -> str:
+        data, dropped = buffer.result or buffer.take()
+        text = data.decode(errors="replace")
+        if text.endswith("\n"):
+            text = text[:-1]
+        if dropped:
+            text = f"[... {dropped} bytes truncated ...]\n" + text
+        return text
 
     async def run(self, command: str):
         """Execute a command in the bash shell."""
@@ -68,49 +216,52 @@ class _BashSession:
 
         # we know these are not None because we created the process with PIPEs
         assert self._process.stdin
-        assert self._process.stdout
-        assert self._process.stderr
 
-        # send command to the process
+        self._stdout.reset()
+        self._stderr.reset()
+
+        # send command to the process; the command is done once the sentinel
+        # with its exit status is on stdout. A sentinel is echoed on stderr
+        # first so its output can be told apart too, unless the command
+        # redirected the shell's stderr for good (e.g. ``exec 2>/dev/null``).
         self._process.stdin.write(
-            command.encode() + f"; echo '{self._sentinel}'\n".encode()
+            command.encode()
+            + (
+                f"; __status=$?; echo '{self._sentinel}' >&2;"
+                f' echo "{self._sentinel}$__status"\n'
+            ).encode()
         )
         await self._process.stdin.drain()
 
-        # read output from the process, until the sentinel is found
         try:
             async with asyncio.timeout(self._timeout):
-                while True:
-                    await asyncio.sleep(self._output_delay)
-                    # if we read directly from stdout/stderr, it will wait forever for
-                    # EOF. use the StreamReader buffer directly instead.
-                    output = (
-                        self._process.stdout._buffer.decode()
-                    )  # pyright: ignore[reportAttributeAccessIssue]
-                    if self._sentinel in output:
-                        # strip the sentinel and break
-                        output = output[: output.index(self._sentinel)]
-                        break
+                await self._stdout.done.wait()
         except asyncio.TimeoutError:
             self._timed_out = True
             raise ToolError(
                 f"timed out: bash has not returned in {self._timeout} seconds and must be restarted",
             ) from None
+        try:
+            async with asyncio.timeout(self._stderr_grace):
+                await self._stderr.done.wait()
+        except asyncio.TimeoutError:
+            pass
 
-        if output.endswith("\n"):
-            output = output[:-1]
-
-        error = (
-            self._process.stderr._buffer.decode()
-        )  # pyright: ignore[reportAttributeAccessIssue]
-        if error.endswith("\n"):
-            error = error[:-1]
-
-        # clear the buffers so that the next output can be read correctly
-        self._process.stdout._buffer.clear()  # pyright: ignore[reportAttributeAccessIssue]
-        self._process.stderr._buffer.clear()  # pyright: ignore[reportAttributeAccessIssue]
+        output = self._decode(self._stdout)
+        error = self._decode(self._stderr)
+        if self._stdout.result is None:
+            return ToolResult(
+                output=output,
+                system="tool must be restarted",
+                error=error or "bash exited before the command completed",
+            )
 
-        return CLIResult(output=output, error=error)
+        status = self._stdout.status
+        return CLIResult(
+            output=output,
+            error=error,
+            system=f"exit code {status}" if status else None,
+        )
 
 
 class Bash(BaseTool):
@@ -130,6 +281,24 @@ class Bash(BaseTool):
     }
 
     _session: Optional[_BashSession] = None
+    # Directory a restored tool changes to when its shell starts
+    _cwd: Optional[str] = None
+    # Receives stdout chunks while a command is still running
+    output_callback: Optional[OutputCallback] = None
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """The working directory; environment variables are not kept."""
+        cwd = (self._session and self._session.cwd()) or self._cwd
+        return {"cwd": cwd} if cwd else None
+
+    def restore(self, snapshot: Dict[str, Any]) -> None:
+        self._cwd = snapshot.get("cwd")
+
+    async def _start_session(self) -> None:
+        self._session = _BashSession(self.output_callback)
+        await self._session.start()
+        if self._cwd:
+            await self._session.run(f"cd {shlex.quote(self._cwd)}")
 
     async def execute(
         self, command: str | None = None, restart: bool = False, **kwargs
@@ -137,20 +306,24 @@ class Bash(BaseTool):
         if restart:
             if self._session:
                 self._session.stop()
-            self._session = _BashSession()
-            await self._session.start()
+            await self._start_session()
 
             return ToolResult(system="tool has been restarted.")
 
         if self._session is None:
-            self._session = _BashSession()
-            await self._session.start()
+            await self._start_session()
 
         if command is not None:
             return await self._session.run(command)
 
         raise ToolError("no command provided.")
 
+    async def cleanup(self) -> None:
+        """Terminate the bash shell, if one was started."""
+        if self._session:
+            self._session.stop()
+            self._session = None
+
 
 if __name__ == "__main__":
     bash = Bash()
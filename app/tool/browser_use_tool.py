@@ -94,6 +94,8 @@ class BrowserUseTool(BaseTool):
         },
     }
 
+    # All actions drive one shared browser context, so calls must never overlap
+    parallel_safe: bool = False
     lock: asyncio.Lock = Field(default_factory=asyncio.Lock)
     browser: Optional[BrowserUseBrowser] = Field(default=None, exclude=True)
     context: Optional[BrowserContext] = Field(default=None, exclude=True)
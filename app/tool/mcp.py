@@ -25,6 +25,8 @@ class MCPMarketplace(BaseTool):
         },
     }
 
+    parallel_safe: bool = True
+
     MARKET_URL: ClassVar[
         str
     ] = "https://raw.githubusercontent.com/modelcontextprotocol/servers/main/README.md"
@@ -57,6 +59,7 @@ class MCPServerTool(BaseTool):
         },
         "required": ["command"],
     }
+    parallel_safe: bool = True
 
     async def execute(self, command: str) -> ToolResult:
         if not config.mcp_config or not config.mcp_config.server_url:
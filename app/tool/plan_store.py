@@ -0,0 +1,426 @@
+"""Persistence backends for :class:`app.tool.planning.PlanningTool`."""
+import atexit
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+from collections.abc import MutableMapping
+from contextlib import closing
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.logger import logger
+
+
+# A coalesced mutation for one plan: (plan snapshot, step changes, deleted).
+# ``plan`` replaces the stored plan, ``steps`` maps a step index to its new
+# (status, notes) and ``deleted`` removes the plan.
+PlanOp = Tuple[Optional[Dict], Dict[int, Tuple[str, str]], bool]
+
+
+def _copy_plan(plan: Dict) -> Dict:
+    copy = {
+        "plan_id": plan["plan_id"],
+        "title": plan["title"],
+        "steps": list(plan["steps"]),
+        "step_statuses": list(plan["step_statuses"]),
+        "step_notes": list(plan["step_notes"]),
+    }
+    if plan.get("step_dependencies"):
+        copy["step_dependencies"] = [list(deps) for deps in plan["step_dependencies"]]
+    return copy
+
+
+class PlanStore:
+    """Base class for plan storage backends.
+
+    Backends receive batches of coalesced mutations through :meth:`apply`, so
+    a flush costs one file write or one transaction however many changes it
+    carries.
+    """
+
+    def load_all(self) -> MutableMapping:
+        return {}
+
+    def apply(self, ops: Dict[str, PlanOp]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JSONPlanStore(PlanStore):
+    """Stores all plans in a single JSON document written atomically."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._plans: Dict[str, Dict] = {}
+
+    def load_all(self) -> Dict[str, Dict]:
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._plans = json.load(f)
+            except Exception:
+                self._plans = {}
+        return {pid: _copy_plan(plan) for pid, plan in self._plans.items()}
+
+    def apply(self, ops: Dict[str, PlanOp]) -> None:
+        for plan_id, (plan, steps, deleted) in ops.items():
+            if deleted:
+                self._plans.pop(plan_id, None)
+                continue
+            if plan is not None:
+                self._plans[plan_id] = plan
+            stored = self._plans.get(plan_id)
+            if stored is None:
+                continue
+            for index, (status, notes) in steps.items():
+                stored["step_statuses"][index] = status
+                stored["step_notes"][index] = notes
+        self._write()
+
+    def _write(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".plans-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._plans, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+class LazyPlans(MutableMapping):
+    """Plan mapping that loads plans from a store on first access.
+
+    Only plan ids are read up front; each plan's steps are fetched the first
+    time it is looked up and kept in memory afterwards.
+    """
+
+    def __init__(self, store: "SQLitePlanStore"):
+        self._store = store
+        self._ids: Dict[str, None] = dict.fromkeys(store.plan_ids())
+        self._loaded: Dict[str, Dict] = {}
+
+    def __getitem__(self, plan_id: str) -> Dict:
+        if plan_id not in self._ids:
+            raise KeyError(plan_id)
+        plan = self._loaded.get(plan_id)
+        if plan is None:
+            plan = self._store.load_plan(plan_id)
+            if plan is None:
+                raise KeyError(plan_id)
+            self._loaded[plan_id] = plan
+        return plan
+
+    def __setitem__(self, plan_id: str, plan: Dict) -> None:
+        self._ids[plan_id] = None
+        self._loaded[plan_id] = plan
+
+    def __delitem__(self, plan_id: str) -> None:
+        del self._ids[plan_id]
+        self._loaded.pop(plan_id, None)
+
+    def __contains__(self, plan_id: object) -> bool:
+        return plan_id in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._ids))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def loaded(self) -> int:
+        """Number of plans currently held in memory"""
+        return len(self._loaded)
+
+    def summaries(self) -> Iterator[Tuple[str, str, int, int]]:
+        """Yield (plan_id, title, completed, total) without loading plans."""
+        stored = self._store.summaries()
+        for plan_id in self:
+            plan = self._loaded.get(plan_id)
+            if plan is None:
+                if plan_id in stored:
+                    yield (plan_id, *stored[plan_id])
+                continue
+            completed = plan["step_statuses"].count("completed")
+            yield plan_id, plan["title"], completed, len(plan["steps"])
+
+
+class SQLitePlanStore(PlanStore):
+    """Stores plans in SQLite with one row per step.
+
+    Plans live in ``plans`` and their steps in ``plan_steps`` keyed by
+    (plan_id, step_index), so ``mark_step`` updates a single row. Databases
+    written with the older single-table layout, which kept steps, statuses and
+    notes as JSON columns on ``plans``, are migrated on open.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_db()
+
+    def _init_db(self) -> None:
+        with self._lock, self._conn, closing(self._conn.cursor()) as c:
+            c.execute("PRAGMA table_info(plans)")
+            legacy = "steps" in {row[1] for row in c.fetchall()}
+            if legacy:
+                c.execute("ALTER TABLE plans RENAME TO plans_legacy")
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS plans (plan_id TEXT PRIMARY KEY, title TEXT NOT NULL, step_count INTEGER NOT NULL DEFAULT 0)"
+            )
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS plan_steps (plan_id TEXT NOT NULL, step_index INTEGER NOT NULL, step TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'not_started', notes TEXT NOT NULL DEFAULT '', depends_on TEXT, PRIMARY KEY (plan_id, step_index))"
+            )
+            c.execute("PRAGMA table_info(plan_steps)")
+            if "depends_on" not in {row[1] for row in c.fetchall()}:
+                c.execute("ALTER TABLE plan_steps ADD COLUMN depends_on TEXT")
+            c.execute(
+                "CREATE INDEX IF NOT EXISTS idx_plan_steps_plan_id ON plan_steps (plan_id)"
+            )
+            c.execute(
+                "CREATE INDEX IF NOT EXISTS idx_plan_steps_status ON plan_steps (status, plan_id)"
+            )
+            if legacy:
+                self._migrate_legacy(c)
+
+    def _migrate_legacy(self, c: sqlite3.Cursor) -> None:
+        c.execute(
+            "SELECT plan_id, title, steps, step_statuses, step_notes FROM plans_legacy"
+        )
+        for pid, title, steps, statuses, notes in c.fetchall():
+            self._insert_plan(
+                c,
+                {
+                    "plan_id": pid,
+                    "title": title,
+                    "steps": json.loads(steps),
+                    "step_statuses": json.loads(statuses),
+                    "step_notes": json.loads(notes),
+                },
+            )
+        c.execute("DROP TABLE plans_legacy")
+
+    def plan_ids(self) -> List[str]:
+        with self._lock, closing(self._conn.cursor()) as c:
+            c.execute("SELECT plan_id FROM plans ORDER BY rowid")
+            return [row[0] for row in c.fetchall()]
+
+    def load_plan(self, plan_id: str) -> Optional[Dict]:
+        with self._lock, closing(self._conn.cursor()) as c:
+            c.execute("SELECT title FROM plans WHERE plan_id=?", (plan_id,))
+            row = c.fetchone()
+            if row is None:
+                return None
+            c.execute(
+                "SELECT step, status, notes, depends_on FROM plan_steps WHERE plan_id=? ORDER BY step_index",
+                (plan_id,),
+            )
+            rows = c.fetchall()
+        plan = {
+            "plan_id": plan_id,
+            "title": row[0],
+            "steps": [r[0] for r in rows],
+            "step_statuses": [r[1] for r in rows],
+            "step_notes": [r[2] for r in rows],
+        }
+        if any(r[3] for r in rows):
+            plan["step_dependencies"] = [json.loads(r[3]) if r[3] else [] for r in rows]
+        return plan
+
+    def summaries(self) -> Dict[str, Tuple[str, int, int]]:
+        """Map plan ids to (title, completed steps, total steps)."""
+        with self._lock, closing(self._conn.cursor()) as c:
+            c.execute(
+                "SELECT p.plan_id, p.title, p.step_count, (SELECT COUNT(*) FROM plan_steps s WHERE s.status='completed' AND s.plan_id=p.plan_id) FROM plans p"
+            )
+            return {
+                pid: (title, completed, total)
+                for pid, title, total, completed in c.fetchall()
+            }
+
+    def load_all(self) -> LazyPlans:
+        return LazyPlans(self)
+
+    def apply(self, ops: Dict[str, PlanOp]) -> None:
+        with self._lock, self._conn, closing(self._conn.cursor()) as c:
+            for plan_id, (plan, steps, deleted) in ops.items():
+                if deleted:
+                    c.execute("DELETE FROM plan_steps WHERE plan_id=?", (plan_id,))
+                    c.execute("DELETE FROM plans WHERE plan_id=?", (plan_id,))
+                elif plan is not None:
+                    for index, (status, notes) in steps.items():
+                        plan["step_statuses"][index] = status
+                        plan["step_notes"][index] = notes
+                    c.execute("DELETE FROM plan_steps WHERE plan_id=?", (plan_id,))
+                    self._insert_plan(c, plan)
+                elif steps:
+                    c.executemany(
+                        "UPDATE plan_steps SET status=?, notes=? WHERE plan_id=? AND step_index=?",
+                        [
+                            (status, notes, plan_id, index)
+                            for index, (status, notes) in steps.items()
+                        ],
+                    )
+
+    @staticmethod
+    def _insert_plan(c: sqlite3.Cursor, plan: Dict) -> None:
+        plan_id = plan["plan_id"]
+        c.execute(
+            "INSERT INTO plans (plan_id, title, step_count) VALUES (?, ?, ?) ON CONFLICT(plan_id) DO UPDATE SET title=excluded.title, step_count=excluded.step_count",
+            (plan_id, plan["title"], len(plan["steps"])),
+        )
+        dependencies = plan.get("step_dependencies") or [None] * len(plan["steps"])
+        c.executemany(
+            "INSERT INTO plan_steps (plan_id, step_index, step, status, notes, depends_on) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    plan_id,
+                    index,
+                    step,
+                    status,
+                    notes,
+                    json.dumps(deps) if deps else None,
+                )
+                for index, (step, status, notes, deps) in enumerate(
+                    zip(
+                        plan["steps"],
+                        plan["step_statuses"],
+                        plan["step_notes"],
+                        dependencies,
+                    )
+                )
+            ],
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Write-behind stores with a flush thread; closed at interpreter exit
+_open_stores: "weakref.WeakSet[WriteBehindPlanStore]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_stores() -> None:
+    for store in list(_open_stores):
+        store.close()
+
+
+class WriteBehindPlanStore:
+    """Coalesces plan mutations and hands them to a :class:`PlanStore`.
+
+    With ``flush_interval`` unset every mutation is written through
+    immediately. Otherwise mutations accumulate per plan and a background
+    thread flushes them every ``flush_interval`` seconds, keeping file and
+    database I/O off the event loop. Pending changes are also flushed by
+    :meth:`flush`, :meth:`close` and at interpreter exit.
+    """
+
+    def __init__(self, store: PlanStore, flush_interval: Optional[float] = None):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self._pending: Dict[str, List] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if flush_interval:
+            self._thread = threading.Thread(
+                target=self._flush_loop, name="plan-store-flush", daemon=True
+            )
+            self._thread.start()
+            _open_stores.add(self)
+
+    def load_all(self) -> MutableMapping:
+        return self.store.load_all()
+
+    @property
+    def dirty(self) -> int:
+        """Number of plans with changes that have not been flushed yet"""
+        return len(self._pending)
+
+    def put_plan(self, plan: Dict) -> None:
+        with self._lock:
+            self._pending[plan["plan_id"]] = [_copy_plan(plan), {}, False]
+        self._written()
+
+    def put_step(self, plan: Dict, step_index: int) -> None:
+        status = plan["step_statuses"][step_index]
+        notes = plan["step_notes"][step_index]
+        with self._lock:
+            op = self._pending.setdefault(plan["plan_id"], [None, {}, False])
+            if op[0] is not None:
+                op[0]["step_statuses"][step_index] = status
+                op[0]["step_notes"][step_index] = notes
+            else:
+                op[1][step_index] = (status, notes)
+        self._written()
+
+    def delete_plan(self, plan_id: str) -> None:
+        with self._lock:
+            self._pending[plan_id] = [None, {}, True]
+        self._written()
+
+    def _written(self) -> None:
+        if not self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all pending changes to the backing store"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            try:
+                self.store.apply({pid: tuple(op) for pid, op in pending.items()})
+            except Exception:
+                self._requeue(pending)
+                raise
+            self.flushes += 1
+
+    def _requeue(self, pending: Dict[str, List]) -> None:
+        """Put back changes from a failed flush without losing newer ones."""
+        with self._lock:
+            for plan_id, op in pending.items():
+                newer = self._pending.get(plan_id)
+                if newer is None:
+                    self._pending[plan_id] = op
+                elif newer[0] is None and not newer[2] and not op[2]:
+                    # newer step changes apply on top of the older state
+                    if op[0] is not None:
+                        for index, (status, notes) in newer[1].items():
+                            op[0]["step_statuses"][index] = status
+                            op[0]["step_notes"][index] = notes
+                    else:
+                        op[1].update(newer[1])
+                    self._pending[plan_id] = op
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # flush() keeps the changes pending for the next attempt
+                logger.warning(f"Plan store flush failed, will retry: {e}")
+
+    def close(self) -> None:
+        _open_stores.discard(self)
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+        self.store.close()
@@ -0,0 +1,237 @@
+"""Background synchronization of plans with an MCP server."""
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import MCPSettings
+from app.logger import logger
+
+
+# (method, payload); payloads are serialized when sent, so the latest state of
+# a plan goes out even if it changed after the mutation was queued
+PlanRequest = Tuple[str, Optional[dict]]
+
+
+def _coalesce(queue: List[PlanRequest], method: str, payload: Optional[dict]):
+    """Append a request to a plan's queue, merging it with the unsent tail."""
+    if queue:
+        last_method, _ = queue[-1]
+        if method == "PUT" and last_method in {"POST", "PUT"}:
+            # the queued create or update will carry the newest state
+            queue[-1] = (last_method, payload)
+            return True
+        if method == "DELETE" and last_method in {"POST", "PUT"}:
+            queue.pop()
+            if last_method == "POST":
+                # created and deleted before the server ever saw it
+                return True
+            _coalesce(queue, method, payload)
+            return True
+        if method == "DELETE" and last_method == "DELETE":
+            return True
+    queue.append((method, payload))
+    return False
+
+
+class MCPPlanOutbox:
+    """Queue of plan mutations sent to an MCP server in the background.
+
+    Requests for the same plan keep their order and repeated updates to a plan
+    that has not been sent yet collapse into one request. A single worker task
+    drains the queue every ``batch_interval`` seconds, sending different plans
+    concurrently over one pooled HTTP client and retrying failures with
+    exponential backoff.
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        api_key: Optional[str] = None,
+        batch_interval: float = 0.05,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        timeout: float = 5.0,
+    ):
+        self.server_url = server_url.rstrip("/")
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        self.batch_interval = batch_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.stats = {"sent": 0, "coalesced": 0, "retries": 0, "failed": 0}
+
+        self._pending: "OrderedDict[str, List[PlanRequest]]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def enqueue(self, method: str, plan_id: str, payload: Optional[dict] = None):
+        """Queue a request; starts the worker when called inside an event loop"""
+        queue = self._pending.setdefault(plan_id, [])
+        if _coalesce(queue, method, payload):
+            self.stats["coalesced"] += 1
+        if not queue:
+            del self._pending[plan_id]
+        if self._ensure_worker():
+            self._idle.clear()
+            self._wakeup.set()
+
+    def _ensure_worker(self) -> bool:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # a client is bound to the loop it was created on
+            if self._client is not None:
+                self._close_stale_client(self._client, self._loop, loop)
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+            self._wakeup = asyncio.Event()
+            self._idle = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+        return True
+
+    @staticmethod
+    def _close_stale_client(
+        client: httpx.AsyncClient,
+        old_loop: Optional[asyncio.AbstractEventLoop],
+        loop: asyncio.AbstractEventLoop,
+    ) -> None:
+        """Close the client of a previous event loop on the loop it belongs to"""
+
+        async def close() -> None:
+            try:
+                await client.aclose()
+            except Exception as e:
+                # its connections may belong to a loop that is gone
+                logger.debug(f"Closing a stale MCP client failed: {e}")
+
+        if old_loop is not None and old_loop.is_running():
+            asyncio.run_coroutine_threadsafe(close(), old_loop)
+        else:
+            loop.create_task(close())
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            try:
+                await asyncio.sleep(self.batch_interval)
+                self._wakeup.clear()
+                batch, self._pending = self._pending, OrderedDict()
+                await asyncio.gather(
+                    *(self._send_plan(pid, queue) for pid, queue in batch.items())
+                )
+            except Exception as e:
+                # the worker must outlive any batch, or flush() would hang
+                logger.warning(f"MCP plan sync batch failed: {e}")
+            finally:
+                if not self._pending:
+                    self._idle.set()
+
+    async def _send_plan(self, plan_id: str, queue: List[PlanRequest]) -> None:
+        for method, payload in queue:
+            try:
+                await self._send(method, plan_id, payload)
+            except Exception as e:
+                # e.g. a payload that cannot be serialized or an invalid URL
+                self.stats["failed"] += 1
+                logger.warning(f"Failed to send MCP {method} for plan {plan_id}: {e}")
+
+    async def _send(self, method: str, plan_id: str, payload: Optional[dict]):
+        url = f"{self.server_url}/plans/{plan_id}"
+        content = json.dumps(payload) if payload is not None else None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._client.request(
+                    method, url, content=content, headers=self.headers
+                )
+                if response.status_code < 500:
+                    if response.status_code >= 400:
+                        logger.warning(
+                            f"MCP rejected {method} for plan {plan_id}: HTTP {response.status_code}"
+                        )
+                        self.stats["failed"] += 1
+                    else:
+                        self.stats["sent"] += 1
+                    return
+                error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(
+                    min(self.backoff_base * 2**attempt, self.backoff_max)
+                )
+        self.stats["failed"] += 1
+        logger.warning(
+            f"Giving up on MCP {method} for plan {plan_id} after {self.max_retries + 1} attempts: {error}"
+        )
+
+    async def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until every queued request has been sent or given up on"""
+        if not self._pending and (self._idle is None or self._idle.is_set()):
+            return
+        self._ensure_worker()
+        self._idle.clear()
+        self._wakeup.set()
+        await asyncio.wait_for(self._idle.wait(), timeout)
+
+    @property
+    def pending(self) -> int:
+        """Number of requests not sent yet"""
+        return sum(len(queue) for queue in self._pending.values())
+
+    async def aclose(self, timeout: Optional[float] = None) -> None:
+        """Send what is queued, waiting at most ``timeout`` seconds, then close"""
+        try:
+            await self.flush(timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Dropping {self.pending} unsent plan sync request(s) to {self.server_url}"
+            )
+        if self._worker:
+            self._worker.cancel()
+            self._worker = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+
+_outboxes: Dict[Tuple[str, Optional[str]], MCPPlanOutbox] = {}
+
+
+def get_plan_outbox(settings: Optional[MCPSettings]) -> Optional[MCPPlanOutbox]:
+    """Return the shared outbox for an MCP server, or None if none is set"""
+    if not settings or not settings.server_url:
+        return None
+    key = (settings.server_url, settings.api_key)
+    if key not in _outboxes:
+        _outboxes[key] = MCPPlanOutbox(
+            settings.server_url,
+            settings.api_key,
+            batch_interval=settings.sync_batch_interval,
+            max_retries=settings.sync_max_retries,
+            timeout=settings.sync_timeout,
+        )
+    return _outboxes[key]
+
+
+async def close_plan_outboxes(timeout: Optional[float] = 30.0) -> None:
+    """Flush and close every outbox; call before the process exits"""
+    outboxes = list(_outboxes.values())
+    _outboxes.clear()
+    for outbox in outboxes:
+        await outbox.aclose(timeout)
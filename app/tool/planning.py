@@ -1,16 +1,17 @@
 # tool/planning.py
 import asyncio
-import json
-import os
-import sqlite3
-from contextlib import closing
 from typing import Dict, List, Literal, Optional
 
-import requests
-
 from app.config import WORKSPACE_ROOT, config
 from app.exceptions import ToolError
 from app.tool.base import BaseTool, ToolResult
+from app.tool.plan_store import (
+    JSONPlanStore,
+    LazyPlans,
+    SQLitePlanStore,
+    WriteBehindPlanStore,
+)
+from app.tool.plan_sync import get_plan_outbox
 
 
 _PLANNING_TOOL_DESCRIPTION = """
@@ -20,6 +21,125 @@ and optionally persisting plans to a JSON file or SQLite database.
 """
 
 
+STEP_STATUSES = ("not_started", "in_progress", "completed", "blocked")
+ACTIVE_STEP_STATUSES = frozenset({"not_started", "in_progress"})
+
+
+STATUS_MARKS = {
+    "not_started": "[ ]",
+    "in_progress": "[→]",
+    "completed": "[✓]",
+    "blocked": "[!]",
+}
+
+
+class PlanProgress:
+    """Status counters, a current-step cursor and cached step lines of a plan.
+
+    Everything is updated in place when a step changes, so looking up the
+    current step or rendering the plan neither scans statuses nor re-formats
+    steps that did not change.
+    """
+
+    def __init__(self, plan: Dict):
+        self.steps: List[str] = plan["steps"]
+        self.statuses: List[str] = plan["step_statuses"]
+        self.notes: List[str] = plan["step_notes"]
+        self.dependencies: Optional[List[List[int]]] = plan.get("step_dependencies")
+        self.counts: Dict[str, int] = dict.fromkeys(STEP_STATUSES, 0)
+        for status in self.statuses:
+            self.counts[status] = self.counts.get(status, 0) + 1
+        self.cursor = self._next_active(0)
+        self._lines: List[Optional[str]] = [None] * len(self.steps)
+
+    def tracks(self, plan: Dict) -> bool:
+        """Whether this index still refers to the plan's current step lists"""
+        return (
+            self.steps is plan["steps"]
+            and self.statuses is plan["step_statuses"]
+            and self.notes is plan["step_notes"]
+            and self.dependencies is plan.get("step_dependencies")
+        )
+
+    def _next_active(self, start: int) -> Optional[int]:
+        for index in range(start, len(self.statuses)):
+            if self.statuses[index] in ACTIVE_STEP_STATUSES:
+                return index
+        return None
+
+    def update(self, index: int, old_status: str, new_status: str) -> None:
+        """Record that the step at ``index`` moved from one status to another"""
+        self.counts[old_status] -= 1
+        self.counts[new_status] = self.counts.get(new_status, 0) + 1
+        if new_status in ACTIVE_STEP_STATUSES:
+            if self.cursor is None or index < self.cursor:
+                self.cursor = index
+        elif index == self.cursor:
+            self.cursor = self._next_active(index + 1)
+        self._lines[index] = None
+
+    def ready_steps(self) -> List[int]:
+        """Not started steps whose dependencies have all been completed"""
+        ready = []
+        for index, status in enumerate(self.statuses):
+            if status != "not_started":
+                continue
+            deps = self.dependencies[index] if self.dependencies else ()
+            if all(self.statuses[dep] == "completed" for dep in deps):
+                ready.append(index)
+        return ready
+
+    def invalidate(self, index: int) -> None:
+        self._lines[index] = None
+
+    def _line(self, index: int) -> str:
+        line = self._lines[index]
+        if line is None:
+            mark = STATUS_MARKS.get(self.statuses[index], "[ ]")
+            line = f"{index}. {mark} {self.steps[index]}"
+            if self.dependencies and self.dependencies[index]:
+                deps = ", ".join(map(str, self.dependencies[index]))
+                line += f" (after {deps})"
+            line += "\n"
+            if self.notes[index]:
+                line += f"   Notes: {self.notes[index]}\n"
+            self._lines[index] = line
+        return line
+
+    def _header(self, plan: Dict) -> str:
+        output = f"Plan: {plan['title']} (ID: {plan['plan_id']})\n"
+        output += "=" * len(output) + "\n\n"
+
+        total_steps = len(self.steps)
+        completed = self.counts["completed"]
+        output += f"Progress: {completed}/{total_steps} steps completed "
+        if total_steps > 0:
+            percentage = (completed / total_steps) * 100
+            output += f"({percentage:.1f}%)\n"
+        else:
+            output += "(0%)\n"
+
+        output += f"Status: {completed} completed, {self.counts['in_progress']} in progress, {self.counts['blocked']} blocked, {self.counts['not_started']} not started\n\n"
+        return output + "Steps:\n"
+
+    def render(self, plan: Dict) -> str:
+        """Full plan text, as shown by the ``get`` command."""
+        return self._header(plan) + "".join(map(self._line, range(len(self.steps))))
+
+    def render_window(self, plan: Dict, radius: int) -> str:
+        """Plan summary with only the steps within ``radius`` of the current one."""
+        total = len(self.steps)
+        center = self.cursor if self.cursor is not None else total - 1
+        start, end = max(0, center - radius), min(total, center + radius + 1)
+        output = self._header(plan)
+        if start > 0:
+            output += f"... {start} earlier steps ...\n"
+        output += "".join(map(self._line, range(start, end)))
+        if end < total:
+            output += f"... {total - end} later steps ...\n"
+        return output
+
+
 class PlanningTool(BaseTool):
     """
     A planning tool that allows the agent to create and manage plans for solving complex tasks.
@@ -71,6 +191,11 @@ class PlanningTool(BaseTool):
                 "description": "Additional notes for a step. Optional for mark_step command.",
                 "type": "string",
             },
+            "step_dependencies": {
+                "description": "For each step, the indices (0-based) of the steps that must be completed before it can start. Steps without dependencies on each other may run in parallel. Optional for create and update commands.",
+                "type": "array",
+                "items": {"type": "array", "items": {"type": "integer"}},
+            },
         },
         "required": ["command"],
         "additionalProperties": False,
@@ -78,119 +203,157 @@ class PlanningTool(BaseTool):
 
     plans: dict = {}  # Dictionary to store plans by plan_id
     _current_plan_id: Optional[str] = None  # Track the current active plan
+    _progress: Dict[str, PlanProgress] = {}
 
     storage_type: Literal["memory", "json", "sqlite"] = "memory"
     storage_path: Optional[str] = None
-    _conn: Optional[sqlite3.Connection] = None
+    # Seconds between background flushes; None writes every change through
+    flush_interval: Optional[float] = None
+    _store: Optional[WriteBehindPlanStore] = None
 
     def __init__(
-        self, storage_type: str = "memory", storage_path: Optional[str] = None
+        self,
+        storage_type: Optional[str] = None,
+        storage_path: Optional[str] = None,
+        flush_interval: Optional[float] = None,
     ):
-        super().__init__(storage_type=storage_type, storage_path=storage_path)
+        # Without an explicit storage type, use the [planning] config
+        if storage_type is None:
+            settings = config.planning_config
+            storage_type = settings.storage_type if settings else "memory"
+            if settings:
+                storage_path = storage_path or settings.storage_path
+                if flush_interval is None:
+                    flush_interval = settings.flush_interval
+        super().__init__(
+            storage_type=storage_type,
+            storage_path=storage_path,
+            flush_interval=flush_interval,
+        )
         if self.storage_type in {"json", "sqlite"}:
             if not self.storage_path:
                 default = "plans.json" if self.storage_type == "json" else "plans.db"
                 self.storage_path = str(WORKSPACE_ROOT / default)
-
-        if self.storage_type == "sqlite":
-            self._conn = sqlite3.connect(self.storage_path)
-            self._init_db()
+            backend = (
+                JSONPlanStore(self.storage_path)
+                if self.storage_type == "json"
+                else SQLitePlanStore(self.storage_path)
+            )
+            self._store = WriteBehindPlanStore(backend, self.flush_interval)
 
         self._load_plans()
 
-    def _init_db(self) -> None:
-        if not self._conn:
-            return
-        with closing(self._conn.cursor()) as c:
-            c.execute(
-                "CREATE TABLE IF NOT EXISTS plans (plan_id TEXT PRIMARY KEY, title TEXT, steps TEXT, step_statuses TEXT, step_notes TEXT)"
-            )
-            self._conn.commit()
-
     def _load_plans(self) -> None:
         """Load existing plans from storage into memory."""
-        if self.storage_type == "json":
-            if self.storage_path and os.path.exists(self.storage_path):
-                try:
-                    with open(self.storage_path, "r", encoding="utf-8") as f:
-                        self.plans = json.load(f)
-                except Exception:
-                    self.plans = {}
-        elif self.storage_type == "sqlite" and self._conn:
-            with closing(self._conn.cursor()) as c:
-                c.execute(
-                    "SELECT plan_id, title, steps, step_statuses, step_notes FROM plans"
-                )
-                rows = c.fetchall()
-                self.plans = {}
-                for pid, title, steps, statuses, notes in rows:
-                    self.plans[pid] = {
-                        "plan_id": pid,
-                        "title": title,
-                        "steps": json.loads(steps),
-                        "step_statuses": json.loads(statuses),
-                        "step_notes": json.loads(notes),
-                    }
-        else:
-            self.plans = {}
+        self.plans = self._store.load_all() if self._store else {}
 
     def _persist_plan(self, plan: Dict) -> None:
-        if self.storage_type == "json" and self.storage_path:
-            try:
-                with open(self.storage_path, "w", encoding="utf-8") as f:
-                    json.dump(self.plans, f, indent=2)
-            except Exception:
-                pass
-        elif self.storage_type == "sqlite" and self._conn:
-            with closing(self._conn.cursor()) as c:
-                c.execute(
-                    "REPLACE INTO plans (plan_id, title, steps, step_statuses, step_notes) VALUES (?, ?, ?, ?, ?)",
-                    (
-                        plan["plan_id"],
-                        plan["title"],
-                        json.dumps(plan["steps"]),
-                        json.dumps(plan["step_statuses"]),
-                        json.dumps(plan["step_notes"]),
-                    ),
-                )
-                self._conn.commit()
+        if self._store:
+            self._store.put_plan(plan)
+
+    def _persist_step(self, plan: Dict, step_index: int) -> None:
+        if self._store:
+            self._store.put_step(plan, step_index)
 
     def _remove_plan(self, plan_id: str) -> None:
-        if self.storage_type == "json" and self.storage_path:
-            try:
-                with open(self.storage_path, "w", encoding="utf-8") as f:
-                    json.dump(self.plans, f, indent=2)
-            except Exception:
-                pass
-        elif self.storage_type == "sqlite" and self._conn:
-            with closing(self._conn.cursor()) as c:
-                c.execute("DELETE FROM plans WHERE plan_id=?", (plan_id,))
-                self._conn.commit()
-
-    async def _sync_with_mcp(
-        self, method: str, plan_id: str, payload: Optional[dict] = None
-    ):
-        """Synchronize plan data with MCP server if configured."""
-        if not config.mcp_config or not config.mcp_config.server_url:
-            return
+        if self._store:
+            self._store.delete_plan(plan_id)
+
+    def flush(self) -> None:
+        """Write pending plan changes to storage."""
+        if self._store:
+            self._store.flush()
+
+    async def aflush(self) -> None:
+        """Flush pending plan changes without blocking the event loop."""
+        if self._store:
+            await asyncio.to_thread(self._store.flush)
+
+    def close(self) -> None:
+        """Flush pending changes and release the storage backend."""
+        if self._store:
+            self._store.close()
+            self._store = None
+
+    def restore_plan(self, plan: Dict) -> None:
+        """Replace a plan with a saved copy, e.g. from a run checkpoint."""
+        self.plans[plan["plan_id"]] = plan
+        self._progress.pop(plan["plan_id"], None)
+        self._persist_plan(plan)
+        self._sync_with_mcp("PUT", plan["plan_id"], plan)
 
-        url = f"{config.mcp_config.server_url.rstrip('/')}/plans/{plan_id}"
-        headers = {}
-        if config.mcp_config.api_key:
-            headers["Authorization"] = f"Bearer {config.mcp_config.api_key}"
+    def get_progress(self, plan_id: str) -> PlanProgress:
+        """Return the status counters and current-step cursor of a plan."""
+        if plan_id not in self.plans:
+            raise ToolError(f"No plan found with ID: {plan_id}")
+        plan = self.plans[plan_id]
+        progress = self._progress.get(plan_id)
+        if progress is None or not progress.tracks(plan):
+            progress = self._progress[plan_id] = PlanProgress(plan)
+        return progress
+
+    def get_ready_steps(self, plan_id: str) -> List[int]:
+        """Steps that can start now given their dependencies."""
+        return self.get_progress(plan_id).ready_steps()
+
+    def render_plan(self, plan_id: str, window: Optional[int] = None) -> str:
+        """Render a plan, optionally only around its current step."""
+        progress = self.get_progress(plan_id)
+        plan = self.plans[plan_id]
+        if window is None:
+            return progress.render(plan)
+        return progress.render_window(plan, window)
+
+    def get_current_step(self, plan_id: str) -> Optional[int]:
+        """Index of the first not started or in progress step, if any."""
+        if plan_id not in self.plans:
+            return None
+        return self.get_progress(plan_id).cursor
+
+    def set_step_status(
+        self,
+        plan_id: str,
+        step_index: int,
+        step_status: Optional[str] = None,
+        step_notes: Optional[str] = None,
+    ) -> Dict:
+        """Update a step without rendering the plan; returns the plan."""
+        if plan_id not in self.plans:
+            raise ToolError(f"No plan found with ID: {plan_id}")
+
+        plan = self.plans[plan_id]
+
+        if step_index < 0 or step_index >= len(plan["steps"]):
+            raise ToolError(
+                f"Invalid step_index: {step_index}. Valid indices range from 0 to {len(plan['steps'])-1}."
+            )
+
+        if step_status and step_status not in STEP_STATUSES:
+            raise ToolError(
+                f"Invalid step_status: {step_status}. Valid statuses are: not_started, in_progress, completed, blocked"
+            )
+
+        progress = self.get_progress(plan_id)
+        if step_status:
+            old_status = plan["step_statuses"][step_index]
+            plan["step_statuses"][step_index] = step_status
+            progress.update(step_index, old_status, step_status)
+
+        if step_notes:
+            plan["step_notes"][step_index] = step_notes
+            progress.invalidate(step_index)
 
-        def request_fn():
-            if method == "POST":
-                requests.post(url, json=payload, headers=headers, timeout=5)
-            elif method == "PUT":
-                requests.put(url, json=payload, headers=headers, timeout=5)
-            elif method == "DELETE":
-                requests.delete(url, headers=headers, timeout=5)
-            elif method == "GET":
-                return requests.get(url, headers=headers, timeout=5)
+        self._persist_step(plan, step_index)
+        self._sync_with_mcp("PUT", plan_id, plan)
+        return plan
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, request_fn)
+    def _sync_with_mcp(
+        self, method: str, plan_id: str, payload: Optional[dict] = None
+    ) -> None:
+        """Queue a plan change for synchronization with the MCP server."""
+        outbox = get_plan_outbox(config.mcp_config)
+        if outbox:
+            outbox.enqueue(method, plan_id, payload)
 
     async def execute(
         self,
@@ -213,6 +376,7 @@ class PlanningTool(BaseTool):
             Literal["not_started", "in_progress", "completed", "blocked"]
         ] = None,
         step_notes: Optional[str] = None,
+        step_dependencies: Optional[List[List[int]]] = None,
         **kwargs,
     ):
         """
@@ -226,12 +390,13 @@ class PlanningTool(BaseTool):
         - step_index: Index of the step to update (used with mark_step command)
         - step_status: Status to set for a step (used with mark_step command)
         - step_notes: Additional notes for a step (used with mark_step command)
+        - step_dependencies: Indices each step depends on (used with create and update commands)
         """
 
         if command == "create":
-            return self._create_plan(plan_id, title, steps)
+            return self._create_plan(plan_id, title, steps, step_dependencies)
         elif command == "update":
-            return self._update_plan(plan_id, title, steps)
+            return self._update_plan(plan_id, title, steps, step_dependencies)
         elif command == "list":
             return self._list_plans()
         elif command == "get":
@@ -249,8 +414,51 @@ class PlanningTool(BaseTool):
                 f"Unrecognized command: {command}. Allowed commands are: create, update, list, get, set_active, mark_step, delete, resume"
             )
 
+    @staticmethod
+    def _validate_dependencies(
+        dependencies: List[List[int]], step_count: int
+    ) -> List[List[int]]:
+        """Check that dependencies reference existing steps and form no cycle."""
+        if not isinstance(dependencies, list) or len(dependencies) != step_count:
+            raise ToolError(
+                "Parameter `step_dependencies` must contain one list of step indices per step"
+            )
+        normalized = []
+        for index, deps in enumerate(dependencies):
+            if not isinstance(deps, list) or not all(
+                isinstance(dep, int) and 0 <= dep < step_count and dep != index
+                for dep in deps
+            ):
+                raise ToolError(
+                    f"Invalid dependencies for step {index}: {deps}. Dependencies must be indices of other steps."
+                )
+            normalized.append(sorted(set(deps)))
+
+        # Kahn's algorithm: every step must become ready at some point
+        remaining = [len(deps) for deps in normalized]
+        dependents: List[List[int]] = [[] for _ in normalized]
+        for index, deps in enumerate(normalized):
+            for dep in deps:
+                dependents[dep].append(index)
+        ready = [index for index, count in enumerate(remaining) if count == 0]
+        visited = 0
+        while ready:
+            index = ready.pop()
+            visited += 1
+            for dependent in dependents[index]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if visited != step_count:
+            raise ToolError("Parameter `step_dependencies` contains a cycle")
+        return normalized
+
     def _create_plan(
-        self, plan_id: Optional[str], title: Optional[str], steps: Optional[List[str]]
+        self,
+        plan_id: Optional[str],
+        title: Optional[str],
+        steps: Optional[List[str]],
+        step_dependencies: Optional[List[List[int]]] = None,
     ) -> ToolResult:
         """Create a new plan with the given ID, title, and steps."""
         if not plan_id:
@@ -281,19 +489,27 @@ class PlanningTool(BaseTool):
             "step_statuses": ["not_started"] * len(steps),
             "step_notes": [""] * len(steps),
         }
+        if step_dependencies and any(step_dependencies):
+            plan["step_dependencies"] = self._validate_dependencies(
+                step_dependencies, len(steps)
+            )
 
         self.plans[plan_id] = plan
         self._current_plan_id = plan_id  # Set as active plan
         self._persist_plan(plan)
 
-        asyncio.create_task(self._sync_with_mcp("POST", plan_id, plan))
+        self._sync_with_mcp("POST", plan_id, plan)
 
         return ToolResult(
             output=f"Plan created successfully with ID: {plan_id}\n\n{self._format_plan(plan)}"
         )
 
     def _update_plan(
-        self, plan_id: Optional[str], title: Optional[str], steps: Optional[List[str]]
+        self,
+        plan_id: Optional[str],
+        title: Optional[str],
+        steps: Optional[List[str]],
+        step_dependencies: Optional[List[List[int]]] = None,
     ) -> ToolResult:
         """Update an existing plan with new title or steps."""
         if not plan_id:
@@ -304,17 +520,23 @@ class PlanningTool(BaseTool):
 
         plan = self.plans[plan_id]
 
+        if steps and (
+            not isinstance(steps, list)
+            or not all(isinstance(step, str) for step in steps)
+        ):
+            raise ToolError(
+                "Parameter `steps` must be a list of strings for command: update"
+            )
+        # Validate before changing anything so a bad update leaves the plan intact
+        if step_dependencies:
+            step_dependencies = self._validate_dependencies(
+                step_dependencies, len(steps or plan["steps"])
+            )
+
         if title:
             plan["title"] = title
 
         if steps:
-            if not isinstance(steps, list) or not all(
-                isinstance(step, str) for step in steps
-            ):
-                raise ToolError(
-                    "Parameter `steps` must be a list of strings for command: update"
-                )
-
             # Preserve existing step statuses for unchanged steps
             old_steps = plan["steps"]
             old_statuses = plan["step_statuses"]
@@ -323,23 +545,44 @@ class PlanningTool(BaseTool):
             # Create new step statuses and notes
             new_statuses = []
             new_notes = []
+            unchanged = set()
 
             for i, step in enumerate(steps):
                 # If the step exists at the same position in old steps, preserve status and notes
                 if i < len(old_steps) and step == old_steps[i]:
                     new_statuses.append(old_statuses[i])
                     new_notes.append(old_notes[i])
+                    unchanged.add(i)
                 else:
                     new_statuses.append("not_started")
                     new_notes.append("")
 
+            # Dependencies are step indices, so only those between steps that
+            # kept their position still mean the same thing
+            if not step_dependencies and plan.get("step_dependencies"):
+                old_dependencies = plan["step_dependencies"]
+                step_dependencies = self._validate_dependencies(
+                    [
+                        [dep for dep in old_dependencies[i] if dep in unchanged]
+                        if i in unchanged
+                        else []
+                        for i in range(len(steps))
+                    ],
+                    len(steps),
+                )
+
             plan["steps"] = steps
             plan["step_statuses"] = new_statuses
             plan["step_notes"] = new_notes
 
+        if step_dependencies and any(step_dependencies):
+            plan["step_dependencies"] = step_dependencies
+        elif step_dependencies:
+            plan.pop("step_dependencies", None)
+
         self._persist_plan(plan)
 
-        asyncio.create_task(self._sync_with_mcp("PUT", plan_id, plan))
+        self._sync_with_mcp("PUT", plan_id, plan)
 
         return ToolResult(
             output=f"Plan updated successfully: {plan_id}\n\n{self._format_plan(plan)}"
@@ -353,17 +596,22 @@ class PlanningTool(BaseTool):
             )
 
         output = "Available plans:\n"
-        for plan_id, plan in self.plans.items():
+        for plan_id, title, completed, total in self._plan_summaries():
             current_marker = " (active)" if plan_id == self._current_plan_id else ""
-            completed = sum(
-                1 for status in plan["step_statuses"] if status == "completed"
-            )
-            total = len(plan["steps"])
             progress = f"{completed}/{total} steps completed"
-            output += f"• {plan_id}{current_marker}: {plan['title']} - {progress}\n"
+            output += f"• {plan_id}{current_marker}: {title} - {progress}\n"
 
         return ToolResult(output=output)
 
+    def _plan_summaries(self):
+        """Yield (plan_id, title, completed, total) for every plan."""
+        if isinstance(self.plans, LazyPlans):
+            yield from self.plans.summaries()
+            return
+        for plan_id, plan in self.plans.items():
+            completed = plan["step_statuses"].count("completed")
+            yield plan_id, plan["title"], completed, len(plan["steps"])
+
     def _get_plan(self, plan_id: Optional[str]) -> ToolResult:
         """Get details of a specific plan."""
         if not plan_id:
@@ -419,30 +667,7 @@ class PlanningTool(BaseTool):
         if step_index is None:
             raise ToolError("Parameter `step_index` is required for command: mark_step")
 
-        plan = self.plans[plan_id]
-
-        if step_index < 0 or step_index >= len(plan["steps"]):
-            raise ToolError(
-                f"Invalid step_index: {step_index}. Valid indices range from 0 to {len(plan['steps'])-1}."
-            )
-
-        if step_status and step_status not in [
-            "not_started",
-            "in_progress",
-            "completed",
-            "blocked",
-        ]:
-            raise ToolError(
-                f"Invalid step_status: {step_status}. Valid statuses are: not_started, in_progress, completed, blocked"
-            )
-
-        if step_status:
-            plan["step_statuses"][step_index] = step_status
-
-        if step_notes:
-            plan["step_notes"][step_index] = step_notes
-
-        self._persist_plan(plan)
+        plan = self.set_step_status(plan_id, step_index, step_status, step_notes)
 
         return ToolResult(
             output=f"Step {step_index} updated in plan '{plan_id}'.\n\n{self._format_plan(plan)}"
@@ -457,55 +682,20 @@ class PlanningTool(BaseTool):
             raise ToolError(f"No plan found with ID: {plan_id}")
 
         del self.plans[plan_id]
+        self._progress.pop(plan_id, None)
         self._remove_plan(plan_id)
 
         # If the deleted plan was the active plan, clear the active plan
         if self._current_plan_id == plan_id:
             self._current_plan_id = None
 
-        asyncio.create_task(self._sync_with_mcp("DELETE", plan_id))
+        self._sync_with_mcp("DELETE", plan_id)
 
         return ToolResult(output=f"Plan '{plan_id}' has been deleted.")
 
     def _format_plan(self, plan: Dict) -> str:
         """Format a plan for display."""
-        output = f"Plan: {plan['title']} (ID: {plan['plan_id']})\n"
-        output += "=" * len(output) + "\n\n"
-
-        # Calculate progress statistics
-        total_steps = len(plan["steps"])
-        completed = sum(1 for status in plan["step_statuses"] if status == "completed")
-        in_progress = sum(
-            1 for status in plan["step_statuses"] if status == "in_progress"
-        )
-        blocked = sum(1 for status in plan["step_statuses"] if status == "blocked")
-        not_started = sum(
-            1 for status in plan["step_statuses"] if status == "not_started"
-        )
-
-        output += f"Progress: {completed}/{total_steps} steps completed "
-        if total_steps > 0:
-            percentage = (completed / total_steps) * 100
-            output += f"({percentage:.1f}%)\n"
-        else:
-            output += "(0%)\n"
-
-        output += f"Status: {completed} completed, {in_progress} in progress, {blocked} blocked, {not_started} not started\n\n"
-        output += "Steps:\n"
-
-        # Add each step with its status and notes
-        for i, (step, status, notes) in enumerate(
-            zip(plan["steps"], plan["step_statuses"], plan["step_notes"])
-        ):
-            status_symbol = {
-                "not_started": "[ ]",
-                "in_progress": "[→]",
-                "completed": "[✓]",
-                "blocked": "[!]",
-            }.get(status, "[ ]")
-
-            output += f"{i}. {status_symbol} {step}\n"
-            if notes:
-                output += f"   Notes: {notes}\n"
-
-        return output
+        plan_id = plan["plan_id"]
+        if self.plans.get(plan_id) is plan:
+            return self.get_progress(plan_id).render(plan)
+        return PlanProgress(plan).render(plan)
@@ -1,11 +1,357 @@
+import asyncio
+import atexit
+import importlib
 import multiprocessing
-import sys
+import os
+import resource
+import signal
+import threading
+from collections import OrderedDict, deque
+from contextlib import redirect_stdout
 from io import StringIO
-from typing import Dict
+from typing import Deque, Dict, Optional, Tuple
 
+from app.logger import logger
 from app.tool.base import BaseTool
 
 
+DEFAULT_PRELOAD = ("numpy", "pandas")
+# Seconds a worker may take to import its preload modules
+READY_TIMEOUT = 60
+# Extra seconds a worker gets to report that an isolated run timed out
+TIMEOUT_GRACE = 1
+
+
+def _fresh_namespace() -> dict:
+    import builtins
+
+    return {"__builtins__": builtins.__dict__.copy()}
+
+
+def _execute(code: str, namespace: dict) -> Dict:
+    output_buffer = StringIO()
+    try:
+        with redirect_stdout(output_buffer):
+            exec(code, namespace, namespace)
+        return {"observation": output_buffer.getvalue(), "success": True}
+    except Exception as e:
+        return {"observation": str(e), "success": False}
+
+
+def _execute_forked(code: str, timeout: float) -> Dict:
+    """Run ``code`` in a child forked from this warm worker.
+
+    The child inherits the imported modules, and any state it changes goes
+    away when it exits, so the worker itself stays clean for the next caller.
+    """
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    pid = os.fork()
+    if pid == 0:
+        reader.close()
+        try:
+            writer.send(_execute(code, _fresh_namespace()))
+        finally:
+            os._exit(0)
+    writer.close()
+    try:
+        if reader.poll(timeout):
+            return reader.recv()
+        os.kill(pid, signal.SIGKILL)
+        return {
+            "observation": f"Execution timeout after {timeout} seconds",
+            "success": False,
+        }
+    except EOFError:
+        return {"observation": "Python execution exited unexpectedly", "success": False}
+    finally:
+        reader.close()
+        os.waitpid(pid, 0)
+
+
+def _worker_main(conn, preload: Tuple[str, ...]) -> None:
+    """Entry point of a pooled worker: execute snippets sent over ``conn``."""
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            pass
+    conn.send("ready")
+
+    namespaces: Dict[str, dict] = {}
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+
+        code, session_id, timeout, isolate = request
+        if session_id is not None:
+            namespace = namespaces.setdefault(session_id, _fresh_namespace())
+            result = _execute(code, namespace)
+        elif isolate:
+            result = _execute_forked(code, timeout)
+        else:
+            result = _execute(code, _fresh_namespace())
+
+        # ru_maxrss is reported in kilobytes on Linux
+        max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        try:
+            conn.send((result, max_rss_kb))
+        except (BrokenPipeError, OSError):
+            break
+
+
+class _PythonWorker:
+    """A pre-forked interpreter process connected through a pipe."""
+
+    def __init__(self, preload: Tuple[str, ...]):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(child_conn, preload), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.executions = 0
+        self.max_rss_kb = 0
+        self.ready = False
+
+    def is_ready(self) -> bool:
+        """Whether the worker has finished importing its preload modules"""
+        if not self.ready:
+            try:
+                if self.conn.poll():
+                    self.ready = self.conn.recv() == "ready"
+            except (EOFError, OSError):
+                return False
+        return self.ready
+
+    def call(self, code: str, session_id: Optional[str], timeout: float, isolate: bool):
+        """Blocking round trip; raises TimeoutError if no reply arrives in time"""
+        if not self.ready:
+            if not self.conn.poll(READY_TIMEOUT):
+                raise TimeoutError
+            self.ready = self.conn.recv() == "ready"
+        self.conn.send((code, session_id, timeout, isolate))
+        if isolate and session_id is None:
+            # the worker enforces the timeout itself and stays usable
+            timeout += TIMEOUT_GRACE
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        return self.conn.recv()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(1)
+        self.kill()
+
+
+class PythonWorkerPool:
+    """Pool of warm Python worker processes.
+
+    Workers are started ahead of time with heavy modules already imported.
+    With ``isolate`` (the default) a warm worker runs each anonymous execution
+    in a child it forks for that run, so imports, monkeypatches and module
+    globals die with the child and never reach the next caller, while the
+    preloaded modules are inherited for free. The worker enforces the timeout
+    on the child and stays usable. ``isolate=False`` runs anonymous code in
+    the worker itself with only a fresh namespace; state outside that
+    namespace then carries over between callers.
+
+    Executions with a ``session_id`` are pinned to a dedicated worker whose
+    namespace persists between calls. At most ``max_sessions`` are kept; the
+    least recently used idle session is ended to make room for a new one.
+    Workers are recycled after ``max_executions`` runs or once their peak RSS
+    passes ``max_memory_mb``, and killed and replaced when a snippet they run
+    directly exceeds its timeout. Idle workers are handed out oldest first,
+    preferring those that finished importing, and used-up workers are closed
+    and replaced in the background after the result is returned.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_executions: int = 100,
+        max_memory_mb: int = 512,
+        preload: Tuple[str, ...] = DEFAULT_PRELOAD,
+        isolate: bool = True,
+        max_sessions: int = 16,
+    ):
+        self.size = size
+        self.max_executions = max_executions
+        self.max_memory_mb = max_memory_mb
+        self.preload = preload
+        self.isolate = isolate
+        self.max_sessions = max_sessions
+        # oldest first, so the workers handed out have had the most time to warm up
+        self._idle: Deque[_PythonWorker] = deque()
+        self._sessions: "OrderedDict[str, _PythonWorker]" = OrderedDict()
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> None:
+        """Fork the initial workers if that has not happened yet"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._idle.extend(_PythonWorker(self.preload) for _ in range(self.size))
+
+    def _acquire(self, session_id: Optional[str]) -> _PythonWorker:
+        with self._lock:
+            if session_id is not None and session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+                return self._sessions[session_id]
+            worker = next((w for w in self._idle if w.is_ready()), None)
+            if worker is not None:
+                self._idle.remove(worker)
+            elif self._idle:
+                worker = self._idle.popleft()
+        if worker is None or not worker.process.is_alive():
+            worker = _PythonWorker(self.preload)
+        if session_id is not None:
+            with self._lock:
+                self._sessions[session_id] = worker
+            self._limit_sessions()
+        return worker
+
+    def _limit_sessions(self) -> None:
+        """End the least recently used idle sessions beyond ``max_sessions``"""
+        with self._lock:
+            excess = len(self._sessions) - self.max_sessions
+            stale = []
+            for session_id in self._sessions:
+                if len(stale) >= excess:
+                    break
+                lock = self._session_locks.get(session_id)
+                if lock is None or not lock.locked():
+                    stale.append(session_id)
+        for session_id in stale:
+            logger.info(f"Ending Python session {session_id} to stay within limit")
+            self.end_session(session_id)
+
+    def _release(
+        self, worker: _PythonWorker, session_id: Optional[str]
+    ) -> Optional[_PythonWorker]:
+        """Return a worker after a run; returns it again if it must be retired"""
+        worker.executions += 1
+        recycle = (
+            not worker.process.is_alive()
+            or worker.executions >= self.max_executions
+            or worker.max_rss_kb > self.max_memory_mb * 1024
+        )
+        if session_id is not None:
+            if recycle:
+                self._discard(worker, session_id)
+                return worker
+            return None
+        with self._lock:
+            if not recycle and len(self._idle) < self.size:
+                self._idle.append(worker)
+                return None
+        return worker
+
+    def _retire(self, worker: _PythonWorker, replenish: bool) -> None:
+        """Shut a used worker down and start a warm one in its place"""
+        try:
+            worker.close()
+            if replenish:
+                with self._lock:
+                    if self._started and len(self._idle) < self.size:
+                        self._idle.append(_PythonWorker(self.preload))
+        except Exception as e:
+            logger.warning(f"Failed to recycle Python worker: {e}")
+
+    def _discard(self, worker: _PythonWorker, session_id: Optional[str]) -> None:
+        with self._lock:
+            if session_id is not None and self._sessions.get(session_id) is worker:
+                del self._sessions[session_id]
+
+    async def run(
+        self, code: str, timeout: float = 5, session_id: Optional[str] = None
+    ) -> Dict:
+        """Execute ``code`` in a warm worker without blocking the event loop"""
+        self.start()
+        if session_id is None:
+            return await self._run(code, timeout, None)
+        lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            return await self._run(code, timeout, session_id)
+
+    async def _run(self, code: str, timeout: float, session_id: Optional[str]):
+        worker = self._acquire(session_id)
+        loop = asyncio.get_running_loop()
+        try:
+            result, max_rss_kb = await loop.run_in_executor(
+                None, worker.call, code, session_id, timeout, self.isolate
+            )
+        except TimeoutError:
+            self._discard(worker, session_id)
+            worker.kill()
+            if session_id is None:
+                loop.run_in_executor(None, self._retire, worker, True)
+            return {
+                "observation": f"Execution timeout after {timeout} seconds",
+                "success": False,
+            }
+        except (EOFError, OSError) as e:
+            self._discard(worker, session_id)
+            worker.kill()
+            logger.warning(f"Python worker exited unexpectedly: {e}")
+            return {
+                "observation": "Python worker exited unexpectedly",
+                "success": False,
+            }
+
+        worker.max_rss_kb = max_rss_kb
+        retired = self._release(worker, session_id)
+        if retired is not None:
+            # closing and forking block, so do that after the result is returned
+            loop.run_in_executor(None, self._retire, retired, session_id is None)
+        return result
+
+    def end_session(self, session_id: str) -> None:
+        """Drop a session's namespace by shutting down its worker"""
+        with self._lock:
+            worker = self._sessions.pop(session_id, None)
+        self._session_locks.pop(session_id, None)
+        if worker:
+            worker.close()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers = list(self._idle) + list(self._sessions.values())
+            self._idle = deque()
+            self._sessions = OrderedDict()
+            self._started = False
+        for worker in workers:
+            worker.kill()
+
+
+_worker_pool: Optional[PythonWorkerPool] = None
+
+
+def get_worker_pool() -> PythonWorkerPool:
+    """Return the process-wide worker pool shared by all PythonExecute tools"""
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = PythonWorkerPool()
+        atexit.register(_worker_pool.shutdown)
+    return _worker_pool
+
+
 class PythonExecute(BaseTool):
     """A tool for executing Python code with timeout and safety restrictions."""
 
@@ -22,19 +368,14 @@ class PythonExecute(BaseTool):
         "required": ["code"],
     }
 
-    def _run_code(self, code: str, result_dict: dict, safe_globals: dict) -> None:
-        original_stdout = sys.stdout
-        try:
-            output_buffer = StringIO()
-            sys.stdout = output_buffer
-            exec(code, safe_globals, safe_globals)
-            result_dict["observation"] = output_buffer.getvalue()
-            result_dict["success"] = True
-        except Exception as e:
-            result_dict["observation"] = str(e)
-            result_dict["success"] = False
-        finally:
-            sys.stdout = original_stdout
+    # When set, variables defined by one execution stay available to the next
+    session_id: Optional[str] = None
+    pool: Optional[PythonWorkerPool] = None
+
+    async def cleanup(self) -> None:
+        """End this tool's session so its pinned worker is released"""
+        if self.session_id is not None:
+            (self.pool or get_worker_pool()).end_session(self.session_id)
 
     async def execute(
         self,
@@ -51,25 +392,5 @@ class PythonExecute(BaseTool):
         Returns:
             Dict: Contains 'output' with execution output or error message and 'success' status.
         """
-
-        with multiprocessing.Manager() as manager:
-            result = manager.dict({"observation": "", "success": False})
-            if isinstance(__builtins__, dict):
-                safe_globals = {"__builtins__": __builtins__}
-            else:
-                safe_globals = {"__builtins__": __builtins__.__dict__.copy()}
-            proc = multiprocessing.Process(
-                target=self._run_code, args=(code, result, safe_globals)
-            )
-            proc.start()
-            proc.join(timeout)
-
-            # timeout process
-            if proc.is_alive():
-                proc.terminate()
-                proc.join(1)
-                return {
-                    "observation": f"Execution timeout after {timeout} seconds",
-                    "success": False,
-                }
-            return dict(result)
+        pool = self.pool or get_worker_pool()
+        return await pool.run(code, timeout=timeout, session_id=self.session_id)
@@ -1,3 +1,13 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+
+# Shared, bounded pool for engines whose client libraries only offer blocking
+# calls, so searches never compete with other work for the default executor.
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="web-search")
+
+
 class WebSearchEngine(object):
     def perform_search(
         self, query: str, num_results: int = 10, *args, **kwargs
@@ -15,3 +25,30 @@ class WebSearchEngine(object):
             List: A list of dict matching the search query.
         """
         raise NotImplementedError
+
+    async def search(self, query: str, num_results: int = 10) -> List[str]:
+        """
+        Run the search without blocking the event loop and return result URLs.
+
+        Engines backed by an async client can override this directly; the
+        default runs ``perform_search`` on the shared search thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            _search_executor,
+            lambda: list(self.perform_search(query, num_results=num_results)),
+        )
+        return self.normalize_results(results)
+
+    @staticmethod
+    def normalize_results(results) -> List[str]:
+        """Reduce engine-specific result items to a list of URLs"""
+        links = []
+        for item in results or []:
+            if isinstance(item, dict):
+                item = item.get("url") or item.get("href") or item.get("link")
+            else:
+                item = getattr(item, "url", item)
+            if item:
+                links.append(str(item))
+        return links
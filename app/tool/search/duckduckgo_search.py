@@ -1,9 +1,17 @@
+from typing import Optional
+
 from duckduckgo_search import DDGS
 
 from app.tool.search.base import WebSearchEngine
 
 
 class DuckDuckGoSearchEngine(WebSearchEngine):
-    async def perform_search(self, query, num_results=10, *args, **kwargs):
+    # One client per engine, created on first use, so its HTTP session is
+    # reused across searches
+    _client: Optional[DDGS] = None
+
+    def perform_search(self, query, num_results=10, *args, **kwargs):
         """DuckDuckGo search engine."""
-        return DDGS.text(query, num_results=num_results)
+        if self._client is None:
+            self._client = DDGS()
+        return self._client.text(query, max_results=num_results)
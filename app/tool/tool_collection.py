@@ -1,8 +1,10 @@
 """Collection classes for managing multiple tools."""
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from app.exceptions import ToolError
+from app.logger import logger
 from app.tool.base import BaseTool, ToolFailure, ToolResult
+from app.tracing import get_tracer
 
 
 class ToolCollection:
@@ -11,12 +13,29 @@ class ToolCollection:
     def __init__(self, *tools: BaseTool):
         self.tools = tools
         self.tool_map = {tool.name: tool for tool in tools}
+        # Bumped on every mutation; cached params/token counts are tied to it
+        self.version = 0
+        self._params_cache: Optional[List[Dict[str, Any]]] = None
+        self._params_version = -1
 
     def __iter__(self):
         return iter(self.tools)
 
     def to_params(self) -> List[Dict[str, Any]]:
-        return [tool.to_param() for tool in self.tools]
+        """Return the tool schemas, rebuilt only when the collection changes.
+
+        The same list object is returned until the next ``add_tool`` call, so
+        callers must treat it as read-only. ``LLM.ask_tool`` relies on this
+        identity to reuse the token count of the schemas across steps.
+        """
+        if self._params_version != self.version:
+            self._params_cache = [tool.to_param() for tool in self.tools]
+            self._params_version = self.version
+        return self._params_cache
+
+    def invalidate(self) -> None:
+        """Drop cached params, e.g. after a tool's schema was edited in place."""
+        self.version += 1
 
     async def execute(
         self, *, name: str, tool_input: Dict[str, Any] = None
@@ -24,11 +43,15 @@ class ToolCollection:
         tool = self.tool_map.get(name)
         if not tool:
             return ToolFailure(error=f"Tool {name} is invalid")
-        try:
-            result = await tool(**tool_input)
-            return result
-        except ToolError as e:
-            return ToolFailure(error=e.message)
+        with get_tracer().start_span("tool.execute", tool=name) as span:
+            try:
+                result = await tool(**tool_input)
+                if getattr(result, "error", None):
+                    span.record_error(result.error)
+                return result
+            except ToolError as e:
+                span.record_error(e.message)
+                return ToolFailure(error=e.message)
 
     async def execute_all(self) -> List[ToolResult]:
         """Execute all tools in the collection sequentially."""
@@ -41,12 +64,21 @@ class ToolCollection:
                 results.append(ToolFailure(error=e.message))
         return results
 
+    async def cleanup(self) -> None:
+        """Release the resources of every tool, e.g. when an agent is done."""
+        for tool in self.tools:
+            try:
+                await tool.cleanup()
+            except Exception as e:
+                logger.warning(f"Failed to clean up tool {tool.name}: {e}")
+
     def get_tool(self, name: str) -> BaseTool:
         return self.tool_map.get(name)
 
     def add_tool(self, tool: BaseTool):
         self.tools += (tool,)
         self.tool_map[tool.name] = tool
+        self.invalidate()
         return self
 
     def add_tools(self, *tools: BaseTool):
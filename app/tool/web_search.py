@@ -1,9 +1,11 @@
 import asyncio
-from typing import List
-
-from tenacity import retry, stop_after_attempt, wait_exponential
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 
 from app.config import config
+from app.logger import logger
 from app.tool.base import BaseTool
 from app.tool.search import (
     BaiduSearchEngine,
@@ -13,6 +15,61 @@ from app.tool.search import (
 )
 
 
+@dataclass
+class EngineStats:
+    """Latency and outcome counters for one search engine."""
+
+    requests: int = 0
+    failures: int = 0
+    total_latency: float = 0.0
+    last_latency: float = 0.0
+
+    @property
+    def average_latency(self) -> float:
+        return self.total_latency / self.requests if self.requests else 0.0
+
+    def record(self, latency: float, success: bool) -> None:
+        self.requests += 1
+        self.total_latency += latency
+        self.last_latency = latency
+        if not success:
+            self.failures += 1
+
+
+class SearchResultCache:
+    """LRU cache of search results whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[str]]]" = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def key_for(query: str, num_results: int) -> Tuple[str, int]:
+        return " ".join(query.lower().split()), num_results
+
+    def get(self, query: str, num_results: int) -> Optional[List[str]]:
+        key = self.key_for(query, num_results)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, links = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return list(links)
+
+    def set(self, query: str, num_results: int, links: List[str]) -> None:
+        key = self.key_for(query, num_results)
+        self._entries[key] = (time.monotonic(), list(links))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
 class WebSearch(BaseTool):
     name: str = "web_search"
     description: str = """Perform a web search and return a list of relevant links.
@@ -33,16 +90,24 @@ class WebSearch(BaseTool):
         },
         "required": ["query"],
     }
+    parallel_safe: bool = True
     _search_engine: dict[str, WebSearchEngine] = {
         "google": GoogleSearchEngine(),
         "baidu": BaiduSearchEngine(),
         "duckduckgo": DuckDuckGoSearchEngine(),
     }
+    _cache: Optional[SearchResultCache] = None
+    _engine_stats: Dict[str, EngineStats] = {}
 
     async def execute(self, query: str, num_results: int = 10) -> List[str]:
         """
         Execute a Web search and return a list of URLs.
 
+        Results are served from a short-lived cache when the same query was
+        run recently. Otherwise the preferred engine is queried first and the
+        next engine is started if it fails or is slower than the configured
+        hedge delay; the first non-empty result wins.
+
         Args:
             query (str): The search query to submit to the search engine.
             num_results (int, optional): The number of search results to return. Default is 10.
@@ -50,18 +115,97 @@ class WebSearch(BaseTool):
         Returns:
             List[str]: A list of URLs matching the search query.
         """
-        engine_order = self._get_engine_order()
-        for engine_name in engine_order:
-            engine = self._search_engine[engine_name]
-            try:
-                links = await self._perform_search_with_engine(
-                    engine, query, num_results
+        cache = self._get_cache()
+        cached = cache.get(query, num_results)
+        if cached is not None:
+            return cached
+
+        links = await self._hedged_search(query, num_results)
+        if links:
+            cache.set(query, num_results, links)
+        return links
+
+    def _get_cache(self) -> SearchResultCache:
+        if self._cache is None:
+            settings = config.search_config
+            self._cache = SearchResultCache(
+                max_entries=settings.cache_size if settings else 256,
+                ttl=settings.cache_ttl if settings else 300,
+            )
+        return self._cache
+
+    def _hedge_delay(self) -> float:
+        settings = config.search_config
+        return settings.hedge_delay if settings else 2.0
+
+    async def _hedged_search(self, query: str, num_results: int) -> List[str]:
+        remaining = iter(self._get_engine_order())
+        pending: Dict[asyncio.Task, str] = {}
+
+        def launch_next() -> bool:
+            engine_name = next(remaining, None)
+            if engine_name is None:
+                return False
+            task = asyncio.create_task(
+                self._search_with_engine(engine_name, query, num_results)
+            )
+            pending[task] = engine_name
+            return True
+
+        launch_next()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self._hedge_delay(),
+                    return_when=asyncio.FIRST_COMPLETED,
                 )
-                if links:
-                    return links
-            except Exception as e:
-                print(f"Search engine '{engine_name}' failed with error: {e}")
-        return []
+                if not done:
+                    if launch_next():
+                        logger.info("Search engine is slow, hedging with the next one")
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    links = task.result()
+                    if links:
+                        return links
+                # A failed or empty engine is replaced by the next one right away
+                launch_next()
+            return []
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _search_with_engine(
+        self, engine_name: str, query: str, num_results: int
+    ) -> List[str]:
+        """Query one engine, recording its latency; failures yield no links"""
+        engine = self._search_engine[engine_name]
+        stats = self._engine_stats.setdefault(engine_name, EngineStats())
+        start = time.perf_counter()
+        try:
+            links = await engine.search(query, num_results=num_results)
+        except asyncio.CancelledError:
+            stats.record(time.perf_counter() - start, success=False)
+            raise
+        except Exception as e:
+            stats.record(time.perf_counter() - start, success=False)
+            logger.warning(f"Search engine '{engine_name}' failed with error: {e}")
+            return []
+        stats.record(time.perf_counter() - start, success=bool(links))
+        return links
+
+    def engine_stats(self) -> Dict[str, dict]:
+        """Latency statistics per search engine"""
+        return {
+            name: {
+                "requests": stats.requests,
+                "failures": stats.failures,
+                "average_latency": round(stats.average_latency, 4),
+                "last_latency": round(stats.last_latency, 4),
+            }
+            for name, stats in self._engine_stats.items()
+        }
 
     def _get_engine_order(self) -> List[str]:
         """
@@ -82,18 +226,3 @@ class WebSearch(BaseTool):
             if key not in engine_order:
                 engine_order.append(key)
         return engine_order
-
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-    )
-    async def _perform_search_with_engine(
-        self,
-        engine: WebSearchEngine,
-        query: str,
-        num_results: int,
-    ) -> List[str]:
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, lambda: list(engine.perform_search(query, num_results=num_results))
-        )
@@ -0,0 +1,383 @@
+"""Lightweight spans for timing LLM calls, tool calls, agent steps and plan steps.
+
+The default tracer is a no-op. Configure ``[tracing]`` in config.toml, or call
+``set_tracer``, to record spans into a JSON lines file or a Chrome trace that
+can be opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+import asyncio
+import atexit
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+from app.config import PROJECT_ROOT, config
+from app.logger import logger
+
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+def _track() -> str:
+    """Name of the task, or thread outside of a task, a span runs on"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task.get_name() if task else threading.current_thread().name
+
+
+class Span:
+    """A timed operation with attributes; use as a context manager."""
+
+    __slots__ = (
+        "name",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "track",
+        "start_ns",
+        "end_ns",
+        "error",
+        "_tracer",
+        "_token",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = next(_span_ids)
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.track = _track()
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._tracer = tracer
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def record_error(self, error: Union[BaseException, str]) -> None:
+        if isinstance(error, BaseException):
+            error = f"{type(error).__name__}: {error}"
+        self.error = error
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "track": self.track,
+            "start_us": self.start_ns // 1000,
+            "duration_ms": round(self.duration_ms, 3),
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.perf_counter_ns()
+        _current_span.reset(self._token)
+        # cancellation is how asyncio stops work, not a failure of the span
+        if exc is not None and not isinstance(exc, asyncio.CancelledError):
+            self.record_error(exc)
+        self._tracer._finish(self)
+
+
+class _NoopSpan:
+    """Stands in for a span when tracing is off"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes) -> None:
+        pass
+
+    def record_error(self, error: Union[BaseException, str]) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter:
+    """Receives finished spans; ``shutdown`` writes anything still buffered"""
+
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonLinesExporter(SpanExporter):
+    """Appends one JSON object per finished span to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class ChromeTraceExporter(SpanExporter):
+    """Collects spans and writes them in the Chrome trace event format.
+
+    Each asyncio task gets its own row, so concurrent steps and tool calls
+    show up side by side.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._events: List[Dict[str, Any]] = []
+        self._tracks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        args = dict(span.attributes)
+        if span.error:
+            args["error"] = span.error
+        with self._lock:
+            tid = self._tracks.setdefault(span.track, len(self._tracks) + 1)
+            self._events.append(
+                {
+                    "name": span.name,
+                    "cat": span.name.split(".")[0],
+                    "ph": "X",
+                    "ts": span.start_ns / 1000,
+                    "dur": (span.end_ns - span.start_ns) / 1000,
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+
+    def flush(self) -> None:
+        """Write every span collected so far"""
+        with self._lock:
+            names = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"name": track},
+                }
+                for track, tid in self._tracks.items()
+            ]
+            trace = {"traceEvents": names + self._events, "displayTimeUnit": "ms"}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, default=str)
+
+    def shutdown(self) -> None:
+        self.flush()
+
+
+class Tracer:
+    """Records spans, hands them to exporters and keeps per-name totals."""
+
+    enabled = True
+
+    def __init__(self, exporters: Iterable[SpanExporter] = ()):
+        self.exporters = list(exporters)
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, **attributes) -> Span:
+        return Span(self, name, attributes)
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(
+                span.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0}
+            )
+            totals["count"] += 1
+            totals["total_ms"] += span.duration_ms
+            totals["max_ms"] = max(totals["max_ms"], span.duration_ms)
+            totals["errors"] += span.error is not None
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.warning(f"Failed to export span {span.name}: {e}")
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, total, mean and max duration per span name"""
+        with self._lock:
+            return {
+                name: {
+                    **totals,
+                    "total_ms": round(totals["total_ms"], 3),
+                    "mean_ms": round(totals["total_ms"] / totals["count"], 3),
+                    "max_ms": round(totals["max_ms"], 3),
+                }
+                for name, totals in sorted(
+                    self._totals.items(), key=lambda item: -item[1]["total_ms"]
+                )
+            }
+
+    def format_summary(self) -> str:
+        lines = [f"{'span':<24}{'count':>7}{'total ms':>12}{'mean ms':>10}"]
+        for name, totals in self.summary().items():
+            lines.append(
+                f"{name:<24}{totals['count']:>7}{totals['total_ms']:>12.1f}{totals['mean_ms']:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def shutdown(self) -> None:
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+
+class NoopTracer(Tracer):
+    """Default tracer: spans cost one call and record nothing"""
+
+    enabled = False
+
+    def start_span(self, name: str, **attributes) -> _NoopSpan:
+        return NOOP_SPAN
+
+
+_tracer: Optional[Tracer] = None
+
+
+def _tracer_from_config() -> Tracer:
+    settings = config.tracing_config
+    if not settings or settings.exporter == "none":
+        return NoopTracer()
+    if settings.exporter == "chrome":
+        exporter = ChromeTraceExporter(
+            settings.path or str(PROJECT_ROOT / "logs" / "trace.json")
+        )
+    else:
+        exporter = JsonLinesExporter(
+            settings.path or str(PROJECT_ROOT / "logs" / "spans.jsonl")
+        )
+    tracer = Tracer([exporter])
+    atexit.register(tracer.shutdown)
+    return tracer
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer, set up from ``[tracing]`` on first use"""
+    global _tracer
+    if _tracer is None:
+        _tracer = _tracer_from_config()
+    return _tracer
+
+
+def set_tracer(tracer: Tracer) -> Tracer:
+    """Replace the process-wide tracer; returns the previous one"""
+    global _tracer
+    previous, _tracer = get_tracer(), tracer
+    return previous
+
+
+def current_span() -> Any:
+    """The span the caller runs in, or a no-op span"""
+    return _current_span.get() or NOOP_SPAN
+
+
+async def _traced_stream(
+    name: str, attributes: Dict[str, Any], stream: AsyncIterator
+) -> AsyncIterator:
+    """Yield from ``stream`` inside a span that lasts until it is exhausted.
+
+    The span is only current while the stream itself runs, not while the
+    caller handles an item, so work the caller does in between is not
+    attributed to the stream.
+    """
+    span = get_tracer().start_span(name, **attributes)
+    recording = isinstance(span, Span)
+    if recording:
+        span.start_ns = time.perf_counter_ns()
+    try:
+        while True:
+            token = _current_span.set(span) if recording else None
+            try:
+                item = await stream.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                if token is not None:
+                    _current_span.reset(token)
+            yield item
+    except (asyncio.CancelledError, GeneratorExit):
+        raise
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        await stream.aclose()
+        if recording:
+            span.end_ns = time.perf_counter_ns()
+            span._tracer._finish(span)
+
+
+def traced(name: str, **attributes) -> Callable:
+    """Run every call of an async function, or async generator, in a span"""
+
+    def decorator(fn: Callable) -> Callable:
+        if inspect.isasyncgenfunction(fn):
+
+            @functools.wraps(fn)
+            def stream_wrapper(*args, **kwargs):
+                return _traced_stream(name, attributes, fn(*args, **kwargs))
+
+            return stream_wrapper
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with get_tracer().start_span(name, **attributes):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
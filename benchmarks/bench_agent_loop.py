@@ -0,0 +1,274 @@
+"""Measure end-to-end agent loop throughput against a scripted mock LLM server.
+
+Usage:
+    python benchmarks/bench_agent_loop.py [--steps 50] [--latency 0.0]
+        [--scenarios toolcall swe planning manus planning_flow]
+        [--save results.json] [--compare baseline.json] [--tolerance 0.2]
+
+Starts ``mock_llm_server.MockLLMServer`` and drives each agent through the
+real ``LLM`` client for ``--steps`` steps. Every scripted response calls a
+``bench_echo`` tool added to the agent, so the numbers reflect the agent
+loop rather than real tools. Per scenario it reports steps per second, the
+framework overhead per step (wall time minus the simulated LLM latency),
+time spent counting tokens, and the memory the run left allocated. Each
+scenario runs a second time under tracemalloc for the memory figures, so
+tracing does not skew the timings.
+
+``--save`` writes the results as JSON; ``--compare`` reads such a file and
+exits with status 1 when a metric is worse than the baseline by more than
+``--tolerance``.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Optional
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_llm_server import MockLLMServer
+
+from app.agent.base import BaseAgent
+from app.agent.planning import PlanningAgent
+from app.agent.swe import SWEAgent
+from app.agent.toolcall import ToolCallAgent
+from app.config import LLMSettings
+from app.events import EventBus, EventType
+from app.flow.planning import PlanningFlow
+from app.llm import LLM, TokenUsage
+from app.logger import logger
+from app.tool import ToolCollection
+from app.tool.base import BaseTool
+
+
+# Agent steps each plan step runs in the planning_flow scenario
+STEPS_PER_PLAN_STEP = 5
+
+# metric -> whether a larger value is better
+METRICS = {
+    "steps_per_sec": True,
+    "overhead_ms_per_step": False,
+    "tokenize_ms_per_step": False,
+    "memory_kb_per_step": False,
+}
+
+
+class BenchEcho(BaseTool):
+    name: str = "bench_echo"
+    description: str = "Returns its input; used by the agent loop benchmark."
+    parameters: dict = {"type": "object", "properties": {"text": {"type": "string"}}}
+    parallel_safe: bool = True
+
+    async def execute(self, text: str = "") -> str:
+        return text
+
+
+def _manus(**kwargs) -> BaseAgent:
+    from app.agent.manus import Manus
+
+    return Manus(**kwargs)
+
+
+AGENTS: Dict[str, Callable[..., BaseAgent]] = {
+    "toolcall": ToolCallAgent,
+    "swe": SWEAgent,
+    "planning": PlanningAgent,
+    "manus": _manus,
+}
+
+SCENARIOS = list(AGENTS) + ["planning_flow"]
+
+
+def _llm(server: MockLLMServer) -> LLM:
+    settings = LLMSettings(
+        model="mock-model",
+        base_url=server.base_url,
+        api_key="bench",
+        api_type="openai",
+        api_version="",
+        max_tokens=1024,
+    )
+    return LLM("bench", {"default": settings, "bench": settings}, usage=TokenUsage())
+
+
+def _agent(name: str, llm: LLM, bus: EventBus, max_steps: int) -> BaseAgent:
+    agent = AGENTS[name](llm=llm, max_steps=max_steps, event_bus=bus)
+    agent.available_tools = ToolCollection(*agent.available_tools.tools, BenchEcho())
+    return agent
+
+
+class _TokenTimer:
+    """Wraps an LLM's token counting methods to total their run time"""
+
+    def __init__(self, llm: LLM):
+        self.seconds = 0.0
+        for method in ("count_message_tokens", "count_tools_tokens"):
+            setattr(llm, method, self._timed(getattr(llm, method)))
+
+    def _timed(self, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+
+        return wrapper
+
+
+async def _run_scenario(name: str, server: MockLLMServer, steps: int) -> dict:
+    llm = _llm(server)
+    timer = _TokenTimer(llm)
+    bus = EventBus(history=1)
+    counted = {"steps": 0}
+
+    def count(event):
+        if event.type == EventType.STEP_FINISHED:
+            counted["steps"] += 1
+
+    bus.add_handler(count)
+    if name == "planning_flow":
+        server.plan_steps = max(1, steps // STEPS_PER_PLAN_STEP)
+        agent = _agent("toolcall", llm, bus, STEPS_PER_PLAN_STEP)
+        flow = PlanningFlow({"bench": agent}, llm=llm, plan_id=f"bench_{time.time()}")
+        run = lambda: flow.execute("Benchmark the planning flow")
+    else:
+        agent = _agent(name, llm, bus, steps)
+        run = lambda: agent.run("Benchmark the agent loop")
+
+    requests = server.requests
+    # LLM.ask prints streamed tokens
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        await run()
+        elapsed = time.perf_counter() - start
+    if hasattr(agent, "cleanup"):
+        await agent.cleanup()
+
+    done = max(counted["steps"], 1)
+    requests = server.requests - requests
+    return {
+        "steps": counted["steps"],
+        "llm_requests": requests,
+        "seconds": round(elapsed, 4),
+        "steps_per_sec": round(counted["steps"] / elapsed, 2),
+        "overhead_ms_per_step": round(
+            (elapsed - requests * server.latency) / done * 1000, 3
+        ),
+        "tokenize_ms_per_step": round(timer.seconds / done * 1000, 3),
+        "messages": len(agent.memory.messages),
+    }
+
+
+async def _memory_per_step(name: str, server: MockLLMServer, steps: int) -> float:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        result = await _run_scenario(name, server, steps)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return round(grown / max(result["steps"], 1) / 1024, 3)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with MockLLMServer(latency=args.latency) as server:
+        for name in args.scenarios:
+            try:
+                result = await _run_scenario(name, server, args.steps)
+                if not args.no_memory:
+                    result["memory_kb_per_step"] = await _memory_per_step(
+                        name, server, args.steps
+                    )
+            except ImportError as e:
+                print(f"{name:<14} skipped: {e}")
+                continue
+            results[name] = result
+    return results
+
+
+def _print(results: Dict[str, Any]) -> None:
+    print(
+        f"{'scenario':<14} {'steps':>6} {'steps/s':>9} {'overhead ms':>12} "
+        f"{'tokenize ms':>12} {'KB/step':>9} {'messages':>9}"
+    )
+    for name, r in results.items():
+        memory = r.get("memory_kb_per_step")
+        print(
+            f"{name:<14} {r['steps']:>6} {r['steps_per_sec']:>9.1f} "
+            f"{r['overhead_ms_per_step']:>12.3f} {r['tokenize_ms_per_step']:>12.3f} "
+            f"{'-' if memory is None else f'{memory:.1f}':>9} {r['messages']:>9}"
+        )
+
+
+def _compare(results: Dict[str, Any], baseline_path: str, tolerance: float) -> bool:
+    """Print changes against a saved run; returns False on a regression"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    ok = True
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for name, result in results.items():
+        for metric, higher_is_better in METRICS.items():
+            old: Optional[float] = baseline.get(name, {}).get(metric)
+            new = result.get(metric)
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / abs(old)
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > tolerance else ""
+            ok = ok and not flag
+            print(
+                f"  {name:<14} {metric:<22} {old:>10} -> {new:<10} {change:+.1%} {flag}"
+            )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Simulated seconds per LLM call"
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the memory pass")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    results = asyncio.run(run(args))
+    _print(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "python": platform.python_version(),
+                        "steps": args.steps,
+                        "latency": args.latency,
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.compare and not _compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Measure PlanningTool ``mark_step`` throughput on large persisted plans.
+
+Usage:
+    python benchmarks/bench_plan_persistence.py [--steps 5000] [--marks 1000]
+
+Creates one plan with ``--steps`` steps for each storage backend and marks
+``--marks`` steps, once writing every change through and once with the
+write-behind store flushing in the background. Plan rendering is stubbed out
+so the numbers reflect persistence cost only.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.tool.planning import PlanningTool
+
+
+async def _run(storage_type: str, path: str, steps: int, marks: int, interval):
+    tool = PlanningTool(
+        storage_type=storage_type, storage_path=path, flush_interval=interval
+    )
+    tool._format_plan = lambda plan: ""
+    await tool.execute(
+        command="create",
+        plan_id="bench",
+        title="bench",
+        steps=[f"step {i}" for i in range(steps)],
+    )
+    start = time.perf_counter()
+    for i in range(marks):
+        await tool.execute(
+            command="mark_step",
+            plan_id="bench",
+            step_index=i % steps,
+            step_status="completed",
+        )
+    elapsed = time.perf_counter() - start
+    close_start = time.perf_counter()
+    tool.close()
+    return elapsed, time.perf_counter() - close_start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument("--marks", type=int, default=1000)
+    parser.add_argument("--interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'mode':<13} {'marks/s':>10} {'close ms':>10}")
+    for storage_type, filename in (("json", "plans.json"), ("sqlite", "plans.db")):
+        for mode, interval in (
+            ("write-through", None),
+            ("write-behind", args.interval),
+        ):
+            with tempfile.TemporaryDirectory() as tmp:
+                elapsed, close = asyncio.run(
+                    _run(
+                        storage_type,
+                        os.path.join(tmp, filename),
+                        args.steps,
+                        args.marks,
+                        interval,
+                    )
+                )
+            print(
+                f"{storage_type:<8} {mode:<13} {args.marks / elapsed:>10.0f} {close * 1000:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
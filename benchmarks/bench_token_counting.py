@@ -0,0 +1,87 @@
+"""Measure per-step tokenization cost as conversation memory grows.
+
+Usage:
+    python benchmarks/bench_token_counting.py [--steps 50]
+
+Simulates an agent loop where every step appends an assistant tool call and a
+tool observation to memory and then counts the tokens of the full history, as
+``LLM.ask_tool`` does before each request. The cached counter should stay flat
+per step while the uncached one grows with the history length.
+"""
+import argparse
+import os
+import sys
+import time
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.llm import LLM, TokenCounter
+from app.schema import Function, Memory, Message, ToolCall
+
+
+class _NoCache:
+    """Cache stand-in that never stores anything."""
+
+    hits = misses = 0
+
+    @staticmethod
+    def key_for(message):
+        return None
+
+    def get(self, key):
+        return None
+
+    def set(self, key, tokens):
+        pass
+
+
+def _append_step(memory: Memory, step: int) -> None:
+    call = ToolCall(
+        id=f"call_{step}",
+        function=Function(
+            name="python_execute", arguments='{"code": "print(%d)"}' % step
+        ),
+    )
+    memory.add_message(
+        Message(role="assistant", content=f"Step {step} reasoning", tool_calls=[call])
+    )
+    memory.add_message(
+        Message.tool_message(
+            "observation line\n" * 200, name="python_execute", tool_call_id=call.id
+        )
+    )
+
+
+def run(steps: int) -> None:
+    tokenizer = LLM().tokenizer
+    counters = {
+        "uncached": TokenCounter(tokenizer, cache=_NoCache()),
+        "cached": TokenCounter(tokenizer),
+    }
+    memories = {name: Memory(max_messages=10_000) for name in counters}
+
+    print(f"{'step':>6} {'messages':>9} {'uncached ms':>12} {'cached ms':>10}")
+    for step in range(1, steps + 1):
+        timings = {}
+        for name, counter in counters.items():
+            memory = memories[name]
+            _append_step(memory, step)
+            formatted = LLM.format_messages(memory.messages)
+            start = time.perf_counter()
+            counter.count_message_tokens(formatted)
+            timings[name] = (time.perf_counter() - start) * 1000
+        if step == 1 or step % 10 == 0:
+            print(
+                f"{step:>6} {len(memories['cached'].messages):>9} "
+                f"{timings['uncached']:>12.3f} {timings['cached']:>10.3f}"
+            )
+
+    cache = counters["cached"].cache
+    print(f"cache hits={cache.hits} misses={cache.misses} entries={len(cache)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=50)
+    run(parser.parse_args().steps)
@@ -0,0 +1,225 @@
+"""Local OpenAI-compatible chat completions server with scripted responses.
+
+Used by the agent benchmarks so that agent loops can be driven through the
+real ``LLM`` client and HTTP stack without a model behind it. Each request
+gets the next response of a script after sleeping for the configured latency.
+
+Usage as a standalone server:
+    python benchmarks/mock_llm_server.py [--port 8765] [--latency 0.05]
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+# Calls a tool the benchmarks add to every agent; see bench_agent_loop.py
+DEFAULT_SCRIPT = [{"tool": "bench_echo", "arguments": {"text": "ok"}}]
+
+DEFAULT_PLAN_STEPS = 3
+
+# Plan creation prompts of PlanningFlow and PlanningAgent; the latter names
+# the plan id
+_PLAN_REQUEST = re.compile(r"[Cc]reate (?:a reasonable plan|a plan with ID (\w+))")
+
+
+def _estimate_tokens(payload: Any) -> int:
+    return max(1, len(json.dumps(payload)) // 4)
+
+
+class MockLLMServer:
+    """Serves ``/v1/chat/completions`` from a background thread.
+
+    A scripted entry is either ``{"tool": name, "arguments": {...}}`` or
+    ``{"content": text}``; the script repeats. Tool entries naming a tool the
+    request does not offer are answered with content instead. Requests that
+    offer the ``planning`` tool to create a plan get a plan with
+    ``plan_steps`` steps, so planning flows can be driven too. Both streaming
+    and non-streaming requests are supported.
+    """
+
+    def __init__(
+        self,
+        script: Optional[List[Dict[str, Any]]] = None,
+        latency: float = 0.0,
+        plan_steps: int = DEFAULT_PLAN_STEPS,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.script = script or DEFAULT_SCRIPT
+        self.latency = latency
+        self.plan_steps = plan_steps
+        self.requests = 0
+        self._entries = itertools.cycle(self.script)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="mock-llm", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def respond(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """The assistant message for a chat completions request"""
+        with self._lock:
+            self.requests += 1
+            count = self.requests
+            entry = next(self._entries)
+        tools = {
+            tool["function"]["name"] for tool in request.get("tools") or [] if tool
+        }
+        last = json.dumps(request.get("messages", [])[-1:])
+        plan_request = _PLAN_REQUEST.search(last)
+        if "planning" in tools and plan_request:
+            entry = {
+                "tool": "planning",
+                "arguments": {
+                    "command": "create",
+                    "plan_id": plan_request.group(1) or "bench_plan",
+                    "title": "Benchmark plan",
+                    "steps": [f"Benchmark step {i}" for i in range(self.plan_steps)],
+                },
+            }
+        # vary the text so agents do not see identical turns as being stuck
+        content = entry.get("content") or f"Scripted response {count}"
+        if entry.get("tool") not in tools:
+            return {"role": "assistant", "content": content}
+        return {
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [
+                {
+                    "id": f"call_{count}",
+                    "type": "function",
+                    "function": {
+                        "name": entry["tool"],
+                        "arguments": json.dumps(entry.get("arguments", {})),
+                    },
+                }
+            ],
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out in separate writes; without this Nagle's
+            # algorithm holds the body back for a delayed ACK on every request
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                message = server.respond(request)
+                if server.latency:
+                    time.sleep(server.latency)
+                usage = {
+                    "prompt_tokens": _estimate_tokens(request.get("messages")),
+                    "completion_tokens": _estimate_tokens(message),
+                }
+                usage["total_tokens"] = sum(usage.values())
+                base = {
+                    "id": f"chatcmpl-{server.requests}",
+                    "created": int(time.time()),
+                    "model": request.get("model", "mock"),
+                }
+                if request.get("stream"):
+                    self._stream(base, message)
+                    return
+                body = json.dumps(
+                    {
+                        **base,
+                        "object": "chat.completion",
+                        "choices": [
+                            {"index": 0, "message": message, "finish_reason": "stop"}
+                        ],
+                        "usage": usage,
+                    }
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, base: Dict[str, Any], message: Dict[str, Any]):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                deltas = [{"role": "assistant", "content": ""}]
+                text = message["content"]
+                deltas += [{"content": text[i : i + 8]} for i in range(0, len(text), 8)]
+                for index, call in enumerate(message.get("tool_calls") or []):
+                    deltas.append({"tool_calls": [{**call, "index": index}]})
+                for delta in deltas:
+                    chunk = {
+                        **base,
+                        "object": "chat.completion.chunk",
+                        "choices": [
+                            {"index": 0, "delta": delta, "finish_reason": None}
+                        ],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--plan-steps", type=int, default=DEFAULT_PLAN_STEPS)
+    parser.add_argument("--script", help="JSON file with a list of scripted entries")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    server = MockLLMServer(script, args.latency, args.plan_steps, port=args.port)
+    print(f"Serving scripted completions on {server.base_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
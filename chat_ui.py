@@ -1,8 +1,9 @@
-import asyncio
+import uuid
 
 import gradio as gr
 
 from app.logger import logger
+from app.session import SessionManager, clone_agent, release_session
 
 
 try:
@@ -16,13 +17,15 @@ Manus = _Manus
 class ChatSession:
     """Maintain a Manus agent instance for a chat session."""
 
-    def __init__(self):
+    def __init__(self, agent=None):
         global Manus
-        if Manus is None:
-            from app.agent.manus import Manus as _Manus
+        if agent is None:
+            if Manus is None:
+                from app.agent.manus import Manus as _Manus
 
-            Manus = _Manus
-        self.agent = Manus()
+                Manus = _Manus
+            agent = Manus()
+        self.agent = agent
         logger.info("Chat session initialized")
 
     async def generate(self, message: str) -> str:
@@ -46,10 +49,24 @@ def get_session() -> ChatSession:
     return session
 
 
-def respond(message, history):
-    """Wrapper for gradio ChatInterface."""
-    sess = get_session()
-    return asyncio.run(sess.generate(message))
+_prototype = None
+
+
+def _new_session() -> ChatSession:
+    """Create a session whose agent is cloned from a warm prototype."""
+    global _prototype
+    if _prototype is None:
+        _prototype = ChatSession().agent
+    return ChatSession(agent=clone_agent(_prototype))
+
+
+sessions = SessionManager(_new_session, on_evict=release_session)
+
+
+def respond(message, history, state):
+    """Wrapper for gradio ChatInterface, run in the caller's own session."""
+    session_id = state.setdefault("session_id", uuid.uuid4().hex)
+    return sessions.run_sync(session_id, lambda sess: sess.generate(message))
 
 
 MARKETPLACE_LINK = (
@@ -59,8 +76,11 @@ MARKETPLACE_LINK = (
 
 with gr.Blocks() as chatbot:
     gr.Markdown(MARKETPLACE_LINK)
+    # gradio keeps a separate copy of this state for every browser session
+    browser_session = gr.State({})
     gr.ChatInterface(
         respond,
+        additional_inputs=[browser_session],
         title="Manus Chat",
         description="ChatGPT style interface powered by Manus agent",
     )
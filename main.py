@@ -1,104 +1,102 @@
 import asyncio
-import logging
-import threading
-import time
+import uuid
+from typing import Dict
 
 import gradio as gr
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.agent.manus import Manus
+from app.events import EventBus, EventType, events_until, sse_stream
 from app.logger import logger
 
 
-progress_data = {
-    "status": "idle",
-    "progress": 0,
-    "details": [],  # To store detailed execution steps
-}
+# Event buses of the runs in progress, by run id. Every run gets its own bus,
+# so users, and /events clients, only see the progress of their own run.
+active_runs: Dict[str, EventBus] = {}
+
+
+def new_progress(run_id=None):
+    return {
+        "status": "idle",
+        "progress": 0,
+        "run_id": run_id,
+        "details": [],  # To store detailed execution steps
+    }
 
 
 # Function to update progress details
-def update_progress(status, progress, detail):
-    global progress_data
+def update_progress(progress_data, status, progress, detail):
     progress_data["status"] = status
     progress_data["progress"] = progress
     progress_data["details"].append(detail)
 
 
-# Function to capture logs and update the progress UI
-def capture_logs_to_ui():
-    # Update UILogHandler to filter out logs from get_progress_ui
-    class UILogHandler(logging.Handler):
-        def emit(self, record):
-            # Skip logs from get_progress_ui
-            if "get_progress_ui" in record.name:
-                return
-            # Only include step-related logs
-            if "step" in record.msg.lower():
-                log_entry = self.format(record)
-                update_progress("log", 0, log_entry)
-
-    handler = UILogHandler()
-    handler.setLevel(logging.INFO)
-    formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
-    handler.setFormatter(formatter)
-    logging.getLogger().addHandler(handler)
-
-
-# Update the logger configuration to filter out logs from get_progress_ui
-logging.getLogger("__main__.get_progress_ui").setLevel(logging.WARNING)
-
-# Call this function at the start of the application
-capture_logs_to_ui()
-
-
-# Function to handle user input and process it with the Manus agent
-def process_prompt(prompt):
+# Function to handle user input and process it with the Manus agent.
+# Progress is pushed to the UI whenever the agent publishes an event.
+async def process_prompt(prompt):
     if not prompt.strip():
         logger.warning("Empty prompt provided.")
-        return {"status": "error", "message": "Prompt cannot be empty."}
+        yield {"status": "error", "message": "Prompt cannot be empty."}
+        return
 
+    run_id = uuid.uuid4().hex
+    bus = active_runs[run_id] = EventBus()
+    progress_data = new_progress(run_id)
     try:
         # Update progress to processing
-        update_progress("processing", 0, "Received prompt and starting processing.")
+        update_progress(
+            progress_data, "processing", 0, "Received prompt and starting processing."
+        )
+        yield progress_data
 
         logger.warning("Processing your request...")
-        agent = Manus()
-        asyncio.run(agent.run(prompt))
+        agent = Manus(event_bus=bus)
+        with bus.subscribe() as events:
+            task = asyncio.create_task(agent.run(prompt))
+            async for event in events_until(events, task):
+                if event.type == EventType.STEP_STARTED:
+                    progress_data["progress"] = int(
+                        100 * (event.data["step"] - 1) / event.data["max_steps"]
+                    )
+                detail = event.describe()
+                if detail:
+                    update_progress(
+                        progress_data, "processing", progress_data["progress"], detail
+                    )
+                    yield progress_data
+            await task
 
         # Update progress to completed
-        update_progress("completed", 100, "Request processing completed.")
+        update_progress(
+            progress_data, "completed", 100, "Request processing completed."
+        )
 
         logger.info("Request processing completed.")
-        return {"status": "success", "message": "Request processed successfully."}
+        yield progress_data
     except Exception as e:
         logger.error(f"Error processing request: {e}")
-        return {"status": "error", "message": str(e)}
+        yield {"status": "error", "message": str(e)}
+    finally:
+        active_runs.pop(run_id, None)
+        bus.close()
 
 
 # Gradio interface
 def reset_progress_ui():
-    global progress_data
-    progress_data = {"status": "idle", "progress": 0, "details": []}
-    return "Progress reset successfully."
-
+    return new_progress()
 
-# Add debugging to confirm the data being passed to the Gradio UI
-# Update the get_progress_ui function to log the progress_data
-def get_progress_ui():
-    logger.info(f"Progress data being sent to UI: {progress_data}")
-    return progress_data  # Ensure all fields, including 'details', are returned
 
-
-def start_progress_updater():
-    def update_loop():
-        while True:
-            time.sleep(1)  # Update every second
-            progress_data_to_ui = get_progress_ui()
-            logger.info(f"Updating UI with progress data: {progress_data_to_ui}")
-            progress_display.update(value=progress_data_to_ui)
-
-    thread = threading.Thread(target=update_loop, daemon=True)
-    thread.start()
+# Stream the events of one run to other clients (e.g. dashboards) as
+# Server-Sent Events; the run id is shown in the progress details
+async def stream_events(run_id: str):
+    bus = active_runs.get(run_id)
+    if bus is None:
+        raise HTTPException(status_code=404, detail=f"No active run {run_id}")
+    return StreamingResponse(
+        sse_stream(bus, replay=True), media_type="text/event-stream"
+    )
 
 
 # Update the Gradio interface to show detailed logs
@@ -121,14 +119,9 @@ with gr.Blocks() as ui:
     submit_button.click(process_prompt, inputs=prompt_input, outputs=progress_output)
     reset_button.click(reset_progress_ui, outputs=progress_output)
 
-    gr.Markdown("---")
-    gr.Markdown("Progress Status:")
-    progress_display = gr.JSON(
-        value=get_progress_ui()
-    )  # Show detailed logs in real-time
-
-# Start the progress updater thread
-start_progress_updater()
+server = FastAPI()
+server.add_api_route("/events", stream_events, methods=["GET"])
+server = gr.mount_gradio_app(server, ui.queue(), path="/")
 
 if __name__ == "__main__":
-    ui.launch(server_name="0.0.0.0", server_port=5000)
+    uvicorn.run(server, host="0.0.0.0", port=5000)
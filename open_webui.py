@@ -1,8 +1,10 @@
+import uuid
 from typing import List
 
 import gradio as gr
 
 from app.logger import logger
+from app.session import SessionManager, clone_agent, release_session
 
 
 try:
@@ -12,24 +14,31 @@ except Exception:  # pragma: no cover - missing heavy deps in tests
 
 Manus = _Manus
 
+MAX_LOG_LINES = 1000
+
 
 class ChatSession:
     """Maintain a Manus agent instance and capture logs."""
 
-    def __init__(self):
+    def __init__(self, agent=None, capture_all_logs: bool = True):
         global Manus
-        if Manus is None:
-            from app.agent.manus import Manus as _Manus
+        if agent is None:
+            if Manus is None:
+                from app.agent.manus import Manus as _Manus
 
-            Manus = _Manus
-        self.agent = Manus()
+                Manus = _Manus
+            agent = Manus()
+        self.agent = agent
         self.logs: List[str] = []
-        logger.remove()
-        logger.add(self._log_sink, format="{message}", level="INFO")
+        if capture_all_logs:
+            logger.remove()
+            logger.add(self._log_sink, format="{message}", level="INFO")
         logger.info("Open WebUI session initialized")
 
     def _log_sink(self, message: str):
         self.logs.append(message)
+        if len(self.logs) > 2 * MAX_LOG_LINES:
+            del self.logs[:-MAX_LOG_LINES]
 
     async def generate(self, message: str) -> str:
         if not message.strip():
@@ -62,6 +71,35 @@ def get_session() -> ChatSession:
     return session
 
 
+_prototype = None
+
+
+def _new_session() -> ChatSession:
+    """Create a session whose agent is cloned from a warm prototype."""
+    global _prototype
+    if _prototype is None:
+        _prototype = ChatSession(capture_all_logs=False).agent
+    return ChatSession(agent=clone_agent(_prototype), capture_all_logs=False)
+
+
+sessions = SessionManager(_new_session, on_evict=release_session)
+
+
+def _route_log(message) -> None:
+    """Deliver log lines emitted while serving a session to that session."""
+    sess = sessions.peek(message.record["extra"]["session_id"])
+    if sess is not None:
+        sess._log_sink(message)
+
+
+logger.add(
+    _route_log,
+    format="{message}",
+    level="INFO",
+    filter=lambda record: "session_id" in record["extra"],
+)
+
+
 MARKETPLACE_LINK = (
     "<a href='https://github.com/modelcontextprotocol/servers' "
     "target='_blank'>\U0001F4BE MCP Servers Marketplace</a>"
@@ -77,15 +115,18 @@ with gr.Blocks() as open_webui:
         with gr.Column(scale=1):
             thoughts = gr.Textbox(label="Agent Thoughts", lines=20)
             logs = gr.Textbox(label="Logs", lines=20)
+    # gradio keeps a separate copy of this state for every browser session
+    browser_session = gr.State({})
 
     def user_message(user, history):
         history = history + [[user, None]]
         return "", history
 
-    async def bot_response(history):
-        sess = get_session()
+    async def bot_response(history, state):
+        session_id = state.setdefault("session_id", uuid.uuid4().hex)
+        sess = sessions.get(session_id)
         prompt = history[-1][0]
-        result = await sess.generate(prompt)
+        result = await sessions.arun(session_id, lambda s: s.generate(prompt))
         history[-1][1] = result
         return (
             history,
@@ -94,10 +135,10 @@ with gr.Blocks() as open_webui:
         )
 
     msg.submit(user_message, [msg, chatbot], [msg, chatbot], queue=False).then(
-        bot_response, chatbot, [chatbot, thoughts, logs]
+        bot_response, [chatbot, browser_session], [chatbot, thoughts, logs]
     )
     send.click(user_message, [msg, chatbot], [msg, chatbot], queue=False).then(
-        bot_response, chatbot, [chatbot, thoughts, logs]
+        bot_response, [chatbot, browser_session], [chatbot, thoughts, logs]
     )
 
 
@@ -3,9 +3,12 @@ import asyncio
 import re
 import time
 
+from app.checkpoint import CheckpointStore
 from app.flow.base import FlowType
 from app.flow.flow_factory import FlowFactory
 from app.logger import define_log_level, logger
+from app.tool.plan_sync import close_plan_outboxes
+from app.tracing import ChromeTraceExporter, Tracer, get_tracer, set_tracer
 
 
 def _validate_plan_id(value: str) -> str:
@@ -32,6 +35,22 @@ def parse_args(args: list[str] | None = None) -> argparse.Namespace:
         type=_validate_plan_id,
         help="Use an existing plan identifier instead of creating a new one",
     )
+    parser.add_argument(
+        "--workflow",
+        help="Run a YAML workflow such as agent_templates/finance_agent_steps.yaml instead of planning",
+    )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="Resume a checkpointed planning run (default: the latest unfinished one)",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write a Chrome trace of LLM calls, tools and steps to PATH and log a timing summary",
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
@@ -58,6 +77,9 @@ async def run_flow(args: argparse.Namespace) -> None:
 
     logger.info("Starting CLI run_flow")
 
+    if args.trace:
+        set_tracer(Tracer([ChromeTraceExporter(args.trace)]))
+
     if args.list_tools:
         for key, agent in agents.items():
             tool_names = ", ".join([tool.name for tool in agent.available_tools])
@@ -65,36 +87,65 @@ async def run_flow(args: argparse.Namespace) -> None:
         if not args.prompt:
             return
 
-    if not args.prompt or args.prompt.strip().isspace():
-        logger.warning("Empty prompt provided.")
-        return
+    checkpoint_store = CheckpointStore()
+    if args.resume:
+        run_id = args.resume
+        if run_id == "latest":
+            run_id = checkpoint_store.latest(status="running")
+        if not run_id:
+            logger.warning("No unfinished run to resume.")
+            return
+        flow = FlowFactory.create_flow(
+            flow_type=FlowType.PLANNING,
+            agents=agents,
+            plan_id=run_id,
+            checkpoint_store=checkpoint_store,
+        )
+        run = flow.resume()
+    else:
+        if not args.prompt or args.prompt.strip().isspace():
+            logger.warning("Empty prompt provided.")
+            return
 
-    flow = FlowFactory.create_flow(
-        flow_type=FlowType.PLANNING,
-        agents=agents,
-        plan_id=args.plan_id,
-    )
+        if args.workflow:
+            flow = FlowFactory.create_flow(
+                flow_type=FlowType.WORKFLOW,
+                agents=agents,
+                workflow=args.workflow,
+            )
+        else:
+            flow = FlowFactory.create_flow(
+                flow_type=FlowType.PLANNING,
+                agents=agents,
+                plan_id=args.plan_id,
+                checkpoint_store=checkpoint_store,
+            )
+        run = flow.execute(args.prompt)
 
     logger.info("Processing your request...")
 
     try:
         start_time = time.time()
-        result = await asyncio.wait_for(
-            flow.execute(args.prompt),
-            timeout=3600,
-        )
+        result = await asyncio.wait_for(run, timeout=3600)
         elapsed_time = time.time() - start_time
         logger.info(f"Request processed in {elapsed_time:.2f} seconds")
         logger.info(result)
     except asyncio.TimeoutError:
         logger.error("Request processing timed out after 1 hour")
         logger.info(
-            "Operation terminated due to timeout. Please try a simpler request."
+            "Operation terminated due to timeout. Continue it with --resume or try a simpler request."
         )
     except KeyboardInterrupt:
         logger.info("Operation cancelled by user.")
     except Exception as e:
         logger.error(f"Error: {str(e)}")
+    finally:
+        # queued plan syncs would be lost when the process exits
+        await close_plan_outboxes()
+        tracer = get_tracer()
+        if tracer.enabled:
+            logger.info(f"Time spent per span:\n{tracer.format_summary()}")
+            tracer.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import json
+
+from app.jobs import JobQueue, JobStatus, JobWorker
+from app.logger import define_log_level, logger
+from app.tool.plan_sync import close_plan_outboxes
+
+
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Queue PhManus jobs and run workers")
+    parser.add_argument("--db", help="Job queue database (default: workspace/jobs.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    work = commands.add_parser("work", help="Run queued jobs")
+    work.add_argument(
+        "--concurrency", type=int, default=4, help="Flows run at once by this worker"
+    )
+    work.add_argument(
+        "--poll-interval", type=float, default=0.5, help="Seconds between queue polls"
+    )
+    work.add_argument(
+        "--until-idle",
+        action="store_true",
+        help="Exit once the queue is empty instead of waiting for more jobs",
+    )
+    work.add_argument("--verbose", action="store_true", help="Enable debug logging")
+
+    submit = commands.add_parser("submit", help="Queue a prompt")
+    submit.add_argument("prompt", help="Task description for the agent to work on")
+    submit.add_argument("--workflow", help="Run a YAML workflow instead of planning")
+    submit.add_argument("--timeout", type=float, help="Seconds before the job fails")
+
+    status = commands.add_parser("status", help="Show jobs")
+    status.add_argument("job_id", nargs="?", help="Show a single job with its result")
+    status.add_argument(
+        "--status", choices=[s.value for s in JobStatus], help="Filter by status"
+    )
+
+    cancel = commands.add_parser("cancel", help="Cancel a queued or running job")
+    cancel.add_argument("job_id")
+
+    commands.add_parser(
+        "recover", help="Requeue running jobs whose worker stopped renewing its lease"
+    )
+
+    parsed = parser.parse_args(args=args)
+    logger.debug(f"Parsed arguments: {parsed}")
+    return parsed
+
+
+async def main(args: argparse.Namespace) -> None:
+    queue = JobQueue(args.db)
+
+    if args.command == "submit":
+        options = {}
+        if args.workflow:
+            options["workflow"] = args.workflow
+        if args.timeout:
+            options["timeout"] = args.timeout
+        print(queue.submit(args.prompt, **options))
+    elif args.command == "status":
+        if args.job_id:
+            job = queue.get(args.job_id)
+            print(json.dumps(job, indent=2) if job else f"Unknown job {args.job_id}")
+        else:
+            print(json.dumps(queue.counts()))
+            for job in queue.list(args.status):
+                print(f"{job['job_id']}  {job['status']:<9}  {job['prompt'][:60]}")
+    elif args.command == "cancel":
+        print("cancelled" if queue.cancel(args.job_id) else "not cancellable")
+    elif args.command == "recover":
+        print(f"requeued {queue.requeue_expired()}")
+    else:
+        if args.verbose:
+            define_log_level("DEBUG")
+        worker = JobWorker(
+            queue, concurrency=args.concurrency, poll_interval=args.poll_interval
+        )
+        try:
+            await worker.run(until_idle=args.until_idle)
+        finally:
+            await close_plan_outboxes()
+
+    queue.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main(parse_args()))
+    except KeyboardInterrupt:
+        logger.info("Worker interrupted; unfinished jobs were returned to the queue.")
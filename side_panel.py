@@ -7,18 +7,24 @@ from rich.live import Live
 from rich.panel import Panel
 
 from app.agent.manus import Manus
+from app.events import Event, EventType, events_until, get_event_bus
 from app.flow.base import FlowType
 from app.flow.flow_factory import FlowFactory
 from app.logger import logger
 
 
 class SidePanelUI:
-    """Terminal UI that displays agent thoughts and logs in a side panel."""
+    """Terminal UI that displays agent thoughts and logs in a side panel.
+
+    The panel is redrawn when the agents publish an event rather than on a
+    timer, so it stays idle while nothing changes.
+    """
 
     def __init__(self):
         self.console = Console()
         self.logs: list[str] = []
         self.thoughts: list[str] = []
+        self._streaming = False
         logger.remove()
         logger.add(self._log_sink, format="{message}", level="INFO")
         logger.info("SidePanelUI initialized")
@@ -26,6 +32,26 @@ class SidePanelUI:
     def _log_sink(self, message: str):
         self.logs.append(message)
 
+    def _apply(self, event: Event) -> None:
+        if event.type == EventType.TOKEN:
+            if self._streaming:
+                self.thoughts[-1] += event.data["text"]
+            else:
+                self.thoughts.append(f"{event.source}: {event.data['text']}")
+                self._streaming = True
+            return
+        streamed = self._streaming
+        self._streaming = False
+        if event.type == EventType.THOUGHT and streamed:
+            # the content was already shown token by token
+            if event.data.get("tools"):
+                self.thoughts.append(f"-> {', '.join(event.data['tools'])}")
+            return
+        line = event.describe()
+        if line:
+            self.thoughts.append(line)
+        del self.thoughts[:-100]
+
     def _render(self) -> Layout:
         layout = Layout()
         layout.split_row(
@@ -44,26 +70,19 @@ class SidePanelUI:
         flow = FlowFactory.create_flow(flow_type=FlowType.PLANNING, agents=agents)
         logger.warning("Processing your request...")
         start_time = time.time()
-        with Live(self._render(), console=self.console, refresh_per_second=4) as live:
-            task = asyncio.create_task(flow.execute(prompt))
-            while not task.done():
-                self.thoughts = [
-                    f"{msg.role}: {msg.content}"
-                    for msg in agents["manus"].memory.get_recent_messages(20)
-                    if msg.content
-                ]
-                live.update(self._render())
-                await asyncio.sleep(0.5)
-            result = await task
-            self.thoughts = [
-                f"{msg.role}: {msg.content}"
-                for msg in agents["manus"].memory.get_recent_messages(20)
-                if msg.content
-            ]
+        with Live(self._render(), console=self.console, auto_refresh=False) as live:
+            with get_event_bus().subscribe() as events:
+                task = asyncio.create_task(flow.execute(prompt))
+                async for event in events_until(events, task):
+                    self._apply(event)
+                    # redraw once per burst of events, e.g. streamed tokens
+                    if not events.pending:
+                        live.update(self._render(), refresh=True)
+                result = await task
             elapsed_time = time.time() - start_time
             logger.info(f"Request processed in {elapsed_time:.2f} seconds")
             logger.info(result)
-            live.update(self._render())
+            live.update(self._render(), refresh=True)
             await asyncio.sleep(1)
 
 
@@ -14,7 +14,7 @@ from app.tool.planning import PlanningTool
 def disable_mcp(monkeypatch):
     monkeypatch.setattr(config._config, "mcp_config", None)
 
-    async def _noop(*args, **kwargs):
+    def _noop(*args, **kwargs):
         return None
 
     monkeypatch.setattr(PlanningTool, "_sync_with_mcp", _noop)
@@ -0,0 +1,113 @@
+import os
+import re
+
+import pytest
+
+from app.agent.toolcall import ToolCallAgent
+from app.schema import Function, ToolCall
+from app.tool import ToolCollection
+from app.tool.artifact_store import ArtifactStore, ReadArtifact
+from app.tool.base import BaseTool
+
+
+class BigOutput(BaseTool):
+    name: str = "big_output"
+    description: str = "returns a long text"
+    parameters: dict = {"type": "object", "properties": {}}
+
+    async def execute(self) -> str:
+        return "".join(f"line {i}\n" for i in range(1000))
+
+
+def test_artifacts_are_content_addressed_and_compressed(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    content = "x" * 100_000
+    artifact_id = store.put(content)
+    assert store.put(content) == artifact_id
+    assert os.listdir(tmp_path) == [f"{artifact_id}.txt.gz"]
+    assert os.path.getsize(tmp_path / f"{artifact_id}.txt.gz") < 1000
+    assert store.read(artifact_id, 99_990, 50) == ("x" * 10, 100_000)
+
+
+@pytest.mark.sit
+@pytest.mark.asyncio
+async def test_read_artifact_pages_and_rejects_bad_ids(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    artifact_id = store.put("abcdefghij")
+    tool = ReadArtifact(store=store)
+
+    page = await tool.execute(artifact_id=artifact_id, offset=2, limit=3)
+    assert page.output.splitlines() == [
+        f"[artifact {artifact_id}: characters 2-5 of 10]",
+        "cde",
+        "[more available: call read_artifact with offset=5]",
+    ]
+    last = await tool.execute(artifact_id=artifact_id, offset=5)
+    assert last.output.endswith("fghij\n[end of artifact]")
+
+    result = await ToolCollection(tool).execute(
+        name="read_artifact", tool_input={"artifact_id": "../../etc/passwd"}
+    )
+    assert "Invalid artifact id" in str(result)
+
+
+@pytest.mark.uat
+@pytest.mark.asyncio
+async def test_agent_keeps_preview_and_handle_in_memory(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    agent = ToolCallAgent(
+        available_tools=ToolCollection(BigOutput(), ReadArtifact(store=store)),
+        artifact_threshold=500,
+        artifact_preview_chars=100,
+        artifact_store=store,
+    )
+    agent.tool_calls = [
+        ToolCall(id="call_0", function=Function(name="big_output", arguments="{}"))
+    ]
+    await agent.act()
+
+    message = agent.memory.messages[-1].content
+    assert len(message) < 300
+    artifact_id, offset = re.search(
+        r'artifact_id="(\w+)" and offset=(\d+)', message
+    ).groups()
+    preview = message.split("\n... [")[0]
+    rest = store.read(artifact_id, int(offset), 100_000)[0]
+    assert preview + rest == store.get(artifact_id)
+    assert rest.endswith("line 999\n")
+
+
+@pytest.mark.asyncio
+async def test_paging_with_manus_limits_creates_no_nested_artifacts(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    content = "".join(f"row {i:05d}\n" for i in range(1000))
+    artifact_id = store.put(content)
+    # the thresholds Manus uses
+    agent = ToolCallAgent(
+        available_tools=ToolCollection(ReadArtifact(store=store)),
+        artifact_threshold=2000,
+        max_observe=2000,
+        artifact_store=store,
+    )
+
+    pages, offset = [], 0
+    while True:
+        arguments = f'{{"artifact_id": "{artifact_id}", "offset": {offset}}}'
+        agent.tool_calls = [
+            ToolCall(
+                id=f"call_{offset}",
+                function=Function(name="read_artifact", arguments=arguments),
+            )
+        ]
+        await agent.act()
+        message = agent.memory.messages[-1].content
+        lines = message[message.index("[artifact ") :].split("\n")
+        pages.append("\n".join(lines[1:-1]))
+        match = re.search(r"offset=(\d+)\]$", lines[-1])
+        if not match:
+            assert lines[-1] == "[end of artifact]"
+            break
+        offset = int(match.group(1))
+
+    assert "".join(pages) == content
+    assert os.listdir(tmp_path) == [f"{artifact_id}.txt.gz"]
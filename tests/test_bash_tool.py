@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from app.tool.bash import Bash, _StreamBuffer
+
+
+@pytest.mark.asyncio
+async def test_command_returns_without_polling_delay():
+    tool = Bash()
+    await tool.execute("true")
+    start = time.perf_counter()
+    result = await tool.execute("echo hello; echo oops >&2")
+    assert time.perf_counter() - start < 0.15
+    assert result.output == "hello"
+    assert result.error == "oops"
+    result = await tool.execute("echo again")
+    assert result.output == "again" and result.error == ""
+    tool._session.stop()
+    await tool._session._process.wait()
+
+
+@pytest.mark.sit
+def test_sentinel_split_across_chunks_and_output_bounded():
+    buffer = _StreamBuffer(b"<<exit>>", max_bytes=16)
+    streamed = buffer.feed(b"x" * 40 + b"<<ex")
+    assert not buffer.done.is_set()
+    streamed += buffer.feed(b"it>>\nleft")
+    assert buffer.done.is_set()
+    data, dropped = buffer.result
+    assert streamed == b"x" * 40
+    assert dropped + len(data) == 40 and len(data) <= 16
+    assert bytes(buffer.data) == b"left"
+
+
+@pytest.mark.asyncio
+async def test_commands_finish_after_stderr_is_redirected_for_good():
+    tool = Bash()
+    await tool.execute("exec 2>/dev/null")
+    for _ in range(3):
+        start = time.perf_counter()
+        result = await tool.execute("echo still here; false")
+        assert time.perf_counter() - start < 1
+        assert result.output == "still here" and result.error == ""
+        assert result.system == "exit code 1"
+    tool._session.stop()
+    await tool._session._process.wait()
+
+
+def test_sentinel_line_carries_the_exit_status():
+    buffer = _StreamBuffer(b"<<exit>>", max_bytes=1024)
+    buffer.feed(b"out\n<<exit>>12")
+    assert not buffer.done.is_set()
+    buffer.feed(b"7\n")
+    assert buffer.done.is_set() and buffer.status == 127
+    assert buffer.result == (b"out\n", 0)
+
+
+@pytest.mark.uat
+@pytest.mark.asyncio
+async def test_partial_output_is_streamed():
+    chunks = []
+    tool = Bash(output_callback=chunks.append)
+    result = await tool.execute("for i in 1 2 3; do echo line$i; sleep 0.05; done")
+    assert result.output == "line1\nline2\nline3"
+    assert len(chunks) >= 2
+    assert "".join(chunks) == "line1\nline2\nline3\n"
+    tool._session.stop()
+    await tool._session._process.wait()
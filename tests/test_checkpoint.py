@@ -0,0 +1,159 @@
+import json
+import threading
+
+import pytest
+
+import run_flow
+from app.agent.base import BaseAgent
+from app.agent.toolcall import ToolCallAgent
+from app.checkpoint import CheckpointStore
+from app.flow.base import PlanStepStatus
+from app.flow.planning import PlanningFlow
+from app.llm import LLM
+from app.schema import Message
+from app.tool import ToolCollection
+from app.tool.bash import Bash
+from app.tool.planning import PlanningTool
+
+
+CALLS = []
+
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-run"""
+
+
+class CountingAgent(BaseAgent):
+    name: str = "worker"
+    description: str = "d"
+    llm: LLM
+    max_steps: int = 3
+    crash_at: int = 0
+
+    async def step(self) -> str:
+        CALLS.append(self.current_step)
+        if len(CALLS) == self.crash_at:
+            raise Crash()
+        self.update_memory("assistant", f"work {len(CALLS)}")
+        return f"call {len(CALLS)}"
+
+
+def test_messages_are_appended_until_history_is_rewritten(tmp_path):
+    store = CheckpointStore(str(tmp_path / "runs.db"))
+    messages = [Message.user_message("task"), Message.assistant_message("a")]
+    store.save("r1", {"n": 1}, {"agent": messages})
+    messages.append(Message.assistant_message("b"))
+    store.save("r1", {"n": 2}, {"agent": messages})
+    del messages[1]
+    store.save("r1", {"n": 3}, {"agent": messages})
+
+    loaded = CheckpointStore(str(tmp_path / "runs.db")).load("r1")
+    assert loaded["state"] == {"n": 3}
+    assert [m.content for m in loaded["messages"]["agent"]] == ["task", "b"]
+    assert store.latest(status="running") == "r1"
+
+
+@pytest.mark.sit
+def test_parse_args_resume():
+    assert run_flow.parse_args(["--resume"]).resume == "latest"
+    assert run_flow.parse_args(["--resume", "plan_1"]).resume == "plan_1"
+    assert run_flow.parse_args(["task"]).resume is None
+
+
+@pytest.mark.uat
+@pytest.mark.asyncio
+async def test_resume_continues_without_replaying_steps(tmp_path, monkeypatch):
+    CALLS.clear()
+    db_path = str(tmp_path / "runs.db")
+    llm = LLM()
+
+    async def fake_ask(*args, **kwargs):
+        return "summary"
+
+    monkeypatch.setattr(llm, "ask", fake_ask)
+
+    tool = PlanningTool()
+    await tool.execute(command="create", plan_id="p1", title="t", steps=["a", "b"])
+    flow = PlanningFlow(
+        agents={"worker": CountingAgent(llm=llm, crash_at=5)},
+        llm=llm,
+        planning_tool=tool,
+        plan_id="p1",
+        checkpoint_store=CheckpointStore(db_path),
+    )
+    with pytest.raises(Crash):
+        await flow.execute("")
+    assert CALLS == [1, 2, 3, 1, 2]
+
+    # a fresh process: new agent, empty planning tool, reopened store
+    agent = CountingAgent(llm=llm)
+    flow = PlanningFlow(
+        agents={"worker": agent},
+        llm=llm,
+        planning_tool=PlanningTool(),
+        plan_id="p1",
+        checkpoint_store=CheckpointStore(db_path),
+    )
+    result = await flow.resume()
+
+    # only the two remaining agent steps of step b ran
+    assert CALLS[5:] == [2, 3]
+    assert result.endswith("Plan completed:\n\nsummary")
+    statuses = flow.planning_tool.plans["p1"]["step_statuses"]
+    assert statuses == [PlanStepStatus.COMPLETED.value] * 2
+    assert [m.content for m in agent.messages if m.role == "assistant"][-1] == (
+        "work 7"
+    )
+    assert await flow.resume() == result
+
+
+@pytest.mark.asyncio
+async def test_checkpoints_are_written_off_the_event_loop(tmp_path, monkeypatch):
+    CALLS.clear()
+    llm = LLM()
+
+    async def fake_ask(*args, **kwargs):
+        return "summary"
+
+    monkeypatch.setattr(llm, "ask", fake_ask)
+    store = CheckpointStore(str(tmp_path / "runs.db"))
+    saves = []
+    original_save = store.save
+
+    def save(run_id, state, messages, status="running"):
+        saves.append((threading.current_thread(), status))
+        original_save(run_id, state, messages, status=status)
+
+    monkeypatch.setattr(store, "save", save)
+    tool = PlanningTool()
+    await tool.execute(command="create", plan_id="p1", title="t", steps=["a"])
+    flow = PlanningFlow(
+        agents={"worker": CountingAgent(llm=llm)},
+        llm=llm,
+        planning_tool=tool,
+        plan_id="p1",
+        checkpoint_store=store,
+    )
+    await flow.execute("")
+
+    assert saves and threading.main_thread() not in {t for t, _ in saves}
+    assert saves[-1][1] == "completed"
+    assert store.load("p1")["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_bash_working_directory_survives_a_checkpoint(tmp_path):
+    agent = ToolCallAgent(available_tools=ToolCollection(Bash()))
+    bash = agent.available_tools.get_tool("bash")
+    await bash.execute(command=f"cd {tmp_path}")
+    snapshot = json.loads(json.dumps(agent.snapshot()))
+    await agent.cleanup()
+    assert snapshot["tools"] == {"bash": {"cwd": str(tmp_path)}}
+
+    resumed = ToolCallAgent(available_tools=ToolCollection(Bash()))
+    resumed.restore(snapshot, [])
+    try:
+        result = await resumed.available_tools.get_tool("bash").execute(command="pwd")
+        assert result.output == str(tmp_path)
+    finally:
+        await resumed.cleanup()
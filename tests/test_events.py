@@ -0,0 +1,142 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.agent.toolcall import ToolCallAgent
+from app.events import (
+    MAX_RESULT_CHARS,
+    EventBus,
+    EventType,
+    events_until,
+    format_sse,
+    preview,
+    sse_stream,
+)
+from app.schema import Function, ToolCall
+from app.tool import ToolCollection
+from app.tool.base import BaseTool
+
+
+class EchoTool(BaseTool):
+    name: str = "echo"
+    description: str = "echoes its input"
+    parameters: dict = {"type": "object", "properties": {"text": {"type": "string"}}}
+
+    async def execute(self, text: str) -> str:
+        return text
+
+
+@pytest.mark.asyncio
+async def test_subscribers_get_filtered_events_and_slow_ones_drop_oldest():
+    bus = EventBus(history=10)
+    bus.publish(EventType.STEP_STARTED, "early", step=1, max_steps=2)
+
+    with bus.subscribe() as everything, bus.subscribe(
+        [EventType.TOOL_CALLED], replay=True
+    ) as tools, bus.subscribe(maxsize=2) as slow:
+        for i in range(3):
+            bus.publish(EventType.TOOL_CALLED, "agent", tool="echo", arguments={"i": i})
+        bus.publish(EventType.STEP_FINISHED, "agent", step=1, result="done")
+
+        assert [e.type for e in everything.get_nowait()] == [
+            EventType.TOOL_CALLED
+        ] * 3 + [EventType.STEP_FINISHED]
+        assert [e.data["arguments"]["i"] for e in tools.get_nowait()] == [0, 1, 2]
+        assert [e.type for e in slow.get_nowait()] == [
+            EventType.TOOL_CALLED,
+            EventType.STEP_FINISHED,
+        ]
+        assert slow.dropped == 2
+
+    # a late subscriber can catch up from the recent history
+    with bus.subscribe([EventType.STEP_STARTED], replay=True) as late:
+        assert late.get_nowait()[0].source == "early"
+
+    event = bus.recent[-1]
+    message = format_sse(event)
+    assert message.startswith(f"id: {event.seq}\nevent: step_finished\ndata: ")
+    assert json.loads(message.split("data: ")[1])["data"]["result"] == "done"
+
+
+@pytest.mark.sit
+@pytest.mark.asyncio
+async def test_agent_run_publishes_step_tool_and_token_events():
+    bus = EventBus()
+    calls = iter(range(2))
+
+    async def fake_stream(**kwargs):
+        index = next(calls)
+        for token in ("Echo", "ing"):
+            yield token
+        yield ToolCall(
+            id=f"call_{index}",
+            function=Function(name="echo", arguments='{"text": "hi"}'),
+        )
+
+    agent = ToolCallAgent(
+        available_tools=ToolCollection(EchoTool()),
+        stream_tool_calls=True,
+        next_step_prompt="",
+        max_steps=1,
+        event_bus=bus,
+    )
+    agent.llm = SimpleNamespace(ask_tool_stream=fake_stream)
+
+    with bus.subscribe() as events:
+        task = asyncio.create_task(agent.run("say hi"))
+        received = [event async for event in events_until(events, task)]
+        await task
+
+    assert [event.type.value for event in received] == [
+        "step_started",
+        "token",
+        "token",
+        "thought",
+        "tool_called",
+        "tool_finished",
+        "step_finished",
+        "run_finished",
+    ]
+    assert all(event.source == "toolcall" for event in received)
+    assert received[3].data == {"content": "Echoing", "tools": ["echo"]}
+    assert received[4].data["arguments"] == {"text": "hi"}
+    assert received[4].describe().startswith("toolcall called echo")
+    assert [e.seq for e in received] == sorted(e.seq for e in received)
+
+
+def test_long_results_are_truncated_in_payloads():
+    text = "x" * (MAX_RESULT_CHARS + 10)
+    assert preview("short") == "short"
+    assert preview(text) == "x" * MAX_RESULT_CHARS + "... (10 more characters)"
+
+
+@pytest.mark.uat
+@pytest.mark.asyncio
+async def test_events_from_other_threads_reach_sse_clients_quickly():
+    bus = EventBus()
+    stream = sse_stream(bus, [EventType.STEP_STARTED], heartbeat=0.05)
+
+    # nothing published yet: the stream keeps the connection alive
+    assert await stream.__anext__() == ": keepalive\n\n"
+
+    published = []
+
+    def publish():
+        published.append(time.perf_counter())
+        bus.publish(EventType.STEP_STARTED, "worker", step=1, max_steps=1)
+
+    threading.Thread(target=publish).start()
+    message = await asyncio.wait_for(stream.__anext__(), 1)
+    latency = time.perf_counter() - published[0]
+
+    assert "event: step_started" in message
+    assert latency < 0.1
+
+    # closing the bus of a finished run ends its streams
+    bus.close()
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(stream.__anext__(), 1)
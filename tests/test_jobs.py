@@ -0,0 +1,148 @@
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.jobs import JobQueue, JobStatus, JobWorker
+
+
+EVENTS = []
+
+
+async def fake_runner(job):
+    EVENTS.append(("start", job["prompt"]))
+    await asyncio.sleep(job["options"].get("sleep", 0.05))
+    EVENTS.append(("end", job["prompt"]))
+    if job["prompt"] == "boom":
+        raise RuntimeError("flow failed")
+    return f"done: {job['prompt']}"
+
+
+def test_claims_do_not_overlap_and_jobs_record_timings(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    first, second = JobQueue(db), JobQueue(db)
+    ids = [first.submit(f"task {i}", workflow="wf.yaml") for i in range(5)]
+    assert first.counts()["queued"] == 5
+
+    claimed = first.claim("w1", 3) + second.claim("w2", 3)
+    assert sorted(job["job_id"] for job in claimed) == sorted(ids)
+    assert second.claim("w2", 3) == []
+    assert claimed[0]["options"] == {"workflow": "wf.yaml"}
+
+    first.finish(ids[0], JobStatus.SUCCEEDED, result="ok")
+    job = second.get(ids[0])
+    assert job["status"] == "succeeded" and job["result"] == "ok"
+    assert job["queue_seconds"] >= 0 and job["run_seconds"] >= 0
+
+    assert second.requeue("w2") == 2
+    assert first.counts() == {
+        "queued": 2,
+        "running": 2,
+        "succeeded": 1,
+        "failed": 0,
+        "cancelled": 0,
+    }
+    first.close()
+    second.close()
+
+
+@pytest.mark.sit
+@pytest.mark.asyncio
+async def test_worker_runs_jobs_concurrently(tmp_path):
+    EVENTS.clear()
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    ok = [queue.submit(f"task {i}", sleep=0.2) for i in range(4)]
+    failed = queue.submit("boom")
+    slow = queue.submit("slow", sleep=5, timeout=0.1)
+
+    worker = JobWorker(queue, fake_runner, concurrency=4, poll_interval=0.01)
+    started = time.monotonic()
+    await worker.run(until_idle=True)
+
+    # four 0.2 s jobs ran side by side rather than one after another
+    assert time.monotonic() - started < 0.8
+    assert [kind for kind, _ in EVENTS[:4]] == ["start"] * 4
+    for job_id in ok:
+        job = queue.get(job_id)
+        assert job["status"] == "succeeded" and job["result"].startswith("done")
+        assert job["worker"] == worker.worker_id
+    assert queue.get(failed)["error"] == "flow failed"
+    assert queue.get(slow)["status"] == "failed"
+    assert "Timed out" in queue.get(slow)["error"]
+    queue.close()
+
+
+@pytest.mark.uat
+@pytest.mark.asyncio
+async def test_queued_and_running_jobs_can_be_cancelled(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    running = queue.submit("long", sleep=5)
+    queued = queue.submit("later")
+
+    worker = JobWorker(queue, fake_runner, concurrency=1, poll_interval=0.01)
+    task = asyncio.create_task(worker.run(until_idle=True))
+    while queue.get(running)["status"] != "running":
+        await asyncio.sleep(0.01)
+
+    assert queue.cancel(queued)
+    assert queue.cancel(running)
+    assert await queue.wait(running, poll_interval=0.01, timeout=2)
+    await asyncio.wait_for(task, 2)
+
+    assert queue.get(running)["status"] == "cancelled"
+    assert queue.get(queued)["status"] == "cancelled"
+    assert not queue.cancel(running)
+    queue.close()
+
+
+def test_jobs_of_a_dead_worker_are_requeued_when_their_lease_expires(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    queue = JobQueue(db, lease=0.05)
+    lost, renewed = queue.submit("lost"), queue.submit("renewed")
+    assert len(queue.claim("dead-worker", 1)) == 1
+    assert len(queue.claim("live-worker", 1)) == 1
+
+    time.sleep(0.03)
+    assert queue.renew("live-worker", [renewed]) == 1
+    time.sleep(0.03)
+
+    # the dead worker's job is handed out again, the live worker keeps its own
+    reclaimed = queue.claim("new-worker", 5)
+    assert [job["job_id"] for job in reclaimed] == [lost]
+    assert queue.get(renewed)["worker"] == "live-worker"
+
+    queue.finish(lost, JobStatus.SUCCEEDED, result="ok")
+    assert queue.get(lost)["lease_expires_at"] is None
+    time.sleep(0.06)
+    assert queue.requeue_expired() == 1
+    assert queue.get(renewed)["status"] == "queued"
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_flow_jobs_clean_up_their_agents(monkeypatch):
+    from app.flow import flow_factory
+    from app.jobs import run_flow_job
+
+    cleaned = []
+
+    class FakeAgent:
+        async def cleanup(self):
+            cleaned.append(True)
+
+    class FailingFlow:
+        async def execute(self, prompt):
+            raise RuntimeError("flow failed")
+
+    # the real Manus needs browser_use, which the tests do not install
+    monkeypatch.setitem(
+        sys.modules, "app.agent.manus", SimpleNamespace(Manus=FakeAgent)
+    )
+    monkeypatch.setattr(
+        flow_factory.FlowFactory, "create_flow", lambda *args, **kwargs: FailingFlow()
+    )
+    with pytest.raises(RuntimeError):
+        await run_flow_job({"job_id": "j1", "prompt": "p", "options": {}})
+    assert cleaned == [True]
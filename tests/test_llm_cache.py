@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+from openai.types.chat import ChatCompletionMessage
+
+from app.llm import llm_pool
+from app.llm_cache import ResponseCache
+from app.schema import Message
+
+
+def test_memory_lru_eviction():
+    cache = ResponseCache(max_memory_entries=2)
+    for i in range(3):
+        cache.set(f"k{i}", i)
+    assert cache.get("k0") is None
+    assert cache.get("k2") == 2
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.sit
+def test_disk_tier_survives_new_instance(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = ResponseCache(db_path=path)
+    first.set("key", {"content": "cached"})
+    first.close()
+
+    second = ResponseCache(db_path=path)
+    assert second.get("key") == {"content": "cached"}
+    assert second.disk_hits == 1
+
+    expired = ResponseCache(db_path=path, ttl=-1)
+    assert expired.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_async_disk_tier_keeps_a_running_count(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(db_path=path, max_disk_entries=2)
+    for i in range(3):
+        await cache.aset(f"k{i}", i)
+    await cache.aset("k2", "updated")
+    assert cache.stats()["disk_entries"] == 2
+    cache.close()
+
+    reopened = ResponseCache(db_path=path, max_disk_entries=2)
+    assert reopened.stats()["disk_entries"] == 2
+    assert await reopened.aget("k0") is None
+    assert await reopened.aget("k2") == "updated"
+    # the disk hit's recency is written with the next batch, not right away
+    assert reopened._touched.keys() == {"k2"}
+    reopened.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.uat
+async def test_ask_tool_replays_deterministic_requests(monkeypatch):
+    llm = llm_pool.get_llm(session_id="cache-test")
+    llm.enable_response_cache(ResponseCache())
+    calls = []
+
+    async def fake_create(**params):
+        calls.append(params)
+        message = ChatCompletionMessage(role="assistant", content="planned")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message)],
+            usage=SimpleNamespace(prompt_tokens=1),
+        )
+
+    monkeypatch.setattr(llm, "_create_completion", fake_create)
+    messages = [Message.user_message("make a plan")]
+    first = await llm.ask_tool(messages, temperature=0)
+    second = await llm.ask_tool(messages, temperature=0)
+    await llm.ask_tool(messages, temperature=0.7)
+
+    assert first.content == second.content == "planned"
+    assert len(calls) == 2
+    llm_pool.release_session("cache-test")
@@ -0,0 +1,70 @@
+import pytest
+
+from app.config import config
+from app.llm import LLM, LLMPool, TrackedStream, llm_pool
+
+
+def test_instances_share_pooled_client():
+    default = LLM()
+    session_llm = llm_pool.get_llm(session_id="s1")
+    assert session_llm is not default
+    assert session_llm.client is default.client
+    llm_pool.release_session("s1")
+
+
+@pytest.mark.sit
+def test_session_token_accounting_is_isolated():
+    first = llm_pool.get_llm(session_id="a")
+    second = llm_pool.get_llm(session_id="b")
+    assert llm_pool.get_llm(session_id="a") is first
+    first.update_token_count(100)
+    assert first.total_input_tokens == 100
+    assert second.total_input_tokens == 0
+    llm_pool.release_session("a")
+    llm_pool.release_session("b")
+
+
+@pytest.mark.asyncio
+@pytest.mark.uat
+async def test_pool_metrics_track_in_flight():
+    pool = LLMPool()
+    _, stats = pool.get_client(config.llm["default"])
+    with stats.track():
+        assert stats.in_flight == 1
+        metrics = pool.metrics()
+    assert set(metrics) == {"endpoints", "sessions"}
+    endpoint = next(iter(metrics["endpoints"].values()))
+    assert endpoint["peak_in_flight"] == 1
+    assert stats.in_flight == 0
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_streams_stay_in_flight_until_read_and_credentials_split_pools():
+    settings = config.llm["default"]
+    pool = LLMPool()
+    _, stats = pool.get_client(settings)
+    other_key, other_stats = pool.get_client(
+        settings.model_copy(update={"api_key": "other-key"})
+    )
+    assert other_stats is not stats
+    assert len(pool.metrics()["endpoints"]) == 2
+    assert not any("other-key" in label for label in pool.metrics()["endpoints"])
+
+    async def chunks():
+        for chunk in ("a", "b"):
+            yield chunk
+
+    stream = TrackedStream(chunks(), stats, stats.begin())
+    assert await stream.__anext__() == "a"
+    assert stats.in_flight == 1
+    assert [chunk async for chunk in stream] == ["b"]
+    assert stats.in_flight == 0 and stats.failed_requests == 0
+
+    # a stream abandoned part way is released when it is closed
+    stream = TrackedStream(chunks(), stats, stats.begin())
+    await stream.__anext__()
+    await stream.aclose()
+    assert stats.in_flight == 0
+    assert stats.to_dict()["mean_latency_ms"] is not None
+    await pool.aclose()
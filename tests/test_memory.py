@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from app.schema import SUMMARY_PREFIX, Function, Memory, Message, TokenBudgetMemory
+
+
+def tool_turn(i):
+    call = {"id": f"c{i}", "function": Function(name="bash", arguments="{}")}
+    return [
+        Message.from_tool_calls(tool_calls=[type("Call", (), call)], content=""),
+        Message.tool_message(f"output {i} " * 20, name="bash", tool_call_id=f"c{i}"),
+    ]
+
+
+def words(message):
+    return 4 + len((message.content or "").split())
+
+
+def test_add_messages_trims_in_place():
+    memory = Memory(max_messages=5)
+    messages = memory.messages
+    memory.add_messages([Message.user_message("task")])
+    for i in range(3):
+        memory.add_messages(tool_turn(i))
+    assert memory.messages is messages
+    assert len(memory.messages) <= 5
+    # the oldest kept message is never a tool result without its call
+    assert memory.messages[0].role != "tool"
+
+
+@pytest.mark.sit
+def test_budget_keeps_anchors_and_drops_whole_turns():
+    memory = TokenBudgetMemory(max_tokens=120, count_tokens=words)
+    memory.add_messages([Message.system_message("rules"), Message.user_message("task")])
+    for i in range(5):
+        memory.add_messages(tool_turn(i))
+
+    dropped = memory.enforce_budget(reserved_tokens=20)
+    assert dropped > 0
+    assert memory.total_tokens() <= 100
+    assert [m.content for m in memory.messages[:2]] == ["rules", "task"]
+    for previous, message in zip(memory.messages, memory.messages[1:]):
+        if message.role == "tool":
+            assert previous.tool_calls
+    assert memory.messages[-1].content.startswith("output 4")
+
+
+@pytest.mark.uat
+@pytest.mark.asyncio
+async def test_old_messages_are_summarized_in_background():
+    summarized = []
+
+    async def summarize(messages):
+        summarized.append(len(messages))
+        await asyncio.sleep(0)
+        return "ran bash a few times"
+
+    memory = TokenBudgetMemory(
+        max_tokens=200, keep_recent=2, count_tokens=words, summarize=summarize
+    )
+    memory.add_message(Message.user_message("task"))
+    for i in range(5):
+        memory.add_messages(tool_turn(i))
+    await memory.compact()
+
+    assert memory.compactions == 1 and summarized
+    assert memory.messages[0].content == "task"
+    assert memory.messages[1].content == SUMMARY_PREFIX + "ran bash a few times"
+    assert memory.messages[2].role == "assistant"
+    assert memory.messages[-1].content.startswith("output 4")
+    assert memory.total_tokens() < 200
+
+
+@pytest.mark.asyncio
+async def test_summary_follows_the_task_and_tokens_are_counted_once():
+    counted = []
+
+    def count(message):
+        counted.append(message)
+        return words(message)
+
+    async def summarize(messages):
+        return "ran bash"
+
+    memory = TokenBudgetMemory(
+        max_tokens=10_000, keep_recent=2, count_tokens=count, summarize=summarize
+    )
+    memory.add_messages([Message.system_message("rules"), Message.user_message("task")])
+    for i in range(3):
+        memory.add_messages(tool_turn(i))
+    assert len(counted) == 8
+    await memory.compact()
+
+    roles = [m.role for m in memory.messages]
+    assert roles == ["system", "user", "user", "assistant", "tool"]
+    assert memory.messages[2].content == SUMMARY_PREFIX + "ran bash"
+    assert len(counted) == 9
+    assert memory.total_tokens() == sum(words(m) for m in memory.messages)
+
+    # replacing the history directly is picked up by a recount
+    memory.messages = memory.messages[:2]
+    assert memory.total_tokens() == words(memory.messages[0]) + words(
+        memory.messages[1]
+    )
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.config import MCPSettings, config
+from app.tool import plan_sync
+from app.tool.plan_sync import MCPPlanOutbox
+from app.tool.planning import PlanningTool
+
+
+SYNC_WITH_MCP = PlanningTool._sync_with_mcp
+
+
+class StandInMCP:
+    """Minimal MCP plan endpoint that records the requests it receives."""
+
+    def __init__(self, failures=0):
+        self.requests = []
+        self.failures = failures
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                server.requests.append((self.command, self.path, body))
+                status = 200
+                if server.failures:
+                    server.failures -= 1
+                    status = 503
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            do_POST = do_PUT = do_DELETE = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = StandInMCP()
+    yield server
+    server.close()
+
+
+@pytest.mark.asyncio
+async def test_repeated_updates_are_coalesced(server):
+    outbox = MCPPlanOutbox(server.url)
+    outbox.enqueue("POST", "p1", {"v": 0})
+    for v in range(1, 5):
+        outbox.enqueue("PUT", "p1", {"v": v})
+    outbox.enqueue("POST", "p2", {"v": 0})
+    outbox.enqueue("DELETE", "p2")
+    await outbox.flush(timeout=5)
+    await outbox.aclose()
+    assert server.requests == [("POST", "/plans/p1", {"v": 4})]
+    assert outbox.stats["coalesced"] == 5
+
+
+@pytest.mark.sit
+@pytest.mark.asyncio
+async def test_failed_requests_are_retried_in_order(server):
+    server.failures = 2
+    outbox = MCPPlanOutbox(server.url, backoff_base=0.01)
+    outbox.enqueue("POST", "p1", {"v": 1})
+    await outbox.flush(timeout=5)
+    outbox.enqueue("DELETE", "p1")
+    await outbox.flush(timeout=5)
+    await outbox.aclose()
+    assert [r[0] for r in server.requests] == ["POST", "POST", "POST", "DELETE"]
+    assert outbox.stats == {"sent": 2, "coalesced": 0, "retries": 2, "failed": 0}
+
+
+@pytest.mark.uat
+@pytest.mark.asyncio
+async def test_planning_tool_syncs_mark_step(server, monkeypatch):
+    monkeypatch.setattr(PlanningTool, "_sync_with_mcp", SYNC_WITH_MCP)
+    monkeypatch.setattr(plan_sync, "_outboxes", {})
+    monkeypatch.setattr(
+        config._config, "mcp_config", MCPSettings(server_url=server.url)
+    )
+    tool = PlanningTool()
+    await tool.execute(command="create", plan_id="p1", title="t", steps=["a"])
+    outbox = plan_sync.get_plan_outbox(config.mcp_config)
+    await outbox.flush(timeout=5)
+    await tool.execute(
+        command="mark_step", plan_id="p1", step_index=0, step_status="completed"
+    )
+    await outbox.flush(timeout=5)
+    await outbox.aclose()
+    assert [r[:2] for r in server.requests] == [
+        ("POST", "/plans/p1"),
+        ("PUT", "/plans/p1"),
+    ]
+    assert server.requests[-1][2]["step_statuses"] == ["completed"]
+
+
+def test_outboxes_are_flushed_at_shutdown_across_event_loops(server, monkeypatch):
+    monkeypatch.setattr(plan_sync, "_outboxes", {})
+    outbox = plan_sync.get_plan_outbox(MCPSettings(server_url=server.url))
+    outbox.batch_interval = 60
+
+    async def enqueue(plan_id):
+        outbox.enqueue("POST", plan_id, {"v": 1})
+        return outbox._client
+
+    first_client = asyncio.run(enqueue("p1"))
+
+    async def enqueue_again_and_shut_down():
+        await enqueue("p2")
+        outbox.batch_interval = 0
+        await plan_sync.close_plan_outboxes(timeout=5)
+
+    asyncio.run(enqueue_again_and_shut_down())
+
+    # the client of the first loop was closed instead of leaked
+    assert first_client.is_closed
+    assert sorted(r[1] for r in server.requests) == ["/plans/p1", "/plans/p2"]
+    assert plan_sync._outboxes == {}
+
+
+@pytest.mark.asyncio
+async def test_unsendable_request_does_not_stop_the_outbox(server):
+    outbox = MCPPlanOutbox(server.url)
+    outbox.enqueue("POST", "bad", {"v": object()})
+    outbox.enqueue("POST", "p1", {"v": 1})
+    await outbox.flush(timeout=5)
+    assert outbox.stats["failed"] == 1
+
+    outbox.enqueue("PUT", "p1", {"v": 2})
+    await outbox.flush(timeout=5)
+    await outbox.aclose()
+    assert server.requests == [
+        ("POST", "/plans/p1", {"v": 1}),
+        ("PUT", "/plans/p1", {"v": 2}),
+    ]
+    assert outbox.stats["sent"] == 2
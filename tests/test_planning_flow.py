@@ -7,6 +7,7 @@ from app.agent.base import BaseAgent
 from app.flow.base import PlanStepStatus
 from app.flow.planning import PlanningFlow
 from app.llm import LLM
+from app.schema import AgentState
 from app.tool.planning import PlanningTool
 
 
@@ -92,3 +93,45 @@ async def test_mark_step_completed(dummy_flow):
         flow.planning_tool.plans["p1"]["step_statuses"][index]
         == PlanStepStatus.COMPLETED.value
     )
+
+
+EVENTS = []
+
+
+class SlowAgent(BaseAgent):
+    description: str = "d"
+    llm: LLM
+
+    async def step(self) -> str:
+        EVENTS.append(("start", self.name))
+        await asyncio.sleep(0.05)
+        EVENTS.append(("end", self.name))
+        self.state = AgentState.FINISHED
+        return self.name
+
+
+@pytest.mark.sit
+@pytest.mark.asyncio
+async def test_independent_steps_run_in_parallel(monkeypatch):
+    EVENTS.clear()
+    llm = LLM()
+
+    async def fake_ask(*args, **kwargs):
+        return "summary"
+
+    monkeypatch.setattr(llm, "ask", fake_ask)
+    agents = {name: SlowAgent(name=name, llm=llm) for name in ("a", "b")}
+    flow = PlanningFlow(agents=agents, llm=llm, plan_id="dag")
+    await flow.planning_tool.execute(
+        command="create",
+        plan_id="dag",
+        title="t",
+        steps=["research A", "research B", "combine"],
+        step_dependencies=[[], [], [0, 1]],
+    )
+    # agents reset to IDLE when their run ends, so FINISHED does not stop the flow
+    result = await flow._execute_dag()
+
+    assert [e[0] for e in EVENTS[:2]] == ["start", "start"]
+    assert flow.planning_tool.plans["dag"]["step_statuses"] == ["completed"] * 3
+    assert result == "Step 1: a\nStep 1: b\nStep 2: a\nPlan completed:\n\nsummary"
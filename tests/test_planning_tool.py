@@ -1,4 +1,6 @@
 import asyncio
+import json
+import time
 
 import pytest
 
@@ -35,3 +37,237 @@ async def test_sqlite_persistence(tmp_path):
     assert path.exists()
     tool2 = PlanningTool(storage_type="sqlite", storage_path=str(path))
     assert "p1" in tool2.plans
+
+
+@pytest.mark.asyncio
+async def test_write_behind_coalesces_mark_step(tmp_path):
+    path = tmp_path / "plans.db"
+    tool = PlanningTool(
+        storage_type="sqlite", storage_path=str(path), flush_interval=60
+    )
+    await tool.execute(command="create", plan_id="p1", title="t", steps=["a", "b"])
+    for index in range(2):
+        await tool.execute(
+            command="mark_step", plan_id="p1", step_index=index, step_status="completed"
+        )
+    assert tool._store.flushes == 0 and tool._store.dirty == 1
+    await tool.aflush()
+    assert tool._store.flushes == 1
+    tool.close()
+    tool2 = PlanningTool(storage_type="sqlite", storage_path=str(path))
+    assert tool2.plans["p1"]["step_statuses"] == ["completed", "completed"]
+
+
+def test_failed_background_flush_is_logged_and_retried(tmp_path, monkeypatch):
+    from app.tool import plan_store
+
+    warnings = []
+    monkeypatch.setattr(plan_store.logger, "warning", warnings.append)
+    store = plan_store.WriteBehindPlanStore(
+        plan_store.JSONPlanStore(str(tmp_path / "plans.json")), flush_interval=0.01
+    )
+    apply, calls = store.store.apply, []
+
+    def flaky_apply(ops):
+        calls.append(ops)
+        if len(calls) == 1:
+            raise OSError("disk full")
+        apply(ops)
+
+    monkeypatch.setattr(store.store, "apply", flaky_apply)
+    store.put_plan(
+        {
+            "plan_id": "p1",
+            "title": "t",
+            "steps": ["s"],
+            "step_statuses": ["not_started"],
+            "step_notes": [""],
+        }
+    )
+    for _ in range(200):
+        if store.flushes:
+            break
+        time.sleep(0.01)
+    store.close()
+
+    assert "disk full" in warnings[0]
+    assert store.flushes >= 1 and store.dirty == 0
+    assert "p1" in json.loads((tmp_path / "plans.json").read_text())
+    assert store not in plan_store._open_stores
+
+
+@pytest.mark.sit
+def test_json_store_writes_atomically_on_close(tmp_path):
+    path = tmp_path / "plans.json"
+    tool = PlanningTool(storage_type="json", storage_path=str(path), flush_interval=60)
+    asyncio.run(tool.execute(command="create", plan_id="p1", title="t", steps=["s"]))
+    asyncio.run(
+        tool.execute(command="mark_step", plan_id="p1", step_index=0, step_notes="n")
+    )
+    assert not path.exists()
+    tool.close()
+    assert [p.name for p in tmp_path.iterdir()] == ["plans.json"]
+    tool2 = PlanningTool(storage_type="json", storage_path=str(path))
+    assert tool2.plans["p1"]["step_notes"] == ["n"]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_loads_plans_lazily(tmp_path):
+    path = tmp_path / "plans.db"
+    tool = PlanningTool(storage_type="sqlite", storage_path=str(path))
+    for i in range(3):
+        await tool.execute(command="create", plan_id=f"p{i}", title="t", steps=["a"])
+    await tool.execute(
+        command="mark_step", plan_id="p1", step_index=0, step_status="completed"
+    )
+    tool2 = PlanningTool(storage_type="sqlite", storage_path=str(path))
+    assert len(tool2.plans) == 3 and tool2.plans.loaded == 0
+    listing = (await tool2.execute(command="list")).output
+    assert "p1: t - 1/1 steps completed" in listing
+    assert tool2.plans.loaded == 0
+    assert tool2.plans["p1"]["step_statuses"] == ["completed"]
+    assert tool2.plans.loaded == 1
+
+
+@pytest.mark.uat
+def test_sqlite_migrates_blob_schema(tmp_path):
+    import json
+    import sqlite3
+
+    path = tmp_path / "plans.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE plans (plan_id TEXT PRIMARY KEY, title TEXT, steps TEXT, step_statuses TEXT, step_notes TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO plans VALUES (?, ?, ?, ?, ?)",
+        (
+            "old",
+            "t",
+            json.dumps(["a", "b"]),
+            json.dumps(["completed", "not_started"]),
+            json.dumps(["done", ""]),
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+    tool = PlanningTool(storage_type="sqlite", storage_path=str(path))
+    assert tool.plans["old"]["steps"] == ["a", "b"]
+    assert tool.plans["old"]["step_notes"] == ["done", ""]
+    tables = {
+        row[0]
+        for row in tool._store.store._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table'"
+        )
+    }
+    assert tables == {"plans", "plan_steps"}
+
+
+@pytest.mark.asyncio
+async def test_progress_cursor_tracks_first_active_step():
+    tool = PlanningTool()
+    await tool.execute(command="create", plan_id="p1", title="t", steps=list("abcd"))
+    assert tool.get_current_step("p1") == 0
+    for index in (0, 2, 1):
+        await tool.execute(
+            command="mark_step", plan_id="p1", step_index=index, step_status="completed"
+        )
+    assert tool.get_current_step("p1") == 3
+    tool.set_step_status("p1", 1, "blocked")
+    tool.set_step_status("p1", 3, "completed")
+    assert tool.get_current_step("p1") is None
+    assert tool.get_progress("p1").counts == {
+        "not_started": 0,
+        "in_progress": 0,
+        "completed": 3,
+        "blocked": 1,
+    }
+    tool.set_step_status("p1", 2, "not_started")
+    assert tool.get_current_step("p1") == 2
+    assert PlanningTool()._progress == {}
+
+
+@pytest.mark.sit
+@pytest.mark.asyncio
+async def test_window_rendering_reuses_cached_lines():
+    tool = PlanningTool()
+    await tool.execute(
+        command="create", plan_id="p1", title="t", steps=[f"s{i}" for i in range(50)]
+    )
+    tool.set_step_status("p1", 0, "completed")
+    progress = tool.get_progress("p1")
+    full = tool.render_plan("p1")
+    assert full == (await tool.execute(command="get", plan_id="p1")).output
+    assert progress._lines.count(None) == 0
+
+    tool.set_step_status("p1", 1, "in_progress", "working")
+    assert progress._lines.count(None) == 1
+    window = tool.render_plan("p1", window=2)
+    assert "0. [✓] s0\n1. [→] s1\n   Notes: working\n2. [ ] s2\n3. [ ] s3\n" in window
+    assert window.endswith("... 46 later steps ...\n")
+    assert "Progress: 1/50 steps completed (2.0%)" in window
+
+
+@pytest.mark.asyncio
+async def test_step_dependencies_validated_and_persisted(tmp_path):
+    from app.exceptions import ToolError
+
+    path = tmp_path / "plans.db"
+    tool = PlanningTool(storage_type="sqlite", storage_path=str(path))
+    with pytest.raises(ToolError, match="cycle"):
+        await tool.execute(
+            command="create",
+            plan_id="bad",
+            title="t",
+            steps=["a", "b"],
+            step_dependencies=[[1], [0]],
+        )
+    await tool.execute(
+        command="create",
+        plan_id="p1",
+        title="t",
+        steps=["a", "b", "c"],
+        step_dependencies=[[], [], [0, 1]],
+    )
+    assert tool.get_ready_steps("p1") == [0, 1]
+    tool.set_step_status("p1", 0, "completed")
+    tool.set_step_status("p1", 1, "completed")
+    assert tool.get_ready_steps("p1") == [2]
+    assert "2. [ ] c (after 0, 1)" in tool.render_plan("p1")
+
+    tool2 = PlanningTool(storage_type="sqlite", storage_path=str(path))
+    assert tool2.plans["p1"]["step_dependencies"] == [[], [], [0, 1]]
+
+
+@pytest.mark.asyncio
+async def test_changing_steps_drops_dependencies_on_moved_steps():
+    from app.exceptions import ToolError
+
+    tool = PlanningTool()
+    await tool.execute(
+        command="create",
+        plan_id="p1",
+        title="t",
+        steps=["a", "b", "c", "d"],
+        step_dependencies=[[], [0], [0, 1], [2]],
+    )
+    # "b" and "d" are replaced; "c" kept its position but loses its edge to "b"
+    await tool.execute(command="update", plan_id="p1", steps=["a", "x", "c", "e"])
+    plan = tool.plans["p1"]
+    assert plan["step_dependencies"] == [[], [], [0], []]
+    # every step has a list of its own
+    plan["step_dependencies"][1].append(0)
+    assert plan["step_dependencies"][3] == []
+
+    await tool.execute(command="update", plan_id="p1", steps=["e", "c"])
+    assert "step_dependencies" not in plan
+
+    with pytest.raises(ToolError, match="one list"):
+        await tool.execute(
+            command="update",
+            plan_id="p1",
+            steps=["a", "b", "c"],
+            step_dependencies=[[]],
+        )
+    assert plan["steps"] == ["e", "c"]
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.tool.python_execute import PythonExecute, PythonWorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = PythonWorkerPool(size=1, max_executions=3, preload=())
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_anonymous_runs_do_not_share_process_state(pool):
+    tool = PythonExecute(pool=pool)
+    first = await tool.execute("import sys\nsys.leaked = 1\nprint('set')")
+    second = await tool.execute("import sys\nprint(hasattr(sys, 'leaked'))")
+    assert first["success"] and second["success"]
+    assert second["observation"].strip() == "False"
+
+
+@pytest.mark.asyncio
+async def test_back_to_back_isolated_runs_use_prewarmed_workers():
+    pool = PythonWorkerPool(size=1, preload=("json",))
+    try:
+        pool.start()
+        (warm,) = pool._idle
+        tool = PythonExecute(pool=pool)
+        for _ in range(3):
+            result = await tool.execute("import os\nprint(os.getppid())")
+            assert int(result["observation"]) == warm.process.pid
+        assert list(pool._idle) == [warm] and warm.executions == 3
+
+        # an isolated timeout is enforced by the worker, which stays warm
+        result = await tool.execute("while True:\n    pass", timeout=0.3)
+        assert result["observation"] == "Execution timeout after 0.3 seconds"
+        assert list(pool._idle) == [warm] and warm.process.is_alive()
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_workers_are_reused_with_fresh_namespaces_when_not_isolated():
+    pool = PythonWorkerPool(size=1, preload=(), isolate=False)
+    try:
+        tool = PythonExecute(pool=pool)
+        await tool.execute("x = 1")
+        second = await tool.execute("print('x' in globals())")
+        assert second["observation"].strip() == "False"
+        assert pool._idle and pool._idle[0].executions == 2
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.sit
+@pytest.mark.asyncio
+async def test_session_namespace_persists_and_recycles(pool):
+    tool = PythonExecute(pool=pool, session_id="s1")
+    await tool.execute("counter = 41")
+    result = await tool.execute("counter += 1\nprint(counter)")
+    assert result["observation"].strip() == "42"
+
+    # third execution hits max_executions and recycles the pinned worker
+    await tool.execute("pass")
+    result = await tool.execute("print('counter' in globals())")
+    assert result["observation"].strip() == "False"
+
+
+@pytest.mark.sit
+@pytest.mark.asyncio
+async def test_sessions_are_capped_and_released_on_cleanup():
+    pool = PythonWorkerPool(size=1, preload=(), max_sessions=2)
+    try:
+        tools = [PythonExecute(pool=pool, session_id=f"s{i}") for i in range(3)]
+        for tool in tools:
+            await tool.execute("value = 1")
+        assert list(pool._sessions) == ["s1", "s2"]
+
+        await tools[2].cleanup()
+        assert list(pool._sessions) == ["s1"]
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.uat
+@pytest.mark.asyncio
+async def test_timeout_kills_worker_and_pool_recovers(pool):
+    tool = PythonExecute(pool=pool)
+    result = await tool.execute("while True:\n    pass", timeout=0.5)
+    assert result == {
+        "observation": "Execution timeout after 0.5 seconds",
+        "success": False,
+    }
+    result = await tool.execute("print(1 / 0)")
+    assert result == {"observation": "division by zero", "success": False}
+    assert (await tool.execute("print('ok')"))["observation"] == "ok\n"
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+from app.agent.toolcall import ToolCallAgent
+from app.schema import Message
+from app.session import SessionManager, clone_agent
+from app.tool import ToolCollection
+from app.tool.python_execute import PythonExecute
+
+
+EVENTS = []
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+
+    async def handle(self, tag):
+        EVENTS.append(f"start {tag}")
+        await asyncio.sleep(0.05)
+        EVENTS.append(f"end {tag}")
+        self.messages.append(tag)
+        return tag
+
+
+def test_clones_share_llm_but_not_state():
+    prototype = ToolCallAgent()
+    first, second = clone_agent(prototype), clone_agent(prototype)
+    first.memory.add_message(Message.user_message("only for the first user"))
+    first.dispatched_tool_calls["call"] = None
+
+    assert second.memory.messages == [] and prototype.memory.messages == []
+    assert second.dispatched_tool_calls == {}
+    assert first.llm is second.llm is prototype.llm
+    assert first.available_tools is not second.available_tools
+
+
+def test_clones_get_their_own_python_session():
+    prototype = ToolCallAgent(available_tools=ToolCollection(PythonExecute()))
+    first, second = clone_agent(prototype), clone_agent(prototype)
+    ids = [
+        a.available_tools.get_tool("python_execute").session_id for a in (first, second)
+    ]
+    assert None not in ids and ids[0] != ids[1]
+
+
+@pytest.mark.sit
+def test_requests_serialize_per_session_only():
+    EVENTS.clear()
+    manager = SessionManager(Recorder)
+    try:
+        futures = [
+            manager.submit("alice", lambda s: s.handle("a1")),
+            manager.submit("alice", lambda s: s.handle("a2")),
+            manager.submit("bob", lambda s: s.handle("b1")),
+        ]
+        assert [f.result(5) for f in futures] == ["a1", "a2", "b1"]
+    finally:
+        manager.shutdown()
+
+    # bob's request overlaps alice's, alice's second waits for her first
+    assert EVENTS.index("start b1") < EVENTS.index("end a1")
+    assert EVENTS.index("start a2") > EVENTS.index("end a1")
+    assert manager.peek("alice") is None
+
+
+@pytest.mark.uat
+def test_idle_and_least_recently_used_sessions_are_evicted():
+    evicted = []
+    manager = SessionManager(
+        Recorder, max_sessions=2, idle_ttl=0.2, on_evict=evicted.append
+    )
+    try:
+        alice = manager.get("alice")
+        manager.run_sync("alice", lambda s: s.handle("hi"), timeout=5)
+        manager.get("bob")
+        manager.get("alice")
+        manager.get("carol")
+        assert manager.peek("bob") is None and evicted == [
+            manager.peek("x") or evicted[0]
+        ]
+
+        stats = manager.stats()
+        assert stats["active_sessions"] == 2
+        assert stats["sessions"]["alice"]["runs"] == 1
+        assert manager.get("alice") is alice
+
+        time.sleep(0.25)
+        assert sorted(manager.evict_idle()) == ["alice", "carol"]
+        assert manager.stats()["active_sessions"] == 0
+        assert manager.stats()["evicted_sessions"] == 3
+    finally:
+        manager.shutdown()
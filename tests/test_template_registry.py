@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from app.flow.workflow_loader import parse_workflow
+from app.prompt.loader import parse_prompt
+from app.template_registry import TemplateRegistry
+
+
+WORKFLOW = "workflow:\n  name: {name}\n  steps: []\n"
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_cached_until_file_changes(tmp_path):
+    registry = TemplateRegistry()
+    path = tmp_path / "wf.yaml"
+    path.write_text(WORKFLOW.format(name="one"))
+    first = registry.load(str(path), parse_workflow)
+    assert registry.load(str(path), parse_workflow) is first
+    assert registry.stats["loads"] == 1 and registry.stats["hits"] == 1
+    assert str(path) in registry.timings
+
+    path.write_text(WORKFLOW.format(name="two"))
+    bump_mtime(path)
+    assert registry.load(str(path), parse_workflow)["name"] == "two"
+
+
+@pytest.mark.sit
+def test_preload_reports_invalid_templates(tmp_path):
+    registry = TemplateRegistry()
+    errors = registry.preload("prompt_templates", parse_prompt)
+    assert errors == {}
+    assert len(registry.timings) == len(os.listdir("prompt_templates"))
+
+    (tmp_path / "bad.prompt.yaml").write_text("role: r")
+    errors = registry.preload(str(tmp_path), parse_prompt)
+    assert list(errors) == [str(tmp_path / "bad.prompt.yaml")]
+    assert registry.stats["errors"] == 1
+
+
+@pytest.mark.uat
+def test_watched_templates_are_hot_reloaded(tmp_path):
+    registry = TemplateRegistry()
+    path = tmp_path / "wf.yaml"
+    path.write_text(WORKFLOW.format(name="one"))
+    registry.watch([str(tmp_path)], interval=3600)
+    try:
+        registry.load(str(path), parse_workflow)
+        path.write_text(WORKFLOW.format(name="two"))
+        bump_mtime(path)
+        # watched files are served from cache until the watcher polls
+        assert registry.load(str(path), parse_workflow)["name"] == "one"
+        assert registry.poll() == [str(path)]
+        assert registry.load(str(path), parse_workflow)["name"] == "two"
+
+        path.write_text("nope: 1")
+        bump_mtime(path)
+        registry.poll()
+        with pytest.raises(ValueError):
+            registry.load(str(path), parse_workflow)
+    finally:
+        registry.unwatch()
@@ -0,0 +1,51 @@
+import pytest
+
+from app.llm import LLM, TokenCounter
+from app.schema import Message, MessageTokenCache
+
+
+class CountingTokenizer:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        return text.split()
+
+
+def test_cached_count_matches_uncached():
+    messages = LLM.format_messages(
+        [Message.system_message("be brief"), Message.user_message("hello there")]
+    )
+    cached = TokenCounter(CountingTokenizer())
+    uncached = TokenCounter(CountingTokenizer(), cache=MessageTokenCache(0))
+    assert cached.count_message_tokens(messages) == uncached.count_message_tokens(
+        messages
+    )
+
+
+@pytest.mark.sit
+def test_only_new_messages_are_encoded():
+    tokenizer = CountingTokenizer()
+    counter = TokenCounter(tokenizer)
+    history = [Message.user_message(f"message {i}") for i in range(5)]
+    counter.count_message_tokens(LLM.format_messages(history))
+    calls_before = tokenizer.calls
+
+    history.append(Message.assistant_message("a new reply"))
+    counter.count_message_tokens(LLM.format_messages(history))
+
+    # role + content for the single appended message only
+    assert tokenizer.calls - calls_before == 2
+    assert counter.cache.hits == 5
+
+
+@pytest.mark.uat
+def test_cache_is_bounded():
+    cache = MessageTokenCache(max_entries=2)
+    for i in range(3):
+        cache.set(MessageTokenCache.key_for({"role": "user", "content": str(i)}), i)
+    assert len(cache) == 2
+    assert (
+        cache.get(MessageTokenCache.key_for({"role": "user", "content": "0"})) is None
+    )
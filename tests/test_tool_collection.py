@@ -0,0 +1,36 @@
+import pytest
+
+from app.llm import LLM
+from app.tool import CreateChatCompletion, Terminate, ToolCollection
+
+
+def test_params_are_memoized():
+    tools = ToolCollection(Terminate())
+    assert tools.to_params() is tools.to_params()
+
+
+@pytest.mark.sit
+def test_add_tool_invalidates_params():
+    tools = ToolCollection(Terminate())
+    before = tools.to_params()
+    tools.add_tool(CreateChatCompletion())
+    after = tools.to_params()
+    assert after is not before
+    assert [p["function"]["name"] for p in after] == [
+        "terminate",
+        "create_chat_completion",
+    ]
+
+
+@pytest.mark.uat
+def test_llm_reuses_tool_token_count(monkeypatch):
+    llm = LLM()
+    tools = ToolCollection(Terminate())
+    calls = []
+    original = llm.count_tokens
+    monkeypatch.setattr(llm, "count_tokens", lambda t: calls.append(t) or original(t))
+
+    first = llm.count_tools_tokens(tools.to_params())
+    second = llm.count_tools_tokens(tools.to_params())
+    assert first == second > 0
+    assert len(calls) == 1
@@ -0,0 +1,188 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.agent.toolcall import ToolCallAgent
+from app.llm import llm_pool
+from app.schema import Function, Message, ToolCall
+from app.tool import ToolCollection
+from app.tool.base import BaseTool
+
+
+class RecordingTool(BaseTool):
+    name: str = "record"
+    description: str = "records calls"
+    parameters: dict = {"type": "object", "properties": {"tag": {"type": "string"}}}
+    started: list = []
+
+    async def execute(self, tag: str) -> str:
+        self.started.append(tag)
+        return tag
+
+
+def _call(index: int, tag: str) -> ToolCall:
+    return ToolCall(
+        id=f"call_{index}",
+        function=Function(name="record", arguments=f'{{"tag": "{tag}"}}'),
+    )
+
+
+def _chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def _call_delta(index, id=None, name=None, arguments=None):
+    return SimpleNamespace(
+        index=index,
+        id=id,
+        function=SimpleNamespace(name=name, arguments=arguments),
+    )
+
+
+@pytest.mark.asyncio
+async def test_ask_tool_stream_assembles_tool_calls(monkeypatch):
+    llm = llm_pool.get_llm(session_id="stream-test")
+    chunks = [
+        _chunk(content="Working"),
+        _chunk(tool_calls=[_call_delta(0, id="a", name="record", arguments='{"ta')]),
+        _chunk(tool_calls=[_call_delta(0, arguments='g": "x"}')]),
+        _chunk(tool_calls=[_call_delta(1, id="b", name="record", arguments="{}")]),
+    ]
+
+    async def fake_create(**params):
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        return stream()
+
+    monkeypatch.setattr(llm, "_create_completion", fake_create)
+    items = [
+        item
+        async for item in llm.ask_tool_stream([Message.user_message("go")], tools=[])
+    ]
+    assert items[0] == "Working"
+    assert [(c.id, c.function.arguments) for c in items[1:]] == [
+        ("a", '{"tag": "x"}'),
+        ("b", "{}"),
+    ]
+    llm_pool.release_session("stream-test")
+
+
+@pytest.mark.asyncio
+@pytest.mark.sit
+async def test_first_tool_runs_while_stream_continues():
+    tool = RecordingTool(started=[])
+    started_before_second = []
+
+    async def fake_stream(**kwargs):
+        yield "thinking"
+        yield _call(0, "first")
+        await asyncio.sleep(0.05)
+        started_before_second.append(list(tool.started))
+        yield _call(1, "second")
+
+    agent = ToolCallAgent(
+        available_tools=ToolCollection(tool),
+        stream_tool_calls=True,
+        next_step_prompt="",
+    )
+    agent.llm = SimpleNamespace(ask_tool_stream=fake_stream)
+    agent.memory.add_message(Message.user_message("hi"))
+
+    assert await agent.think()
+    result = await agent.act()
+    assert started_before_second == [["first"]]
+    assert tool.started == ["first", "second"]
+    assert "first" in result and "second" in result
+
+
+@pytest.mark.asyncio
+@pytest.mark.uat
+async def test_streamed_results_keep_memory_order():
+    tool = RecordingTool(started=[])
+
+    async def fake_stream(**kwargs):
+        yield _call(0, "a")
+        yield _call(1, "b")
+
+    agent = ToolCallAgent(
+        available_tools=ToolCollection(tool),
+        stream_tool_calls=True,
+        next_step_prompt="",
+    )
+    agent.llm = SimpleNamespace(ask_tool_stream=fake_stream)
+    await agent.think()
+    await agent.act()
+    roles = [m.role for m in agent.memory.messages]
+    assert roles == ["assistant", "tool", "tool"]
+    assert [m.tool_call_id for m in agent.memory.messages[1:]] == ["call_0", "call_1"]
+
+
+EVENTS = []
+
+
+class SlowSearch(BaseTool):
+    name: str = "slow_search"
+    description: str = "parallel-safe lookup"
+    parameters: dict = {"type": "object", "properties": {"tag": {"type": "string"}}}
+    parallel_safe: bool = True
+
+    async def execute(self, tag: str) -> str:
+        EVENTS.append(f"start {tag}")
+        await asyncio.sleep(0.05)
+        EVENTS.append(f"end {tag}")
+        return tag
+
+
+class ExclusiveTool(BaseTool):
+    name: str = "exclusive"
+    description: str = "must not overlap"
+    parameters: dict = {"type": "object", "properties": {"tag": {"type": "string"}}}
+
+    async def execute(self, tag: str) -> str:
+        EVENTS.append(tag)
+        return tag
+
+
+def _named_call(index: int, name: str, tag: str) -> ToolCall:
+    return ToolCall(
+        id=f"call_{index}",
+        function=Function(name=name, arguments=f'{{"tag": "{tag}"}}'),
+    )
+
+
+@pytest.mark.asyncio
+async def test_parallel_safe_calls_overlap_and_exclusive_calls_wait():
+    EVENTS.clear()
+    agent = ToolCallAgent(available_tools=ToolCollection(SlowSearch(), ExclusiveTool()))
+    agent.tool_calls = [
+        _named_call(0, "slow_search", "a"),
+        _named_call(1, "slow_search", "b"),
+        _named_call(2, "exclusive", "c"),
+    ]
+
+    result = await agent.act()
+
+    assert EVENTS[:2] == ["start a", "start b"]
+    assert EVENTS[-1] == "c"
+    assert result.endswith("c")
+    assert [m.tool_call_id for m in agent.memory.messages] == [
+        "call_0",
+        "call_1",
+        "call_2",
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.sit
+async def test_max_parallel_tool_calls_bounds_concurrency():
+    EVENTS.clear()
+    agent = ToolCallAgent(
+        available_tools=ToolCollection(SlowSearch()), max_parallel_tool_calls=1
+    )
+    agent.tool_calls = [_named_call(i, "slow_search", str(i)) for i in range(2)]
+    await agent.act()
+    assert EVENTS == ["start 0", "end 0", "start 1", "end 1"]
@@ -0,0 +1,192 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import tracing
+from app.agent.toolcall import ToolCallAgent
+from app.exceptions import ToolError
+from app.llm import llm_pool
+from app.schema import Function, ToolCall
+from app.tool import ToolCollection
+from app.tool.base import BaseTool
+from app.tracing import (
+    NOOP_SPAN,
+    ChromeTraceExporter,
+    JsonLinesExporter,
+    NoopTracer,
+    SpanExporter,
+    Tracer,
+    current_span,
+    set_tracer,
+    traced,
+)
+
+
+class Collector(SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+class EchoTool(BaseTool):
+    name: str = "echo"
+    description: str = "echoes its input"
+    parameters: dict = {"type": "object", "properties": {"text": {"type": "string"}}}
+
+    async def execute(self, text: str) -> str:
+        return text
+
+
+class BrokenTool(BaseTool):
+    name: str = "broken"
+    description: str = "always fails"
+    parameters: dict = {"type": "object", "properties": {}}
+
+    async def execute(self) -> str:
+        raise ToolError("disk full")
+
+
+@pytest.fixture
+def collector():
+    exporter = Collector()
+    previous = set_tracer(Tracer([exporter]))
+    yield exporter
+    set_tracer(previous)
+
+
+@pytest.mark.asyncio
+async def test_tracing_is_a_noop_by_default(monkeypatch):
+    monkeypatch.setattr(tracing, "_tracer", None)
+    tracer = tracing.get_tracer()
+    assert isinstance(tracer, NoopTracer) and not tracer.enabled
+
+    @traced("work")
+    async def work():
+        current_span().set_attribute("ignored", True)
+        return 42
+
+    assert await work() == 42
+    assert tracer.start_span("anything", a=1) is NOOP_SPAN
+    assert tracer.summary() == {}
+
+
+@pytest.mark.sit
+@pytest.mark.asyncio
+async def test_agent_run_records_nested_llm_and_tool_spans(collector):
+    llm = llm_pool.get_llm(session_id="tracing-test")
+    message = SimpleNamespace(
+        content="calling tools",
+        tool_calls=[
+            ToolCall(
+                id="a", function=Function(name="echo", arguments='{"text": "hi"}')
+            ),
+            ToolCall(id="b", function=Function(name="broken", arguments="{}")),
+        ],
+    )
+
+    async def fake_create(**params):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message)],
+            usage=SimpleNamespace(prompt_tokens=120, completion_tokens=15),
+        )
+
+    llm._create_completion = fake_create
+    agent = ToolCallAgent(
+        available_tools=ToolCollection(EchoTool(), BrokenTool()),
+        next_step_prompt="",
+        max_steps=1,
+    )
+    agent.llm = llm
+    await agent.run("go")
+    llm_pool.release_session("tracing-test")
+
+    spans = {span.name: span for span in collector.spans if span.name != "tool.execute"}
+    tools = [span for span in collector.spans if span.name == "tool.execute"]
+    step, ask = spans["agent.step"], spans["llm.ask_tool"]
+
+    assert step.attributes == {"agent": "toolcall", "step": 1}
+    assert ask.parent_id == step.span_id
+    assert ask.attributes["input_tokens"] == 120
+    assert ask.attributes["output_tokens"] == 15
+    assert ask.attributes["tool_calls"] == 2
+    assert [(s.attributes["tool"], s.error) for s in tools] == [
+        ("echo", None),
+        ("broken", "disk full"),
+    ]
+    assert all(s.parent_id == step.span_id for s in tools)
+    assert step.duration_ms >= ask.duration_ms
+    assert tracing.get_tracer().summary()["tool.execute"]["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_streamed_tool_calls_are_traced_until_the_stream_ends(collector):
+    llm = llm_pool.get_llm(session_id="tracing-stream-test")
+
+    def chunk(content=None, index=None, call_id=None, arguments=""):
+        calls = None
+        if index is not None:
+            function = SimpleNamespace(name="echo", arguments=arguments)
+            calls = [SimpleNamespace(index=index, id=call_id, function=function)]
+        delta = SimpleNamespace(content=content, tool_calls=calls)
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    async def fake_create(**params):
+        async def chunks():
+            yield chunk(content="thinking")
+            yield chunk(index=0, call_id="a", arguments="{}")
+            yield chunk(index=1, call_id="b", arguments="{}")
+
+        return chunks()
+
+    llm._create_completion = fake_create
+    seen = []
+    with tracing.get_tracer().start_span("agent.step") as step:
+        async for item in llm.ask_tool_stream([{"role": "user", "content": "go"}]):
+            # the caller's own work between items runs in its span, not the LLM's
+            seen.append((item, current_span() is step))
+        stream = llm.ask_tool_stream([{"role": "user", "content": "go"}])
+        await stream.__anext__()
+        await stream.aclose()
+    llm_pool.release_session("tracing-stream-test")
+
+    assert [inside for _, inside in seen] == [True] * 3
+    assert [getattr(item, "id", item) for item, _ in seen] == ["thinking", "a", "b"]
+    first, second = [s for s in collector.spans if s.name == "llm.ask_tool_stream"]
+    assert first.parent_id == second.parent_id == step.span_id
+    assert first.attributes["tool_calls"] == 2 and first.error is None
+    assert "tool_calls" not in second.attributes and second.error is None
+
+
+@pytest.mark.uat
+@pytest.mark.asyncio
+async def test_trace_files_show_concurrent_tasks_on_separate_rows(tmp_path):
+    chrome = ChromeTraceExporter(str(tmp_path / "trace.json"))
+    lines = JsonLinesExporter(str(tmp_path / "spans.jsonl"))
+    tracer = Tracer([chrome, lines])
+
+    async def step(name):
+        with tracer.start_span("plan.step", step=name):
+            await asyncio.sleep(0.02)
+            if name == "b":
+                raise RuntimeError("boom")
+
+    await asyncio.gather(step("a"), step("b"), return_exceptions=True)
+    tracer.shutdown()
+
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    rows = [e for e in trace["traceEvents"] if e["ph"] == "M"]
+    assert len(spans) == 2 and len(rows) == 2
+    assert spans[0]["tid"] != spans[1]["tid"]
+    assert all(e["dur"] >= 15000 for e in spans)
+    assert {e["args"].get("error") for e in spans} == {None, "RuntimeError: boom"}
+
+    records = [json.loads(line) for line in open(tmp_path / "spans.jsonl")]
+    assert [r["attributes"]["step"] for r in records] == ["a", "b"]
+    summary = tracer.summary()["plan.step"]
+    assert summary["count"] == 2 and summary["errors"] == 1
+    assert "plan.step" in tracer.format_summary()
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from app.tool.search.base import WebSearchEngine
+from app.tool.web_search import WebSearch
+
+
+class FakeEngine(WebSearchEngine):
+    def __init__(self, links, delay=0.0, error=None):
+        self.links = links
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def search(self, query, num_results=10):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.links
+
+
+def make_tool(monkeypatch, **engines):
+    monkeypatch.setattr(WebSearch, "_hedge_delay", lambda self: 0.05)
+    tool = WebSearch()
+    tool._search_engine = engines
+    tool._engine_stats = {}
+    return tool
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_is_cached(monkeypatch):
+    google = FakeEngine(["https://a"])
+    tool = make_tool(monkeypatch, google=google)
+    assert await tool.execute("Python  asyncio") == ["https://a"]
+    assert await tool.execute("python asyncio") == ["https://a"]
+    assert google.calls == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.sit
+async def test_slow_primary_is_hedged(monkeypatch):
+    google = FakeEngine(["https://slow"], delay=1.0)
+    baidu = FakeEngine(["https://fast"])
+    tool = make_tool(monkeypatch, google=google, baidu=baidu)
+    assert await tool.execute("query") == ["https://fast"]
+    assert tool.engine_stats()["baidu"]["requests"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.uat
+async def test_failed_engine_falls_back_immediately(monkeypatch):
+    google = FakeEngine([], error=RuntimeError("blocked"))
+    duckduckgo = FakeEngine(["https://ddg"])
+    tool = make_tool(monkeypatch, google=google, duckduckgo=duckduckgo)
+    assert await tool.execute("query") == ["https://ddg"]
+    assert tool.engine_stats()["google"]["failures"] == 1
+
+
+def test_normalize_results():
+    items = [{"url": "https://b"}, {"href": "https://c"}, "https://d"]
+    assert WebSearchEngine.normalize_results(items) == [
+        "https://b",
+        "https://c",
+        "https://d",
+    ]
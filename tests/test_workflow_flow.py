@@ -0,0 +1,97 @@
+import asyncio
+import shutil
+
+import pytest
+
+from app.agent.base import BaseAgent
+from app.flow.base import FlowType
+from app.flow.flow_factory import FlowFactory
+from app.flow.workflow import WorkflowFlow, load_compiled_workflow, parse_trigger
+from app.llm import LLM
+from app.schema import AgentState
+
+
+EVENTS = []
+
+
+class ScriptedAgent(BaseAgent):
+    description: str = "d"
+    llm: LLM
+    reply: str = "done"
+
+    async def step(self) -> str:
+        EVENTS.append(("start", self.name))
+        await asyncio.sleep(0.02)
+        EVENTS.append(("end", self.name))
+        self.state = AgentState.FINISHED
+        return self.reply
+
+
+def make_agents(score):
+    llm = LLM()
+    names = {
+        "domain-specialist-agent": "done",
+        "prompt-engineering-agent": "done",
+        "prompt-quality-evaluator-agent": f"score: {score}",
+        "prompt-optimizer-agent": "done",
+    }
+    return {
+        name: ScriptedAgent(name=name, llm=llm, reply=reply)
+        for name, reply in names.items()
+    }
+
+
+def test_parse_trigger_and_compile_cache(tmp_path):
+    (condition,) = parse_trigger("evaluate_prompt.score < 0.9")
+    assert condition.evaluate({"score": 0.5})
+    assert not condition.evaluate({"score": 0.95})
+    assert parse_trigger("user_request") == []
+
+    path = tmp_path / "wf.yaml"
+    shutil.copy("agent_templates/finance_agent_steps.yaml", path)
+    first = load_compiled_workflow(str(path))
+    assert load_compiled_workflow(str(path)) is first
+    path.write_text(path.read_text().replace("finance_prompt", "changed_prompt"))
+    assert load_compiled_workflow(str(path)).name == "changed_prompt_workflow"
+
+
+@pytest.mark.sit
+@pytest.mark.asyncio
+@pytest.mark.parametrize("score,ran_optimizer", [(0.5, True), (0.95, False)])
+async def test_score_trigger_controls_branch(score, ran_optimizer):
+    flow = FlowFactory.create_flow(
+        FlowType.WORKFLOW,
+        make_agents(score),
+        workflow="agent_templates/finance_agent_steps.yaml",
+    )
+    result = await flow.execute("write a prompt")
+    assert flow.step_states["evaluate_prompt"]["score"] == score
+    assert ("[optimize_prompt]" in result) is ran_optimizer
+    expected = "completed" if ran_optimizer else "skipped"
+    assert flow.step_states["optimize_prompt"]["status"] == expected
+
+
+@pytest.mark.uat
+@pytest.mark.asyncio
+async def test_independent_branches_run_concurrently(tmp_path):
+    EVENTS.clear()
+    path = tmp_path / "wf.yaml"
+    path.write_text(
+        """
+workflow:
+  name: fan_out
+  steps:
+    - {id: a, agent: domain-specialist-agent, trigger: user_request}
+    - {id: b, agent: prompt-engineering-agent, trigger: user_request}
+    - {id: c, agent: prompt-optimizer-agent, trigger: a.completed and b.completed}
+"""
+    )
+    flow = WorkflowFlow(make_agents(1.0), workflow=str(path))
+    result = await flow.execute("go")
+    assert [event[0] for event in EVENTS[:2]] == ["start", "start"]
+    assert EVENTS[-2] == ("start", "prompt-optimizer-agent")
+    assert result.splitlines() == [
+        "[a] Step 1: done",
+        "[b] Step 1: done",
+        "[c] Step 1: done",
+    ]